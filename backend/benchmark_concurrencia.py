@@ -0,0 +1,154 @@
+"""
+Benchmark de contención: bloqueo pesimista vs concurrencia optimista
+Compara el throughput de cambios de estado sobre un mismo ticket con
+N hilos concurrentes usando ambas estrategias.
+
+Uso:
+    python benchmark_concurrencia.py --hilos 16 --operaciones 200
+    python benchmark_concurrencia.py --ticket-id <uuid>
+"""
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, text
+
+from config import settings
+from consultas import SQL_ACTUALIZAR_ESTADO_TICKET, url_psycopg
+
+ESTADOS = ["abierto", "en_proceso", "resuelto", "cerrado"]
+
+SQL_PESIMISTA_LOCK = "SELECT * FROM tickets WHERE id = :id FOR UPDATE"
+SQL_PESIMISTA_UPDATE = """
+    UPDATE tickets
+    SET estado = :estado, fecha_actualizacion = CURRENT_TIMESTAMP
+    WHERE id = :id
+    RETURNING id, estado
+"""
+SQL_INTERACCION = """
+    INSERT INTO interacciones (ticket_id, usuario_id, tipo, contenido)
+    VALUES (:id, :usuario_id, 'cambio_estado', :contenido)
+"""
+
+SQL_VERSION = "SELECT fecha_actualizacion FROM tickets WHERE id = :id"
+
+
+def preparar_ticket(engine, ticket_id=None):
+    """Obtener (ticket_id, usuario_id) para el benchmark, creando un ticket si hace falta"""
+    with engine.begin() as conn:
+        if ticket_id:
+            row = conn.execute(
+                text("SELECT id, usuario_id FROM tickets WHERE id = :id"),
+                {"id": ticket_id}
+            ).fetchone()
+            if not row:
+                raise SystemExit(f"❌ Ticket {ticket_id} no encontrado")
+            return str(row[0]), str(row[1])
+
+        usuario = conn.execute(text("SELECT id FROM usuarios ORDER BY fecha_creacion LIMIT 1")).fetchone()
+        if not usuario:
+            raise SystemExit("❌ No hay usuarios. Ejecuta database/05_datos_ejemplo.sql primero")
+
+        row = conn.execute(
+            text("""
+                INSERT INTO tickets (usuario_id, titulo, descripcion, prioridad)
+                VALUES (:usuario_id, 'Benchmark de concurrencia', 'Ticket creado por benchmark_concurrencia.py', 'baja')
+                RETURNING id
+            """),
+            {"usuario_id": usuario[0]}
+        ).fetchone()
+        return str(row[0]), str(usuario[0])
+
+
+def cambio_pesimista(engine, ticket_id, usuario_id):
+    """Ruta original: SELECT ... FOR UPDATE + UPDATE + INSERT (3 round-trips con el lock tomado)"""
+    estado = random.choice(ESTADOS)
+    with engine.begin() as conn:
+        conn.execute(text(SQL_PESIMISTA_LOCK), {"id": ticket_id})
+        conn.execute(text(SQL_PESIMISTA_UPDATE), {"id": ticket_id, "estado": estado})
+        conn.execute(
+            text(SQL_INTERACCION),
+            {"id": ticket_id, "usuario_id": usuario_id, "contenido": f"Estado actualizado a {estado}"}
+        )
+    return 0
+
+
+def cambio_optimista(engine, ticket_id, usuario_id):
+    """Ruta del API (SQL_ACTUALIZAR_ESTADO_TICKET): leer versión y aplicar el CTE; reintenta ante conflicto"""
+    estado = random.choice(ESTADOS)
+    conflictos = 0
+    while True:
+        with engine.begin() as conn:
+            version = conn.execute(text(SQL_VERSION), {"id": ticket_id}).scalar()
+            row = conn.execute(
+                SQL_ACTUALIZAR_ESTADO_TICKET,
+                {
+                    "id": ticket_id,
+                    "estado": estado,
+                    "version": version,
+                    "usuario_id": usuario_id,
+                    "contenido": f"Estado actualizado a {estado}"
+                }
+            ).fetchone()
+        if row:
+            return conflictos
+        conflictos += 1
+
+
+def ejecutar(nombre, funcion, engine, ticket_id, usuario_id, hilos, operaciones):
+    """Ejecutar `operaciones` cambios repartidos en `hilos` y reportar resultados"""
+    latencias = []
+    conflictos = [0]
+    lock = threading.Lock()
+
+    def tarea(_):
+        inicio = time.perf_counter()
+        c = funcion(engine, ticket_id, usuario_id)
+        duracion = time.perf_counter() - inicio
+        with lock:
+            latencias.append(duracion)
+            conflictos[0] += c
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        list(pool.map(tarea, range(operaciones)))
+    total = time.perf_counter() - inicio
+
+    latencias.sort()
+    p50 = latencias[len(latencias) // 2] * 1000
+    p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000
+
+    print(f"{nombre:<12} {operaciones / total:>10.1f} ops/s   p50 {p50:>7.2f} ms   p99 {p99:>7.2f} ms   conflictos {conflictos[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de contención en cambios de estado de ticket")
+    parser.add_argument("--hilos", type=int, default=16, help="Hilos concurrentes")
+    parser.add_argument("--operaciones", type=int, default=200, help="Cambios de estado por estrategia")
+    parser.add_argument("--ticket-id", default=None, help="Ticket existente a usar (por defecto se crea uno)")
+    args = parser.parse_args()
+
+    engine = create_engine(
+        url_psycopg(settings.get_database_url()),
+        pool_pre_ping=True,
+        pool_size=args.hilos,
+        max_overflow=0
+    )
+    ticket_id, usuario_id = preparar_ticket(engine, args.ticket_id)
+
+    print("=" * 80)
+    print(f"BENCHMARK DE CONTENCIÓN - ticket {ticket_id}")
+    print(f"Hilos: {args.hilos}   Operaciones por estrategia: {args.operaciones}")
+    print("=" * 80)
+
+    ejecutar("pesimista", cambio_pesimista, engine, ticket_id, usuario_id, args.hilos, args.operaciones)
+    ejecutar("optimista", cambio_optimista, engine, ticket_id, usuario_id, args.hilos, args.operaciones)
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Buffer de escritura con group commit
+Agrupa inserciones concurrentes en lotes que se confirman juntos
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, List
+
+logger = logging.getLogger(__name__)
+
+class BufferEscritura:
+    """Agrupa escrituras concurrentes y las vacía cada `max_espera_ms` o `max_filas`
+
+    `procesar_lote` recibe la lista de elementos pendientes y debe devolver una
+    lista alineada con un resultado (o una excepción) por elemento. Se ejecuta
+    en un hilo para no bloquear el event loop, y nunca hay dos vaciados a la
+    vez: mientras uno está en curso, las nuevas escrituras forman el siguiente lote.
+    """
+
+    def __init__(self, procesar_lote: Callable[[List[Any]], List[Any]], max_filas: int = 200, max_espera_ms: int = 5):
+        self.procesar_lote = procesar_lote
+        self.max_filas = max_filas
+        self.max_espera = max_espera_ms / 1000
+        self._pendientes = []
+        self._hay_datos = None
+        self._lleno = None
+        self._tarea = None
+        self._deteniendo = False
+
+    def iniciar(self):
+        """Arrancar la tarea de vaciado (llamar dentro del event loop)"""
+        self._hay_datos = asyncio.Event()
+        self._lleno = asyncio.Event()
+        self._deteniendo = False
+        self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self):
+        """Detener la tarea de vaciado y confirmar lo que quede pendiente
+
+        No se cancela la tarea: un vaciado en curso ya sacó su lote de
+        `_pendientes` y debe terminar para resolver sus futures. El bucle
+        termina el lote en curso, vacía lo pendiente sin esperar la ventana
+        de agrupación y sale.
+        """
+        if self._tarea:
+            self._deteniendo = True
+            self._hay_datos.set()
+            self._lleno.set()
+            await self._tarea
+            self._tarea = None
+
+    async def agregar(self, item: Any) -> Any:
+        """Encolar una escritura y esperar el resultado de su lote"""
+        if self._tarea is None or self._deteniendo:
+            raise RuntimeError("BufferEscritura no iniciado o deteniéndose")
+        future = asyncio.get_running_loop().create_future()
+        self._pendientes.append((item, future))
+        if len(self._pendientes) >= self.max_filas:
+            self._lleno.set()
+        self._hay_datos.set()
+        return await future
+
+    async def _bucle(self):
+        while not self._deteniendo:
+            await self._hay_datos.wait()
+            # Esperar a completar el lote o a que venza la ventana de agrupación
+            try:
+                await asyncio.wait_for(self._lleno.wait(), timeout=self.max_espera)
+            except asyncio.TimeoutError:
+                pass
+            self._hay_datos.clear()
+            self._lleno.clear()
+            await self._vaciar()
+        while self._pendientes:
+            await self._vaciar()
+
+    async def _vaciar(self):
+        lote = self._pendientes[:self.max_filas]
+        self._pendientes = self._pendientes[self.max_filas:]
+        if self._pendientes:
+            self._hay_datos.set()
+            if len(self._pendientes) >= self.max_filas:
+                self._lleno.set()
+        if not lote:
+            return
+
+        resultados = None
+        try:
+            resultados = await asyncio.to_thread(self.procesar_lote, [item for item, _ in lote])
+        except Exception as e:
+            logger.error(f"Error vaciando lote de {len(lote)} escrituras: {str(e)}")
+            resultados = [e] * len(lote)
+        finally:
+            if resultados is None:
+                # Cancelado con el lote en curso: el hilo sigue y el lote pudo confirmarse o no
+                logger.error(f"Vaciado de {len(lote)} escrituras interrumpido; resultado desconocido")
+                resultados = [RuntimeError("Escritura interrumpida al detener el buffer; resultado desconocido")] * len(lote)
+            for (_, future), resultado in zip(lote, resultados):
+                if future.done():
+                    continue
+                if isinstance(resultado, Exception):
+                    future.set_exception(resultado)
+                else:
+                    future.set_result(resultado)
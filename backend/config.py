@@ -5,7 +5,7 @@ Manejo seguro de variables de entorno
 
 import os
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 import json
 
 class Settings(BaseSettings):
@@ -19,6 +19,25 @@ class Settings(BaseSettings):
     SUPABASE_DB_PORT: Optional[str] = "5432"
     SUPABASE_DB_NAME: Optional[str] = "postgres"
     
+    # Ejecuciones de una misma sentencia por conexión antes de prepararla en el servidor
+    # (psycopg). -1 = desactivado
+    DB_PREPARAR_UMBRAL: int = 5
+    # Qué hay entre el API y PostgreSQL: directo | sesion | pgbouncer (>= 1.21 en modo
+    # transacción con max_prepared_statements > 0) | transaccion (otro pooler en modo
+    # transacción: sin sentencias preparadas). Sin valor: transaccion en el puerto 6543
+    DB_POOLER: Optional[Literal["directo", "sesion", "pgbouncer", "transaccion"]] = None
+    
+    # Pool de conexiones por proceso; servidor.py lo recorta para que
+    # procesos × (pool_size + max_overflow) no supere DB_CONEXIONES_MAX
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_CONEXIONES_MAX: int = 60  # Presupuesto de conexiones del API contra la primaria (y cada réplica)
+    
+    # Réplicas de lectura (URLs separadas por comas o lista JSON); vacío = todo a la primaria
+    SUPABASE_DB_REPLICA_URLS: str = ""
+    REPLICA_RETRASO_MAX_SEGUNDOS: float = 2  # Réplicas más retrasadas no reciben lecturas
+    REPLICA_VERIFICAR_SEGUNDOS: float = 1  # Intervalo de verificación de retraso y LSN
+    
     # Redis Configuration (Upstash)
     UPSTASH_REDIS_REST_URL: Optional[str] = None
     UPSTASH_REDIS_REST_TOKEN: Optional[str] = None
@@ -28,11 +47,62 @@ class Settings(BaseSettings):
     REDIS_PORT: Optional[int] = 6379
     REDIS_PASSWORD: Optional[str] = None
     
+    # Redis: timeouts por comando y circuit breaker (la caché nunca debe sumar más latencia que la BD)
+    REDIS_TIMEOUT_MS: int = 250
+    REDIS_TIMEOUT_CONEXION_MS: int = 500
+    REDIS_TIMEOUT_REENVIO_MS: int = 5000  # Pipelines del reenvío del spool (no cuentan para el circuito)
+    REDIS_CIRCUITO_FALLOS: int = 5  # Fallos consecutivos que abren el circuito
+    REDIS_CIRCUITO_ESPERA_SEGUNDOS: float = 5  # Abierto este tiempo antes de probar (semiabierto)
+    # Spool en disco (SQLite) de escrituras diferidas mientras el circuito está abierto
+    REDIS_SPOOL_ARCHIVO: str = "spool_redis.db"
+    REDIS_SPOOL_MAX_MB: float = 64
+    REDIS_SPOOL_SINCRONIZACION: str = "normal"  # full (fsync por escritura), normal (por checkpoint) u off
+    
     # API Configuration
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
     DEBUG: bool = False
     
+    # Servidor de producción (servidor.py)
+    WEB_WORKERS: int = 0  # Procesos; 0 = uno por núcleo
+    WEB_BACKLOG: int = 2048  # Conexiones pendientes de accept() por socket
+    WEB_KEEPALIVE_SEGUNDOS: int = 65  # Mayor que el timeout de inactividad del balanceador (60 s habitual)
+    
+    # Carga masiva: filas por INSERT/commit en POST /tickets/bulk
+    BULK_CHUNK_SIZE: int = 500
+    
+    # Group commit para POST /interacciones (desactivado por defecto)
+    INTERACCIONES_BUFFER_ENABLED: bool = False
+    INTERACCIONES_BUFFER_MS: int = 5
+    INTERACCIONES_BUFFER_MAX_FILAS: int = 200
+    
+    # Exportación: filas por bloque leídas del cursor de servidor
+    EXPORT_BATCH_SIZE: int = 1000
+    
+    # Búsqueda de texto completo: segundos que se cachea cada página de resultados
+    BUSQUEDA_CACHE_TTL: int = 30
+    
+    # Caché de GET /tickets y GET /usuarios (segundos por página)
+    LISTAS_CACHE_TTL: int = 60
+    
+    # Encolar precalentar_cache para el batch worker al iniciar
+    CALENTAR_CACHE_AL_INICIAR: bool = True
+    
+    # Eventos en tiempo real (GET /events): eventos pendientes por cliente y heartbeat
+    EVENTOS_MAX_PENDIENTES: int = 100
+    EVENTOS_HEARTBEAT_SEGUNDOS: int = 15
+    
+    # Trazas OpenTelemetry: "" (desactivado), "otlp" (OTEL_EXPORTER_OTLP_ENDPOINT) o "archivo"
+    TRAZAS_EXPORTADOR: str = ""
+    TRAZAS_ARCHIVO: str = "trazas.jsonl"  # Un span JSON por línea
+    
+    # Perfilado de peticiones: desglose por fase, log de lentas y pilas muestreadas (folded)
+    PERFILADO_ACTIVO: bool = False
+    PERFILADO_UMBRAL_MS: float = 500  # Peticiones más lentas se registran con su SQL
+    PERFILADO_MUESTREO_CADA: int = 0  # Muestrear pilas cada N peticiones (0 = solo con X-Perfilar: 1)
+    PERFILADO_INTERVALO_MS: float = 1
+    PERFILADO_DIRECTORIO: str = "perfiles"
+    
     # CORS - Acepta string JSON o lista
     # Incluye localhost para desarrollo y dominio de Vercel para producción
     # Para permitir todos los orígenes temporalmente, usar: ["*"]
@@ -59,6 +129,15 @@ class Settings(BaseSettings):
         
         raise ValueError("Se requiere SUPABASE_DB_URL o componentes individuales de conexión")
     
+    def get_replica_urls(self) -> list:
+        """Parsear SUPABASE_DB_REPLICA_URLS como lista (JSON o separada por comas)"""
+        valor = self.SUPABASE_DB_REPLICA_URLS.strip()
+        if not valor:
+            return []
+        if valor.startswith("["):
+            return [url for url in json.loads(valor) if url]
+        return [url.strip() for url in valor.split(",") if url.strip()]
+    
     def get_cors_origins(self) -> list:
         """Parsear CORS_ORIGINS como lista"""
         default_origins = ["http://localhost:3000", "https://ticketsyeso.vercel.app"]
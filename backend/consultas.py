@@ -0,0 +1,303 @@
+"""
+Sentencias SQL del API, definidas una sola vez al importar el módulo
+Cada text() es un objeto fijo: SQLAlchemy reutiliza su compilación en cada
+ejecución y psycopg (v3) lo prepara en el servidor tras DB_PREPARAR_UMBRAL
+ejecuciones por conexión (según DB_POOLER, ver argumentos_conexion), así que
+parse y plan no se repiten en el camino caliente. Los listados con filtros
+opcionales tienen una sentencia por combinación en lugar de concatenar SQL
+en cada petición.
+
+Las proyecciones son tuplas de columnas fijas: una fila se convierte en
+dict con dict(zip(COLUMNAS, fila)). Los UUID llegan como texto (loader
+registrado en configurar_conexiones), sin str() por campo.
+"""
+
+import logging
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from psycopg import capabilities
+from psycopg.types.string import TextLoader
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+DRIVER = "postgresql+psycopg"
+
+# Puerto del pooler de Supabase en modo transacción
+PUERTO_POOLER_TRANSACCION = 6543
+
+
+def url_psycopg(url: str) -> str:
+    """postgresql://... (o postgres://, +psycopg2) -> postgresql+psycopg://..."""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return make_url(url).set(drivername=DRIVER).render_as_string(hide_password=False)
+
+
+def modo_pooler() -> str:
+    """DB_POOLER o, sin configurar, "transaccion" en el puerto 6543 y "directo" en otro caso"""
+    if settings.DB_POOLER:
+        return settings.DB_POOLER
+    puerto = make_url(url_psycopg(settings.get_database_url())).port
+    return "transaccion" if puerto == PUERTO_POOLER_TRANSACCION else "directo"
+
+
+def argumentos_conexion() -> dict:
+    """connect_args de psycopg: umbral de preparación en el servidor según el pooler
+
+    - directo / sesion: una conexión del servidor por conexión del pool; se prepara
+    - pgbouncer: PgBouncer >= 1.21 en modo transacción con max_prepared_statements > 0.
+      PgBouncer reescribe los nombres de las sentencias preparadas por protocolo y
+      las recrea en cada conexión del servidor; psycopg las libera con el mensaje
+      Close del protocolo (libpq >= 17), no con DEALLOCATE, que PgBouncer no admite
+    - transaccion: otro pooler en modo transacción (p. ej. Supavisor): sin preparar
+    """
+    umbral = settings.DB_PREPARAR_UMBRAL
+    modo = modo_pooler()
+    if umbral >= 0 and modo == "transaccion":
+        umbral = -1
+    elif umbral >= 0 and modo == "pgbouncer" and not capabilities.has_send_close_prepared():
+        logger.warning(
+            "DB_POOLER=pgbouncer requiere libpq >= 17 (Close por protocolo): "
+            "sentencias preparadas desactivadas"
+        )
+        umbral = -1
+    return {"prepare_threshold": None if umbral < 0 else umbral}
+
+
+def configurar_conexiones(engine):
+    """Leer uuid como str en cada conexión nueva del engine"""
+
+    @event.listens_for(engine, "connect")
+    def _registrar_loaders(conexion_dbapi, registro):
+        conexion_dbapi.adapters.register_loader("uuid", TextLoader)
+
+
+# ============================================
+# PROYECCIONES
+# ============================================
+
+COLUMNAS_USUARIO = ("id", "email", "nombre", "rol", "activo", "fecha_creacion")
+COLUMNAS_TICKET = (
+    "id", "usuario_id", "titulo", "descripcion", "estado", "prioridad",
+    "fecha_creacion", "fecha_actualizacion"
+)
+COLUMNAS_INTERACCION = ("id", "ticket_id", "usuario_id", "tipo", "contenido", "fecha_creacion")
+COLUMNAS_BUSQUEDA = COLUMNAS_TICKET + ("rango",)
+
+_USUARIO = ", ".join(COLUMNAS_USUARIO)
+_TICKET = ", ".join(COLUMNAS_TICKET)
+_INTERACCION = ", ".join(COLUMNAS_INTERACCION)
+
+
+def fila_usuario(fila) -> dict:
+    return dict(zip(COLUMNAS_USUARIO, fila))
+
+
+def fila_ticket(fila) -> dict:
+    return dict(zip(COLUMNAS_TICKET, fila))
+
+
+def fila_interaccion(fila) -> dict:
+    return dict(zip(COLUMNAS_INTERACCION, fila))
+
+
+def fila_busqueda(fila) -> dict:
+    return dict(zip(COLUMNAS_BUSQUEDA, fila))
+
+
+# ============================================
+# USUARIOS
+# ============================================
+
+SQL_USUARIO = text(f"SELECT {_USUARIO} FROM usuarios WHERE id = :id")
+
+SQL_USUARIOS_POR_IDS = text(f"SELECT {_USUARIO} FROM usuarios WHERE id = ANY(CAST(:ids AS UUID[]))")
+
+SQL_INSERTAR_USUARIO = text(f"""
+    INSERT INTO usuarios (email, nombre, rol)
+    VALUES (:email, :nombre, :rol)
+    RETURNING {_USUARIO}
+""")
+
+# Clave: ¿se filtra por activo?
+SQL_LISTAR_USUARIOS = {
+    False: text(f"""
+        SELECT {_USUARIO} FROM usuarios
+        ORDER BY fecha_creacion DESC LIMIT :limit OFFSET :skip
+    """),
+    True: text(f"""
+        SELECT {_USUARIO} FROM usuarios
+        WHERE activo = :activo
+        ORDER BY fecha_creacion DESC LIMIT :limit OFFSET :skip
+    """),
+}
+
+# ============================================
+# TICKETS
+# ============================================
+
+SQL_TICKET = text(f"SELECT {_TICKET} FROM tickets WHERE id = :id")
+
+SQL_TICKETS_POR_IDS = text(f"SELECT {_TICKET} FROM tickets WHERE id = ANY(CAST(:ids AS UUID[]))")
+
+SQL_EXISTE_TICKET = text("SELECT 1 FROM tickets WHERE id = :id")
+
+# Clave: ¿se filtra por estado?
+SQL_LISTAR_TICKETS = {
+    False: text(f"""
+        SELECT {_TICKET} FROM tickets
+        ORDER BY fecha_creacion DESC LIMIT :limit OFFSET :skip
+    """),
+    True: text(f"""
+        SELECT {_TICKET} FROM tickets
+        WHERE estado = :estado
+        ORDER BY fecha_creacion DESC LIMIT :limit OFFSET :skip
+    """),
+}
+
+SQL_INSERTAR_TICKET = text(f"""
+    INSERT INTO tickets (usuario_id, titulo, descripcion, prioridad)
+    VALUES (:usuario_id, :titulo, :descripcion, :prioridad)
+    RETURNING {_TICKET}
+""")
+
+SQL_INSERTAR_TICKETS_LOTE = text(f"""
+    INSERT INTO tickets (usuario_id, titulo, descripcion, prioridad)
+    SELECT *
+    FROM unnest(
+        CAST(:usuario_ids AS UUID[]),
+        CAST(:titulos AS TEXT[]),
+        CAST(:descripciones AS TEXT[]),
+        CAST(:prioridades AS TEXT[])
+    )
+    RETURNING {_TICKET}
+""")
+
+# UPDATE + interacción de cambio de estado en una sola sentencia (ver actualizar_estado_ticket).
+# `anterior` es la fila en la instantánea de la sentencia (sin lock explícito) y aporta el
+# estado anterior. Si otra transacción cambia el ticket mientras tanto, PostgreSQL reevalúa
+# el WHERE con la versión nueva de `t` pero la misma de `anterior`: las fechas ya no
+# coinciden y el UPDATE no afecta filas, así el estado anterior nunca está desactualizado
+SQL_ACTUALIZAR_ESTADO_TICKET = text("""
+    WITH actualizado AS (
+        UPDATE tickets t
+        SET estado = :estado, fecha_actualizacion = CURRENT_TIMESTAMP
+        FROM tickets anterior
+        WHERE t.id = :id
+          AND anterior.id = :id
+          AND t.fecha_actualizacion = anterior.fecha_actualizacion
+          AND (CAST(:version AS TIMESTAMPTZ) IS NULL
+               OR anterior.fecha_actualizacion = CAST(:version AS TIMESTAMPTZ))
+        RETURNING t.id, t.estado, t.fecha_actualizacion, anterior.estado AS estado_anterior
+    ), interaccion AS (
+        INSERT INTO interacciones (ticket_id, usuario_id, tipo, contenido)
+        SELECT id, :usuario_id, 'cambio_estado', :contenido
+        FROM actualizado
+    )
+    SELECT id, estado, fecha_actualizacion, estado_anterior FROM actualizado
+""")
+
+SQL_BUSCAR_TICKETS = text(f"""
+    WITH consulta AS (
+        SELECT websearch_to_tsquery('spanish', :q) AS q
+    ), coincidencias AS (
+        SELECT t.id, ts_rank(t.busqueda, consulta.q) AS rango
+        FROM tickets t, consulta
+        WHERE t.busqueda @@ consulta.q
+        UNION ALL
+        -- Las coincidencias en interacciones pesan la mitad que en el ticket
+        SELECT i.ticket_id, ts_rank(i.busqueda, consulta.q) * 0.5
+        FROM interacciones i, consulta
+        WHERE i.busqueda @@ consulta.q
+    ), ranking AS (
+        SELECT id, MAX(rango)::FLOAT8 AS rango
+        FROM coincidencias
+        GROUP BY id
+    )
+    SELECT {", ".join(f"t.{columna}" for columna in COLUMNAS_TICKET)}, r.rango
+    FROM ranking r
+    JOIN tickets t ON t.id = r.id
+    WHERE (CAST(:estado AS VARCHAR) IS NULL OR t.estado = :estado)
+      AND (CAST(:cursor_rango AS FLOAT8) IS NULL
+           OR (r.rango, t.id) < (CAST(:cursor_rango AS FLOAT8), CAST(:cursor_id AS UUID)))
+    ORDER BY r.rango DESC, t.id DESC
+    LIMIT :limite
+""")
+
+# Ticket + dueño + últimas interacciones (con nombre del autor) en una sola consulta.
+# El LATERAL usa idx por (ticket_id, fecha_creacion DESC) y la cota por la fecha
+# del ticket descarta particiones anteriores, igual que SQL_INTERACCIONES_TICKET.
+SQL_TICKET_DETALLE = text("""
+    SELECT json_build_object(
+        'ticket', json_build_object(
+            'id', t.id, 'usuario_id', t.usuario_id, 'titulo', t.titulo,
+            'descripcion', t.descripcion, 'estado', t.estado, 'prioridad', t.prioridad,
+            'fecha_creacion', t.fecha_creacion, 'fecha_actualizacion', t.fecha_actualizacion
+        ),
+        'usuario', json_build_object(
+            'id', u.id, 'email', u.email, 'nombre', u.nombre, 'rol', u.rol,
+            'activo', u.activo, 'fecha_creacion', u.fecha_creacion
+        ),
+        'interacciones', COALESCE(i.interacciones, '[]'::JSON)
+    )
+    FROM tickets t
+    JOIN usuarios u ON u.id = t.usuario_id
+    LEFT JOIN LATERAL (
+        SELECT json_agg(json_build_object(
+                   'id', x.id, 'ticket_id', x.ticket_id, 'usuario_id', x.usuario_id,
+                   'usuario_nombre', x.usuario_nombre, 'tipo', x.tipo,
+                   'contenido', x.contenido, 'fecha_creacion', x.fecha_creacion
+               ) ORDER BY x.fecha_creacion DESC) AS interacciones
+        FROM (
+            SELECT it.id, it.ticket_id, it.usuario_id, ui.nombre AS usuario_nombre,
+                   it.tipo, it.contenido, it.fecha_creacion
+            FROM interacciones it
+            LEFT JOIN usuarios ui ON ui.id = it.usuario_id
+            WHERE it.ticket_id = t.id
+              AND it.fecha_creacion >= t.fecha_creacion
+            ORDER BY it.fecha_creacion DESC
+            LIMIT :limite
+        ) x
+    ) i ON TRUE
+    WHERE t.id = :id
+""")
+
+# Campos del hash stats:tickets; la agregación vive en la función SQL compartida
+# con reconciliar_contadores del batch worker (database/08_estadisticas_diarias.sql)
+SQL_CONTADORES_TICKETS = text("SELECT campo, cantidad FROM contadores_tickets()")
+
+# ============================================
+# INTERACCIONES
+# ============================================
+
+# La cota por la fecha de creación del ticket no cambia el resultado, pero permite
+# descartar en ejecución las particiones mensuales anteriores al ticket
+SQL_INTERACCIONES_TICKET = text(f"""
+    SELECT {_INTERACCION}
+    FROM interacciones
+    WHERE ticket_id = :ticket_id
+      AND fecha_creacion >= (SELECT fecha_creacion FROM tickets WHERE id = :ticket_id)
+    ORDER BY fecha_creacion DESC
+    LIMIT 50
+""")
+
+SQL_INSERTAR_INTERACCION = text(f"""
+    INSERT INTO interacciones (ticket_id, usuario_id, tipo, contenido)
+    VALUES (:ticket_id, :usuario_id, :tipo, :contenido)
+    RETURNING {_INTERACCION}
+""")
+
+SQL_INSERTAR_INTERACCIONES_LOTE = text(f"""
+    INSERT INTO interacciones (ticket_id, usuario_id, tipo, contenido)
+    SELECT *
+    FROM unnest(
+        CAST(:ticket_ids AS UUID[]),
+        CAST(:usuario_ids AS UUID[]),
+        CAST(:tipos AS TEXT[]),
+        CAST(:contenidos AS TEXT[])
+    )
+    RETURNING {_INTERACCION}
+""")
@@ -0,0 +1,116 @@
+"""
+Difusión de eventos en tiempo real (Server-Sent Events)
+Una sola suscripción Redis por proceso repartida a todos los clientes conectados
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Optional, Set
+
+from redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+class Suscriptor:
+    """Cliente de GET /events: filtro de tickets y cola acotada de eventos pendientes"""
+
+    def __init__(self, ticket_ids: Optional[Set[str]], max_pendientes: int):
+        self.ticket_ids = ticket_ids
+        self.cola = asyncio.Queue(maxsize=max_pendientes)
+        self.motivo_cierre = None
+
+    def acepta(self, evento: dict) -> bool:
+        if not self.ticket_ids:
+            return True
+        # tickets_creados (POST /tickets/bulk) lleva los ids de todo el lote
+        return evento.get("ticket_id") in self.ticket_ids or not self.ticket_ids.isdisjoint(evento.get("ticket_ids", ()))
+
+class DifusorEventos:
+    """Escucha `canales` en un hilo y reparte cada evento a los suscriptores
+
+    La suscripción a Redis es bloqueante, así que vive en un hilo propio y
+    entrega los mensajes al event loop con call_soon_threadsafe. Si la cola
+    de un cliente se llena (no consume al ritmo de los eventos), se le cierra
+    el flujo en lugar de acumular memoria; EventSource reconecta solo.
+    """
+
+    def __init__(self, *canales: str, max_pendientes: int = 100, heartbeat_segundos: int = 15):
+        self.canales = canales
+        self.max_pendientes = max_pendientes
+        self.heartbeat = heartbeat_segundos
+        self._suscriptores: Set[Suscriptor] = set()
+        self._loop = None
+        self._activo = False
+
+    def iniciar(self):
+        """Arrancar el hilo de suscripción (llamar dentro del event loop)"""
+        self._loop = asyncio.get_running_loop()
+        self._activo = True
+        threading.Thread(target=self._escuchar, name="difusor-eventos", daemon=True).start()
+
+    def detener(self):
+        """Cerrar los flujos abiertos para que el servidor pueda apagarse"""
+        self._activo = False
+        for suscriptor in list(self._suscriptores):
+            self._cerrar(suscriptor, "apagado")
+
+    def suscribir(self, ticket_ids: Optional[Set[str]] = None) -> Suscriptor:
+        suscriptor = Suscriptor(ticket_ids, self.max_pendientes)
+        self._suscriptores.add(suscriptor)
+        return suscriptor
+
+    async def flujo(self, suscriptor: Suscriptor):
+        """Generador SSE de un suscriptor: eventos, heartbeats y evento de cierre"""
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                if suscriptor.motivo_cierre:
+                    yield f"event: cierre\ndata: {json.dumps({'motivo': suscriptor.motivo_cierre})}\n\n"
+                    return
+                try:
+                    evento = await asyncio.wait_for(suscriptor.cola.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    # Comentario SSE: mantiene viva la conexión a través de proxies
+                    yield ": heartbeat\n\n"
+                    continue
+                if evento is not None:
+                    yield f"event: {evento.get('evento', 'mensaje')}\ndata: {json.dumps(evento)}\n\n"
+        finally:
+            self._suscriptores.discard(suscriptor)
+
+    def _cerrar(self, suscriptor: Suscriptor, motivo: str):
+        self._suscriptores.discard(suscriptor)
+        suscriptor.motivo_cierre = motivo
+        # Despertar al generador si está esperando en la cola
+        try:
+            suscriptor.cola.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    def _escuchar(self):
+        while self._activo:
+            try:
+                for _, mensaje in redis_client.suscribir(*self.canales):
+                    if not self._activo:
+                        return
+                    self._loop.call_soon_threadsafe(self._repartir, mensaje)
+            except Exception as e:
+                logger.error(f"Suscripción de eventos interrumpida, reconectando: {str(e)}")
+            time.sleep(1)
+
+    def _repartir(self, mensaje: str):
+        try:
+            evento = json.loads(mensaje)
+        except ValueError:
+            return
+        for suscriptor in list(self._suscriptores):
+            if not suscriptor.acepta(evento):
+                continue
+            try:
+                suscriptor.cola.put_nowait(evento)
+            except asyncio.QueueFull:
+                logger.warning(f"Cliente de eventos descartado: {self.max_pendientes} eventos sin consumir")
+                self._cerrar(suscriptor, "cliente_lento")
@@ -3,27 +3,56 @@ FastAPI Server - Sistema de Tickets de Soporte
 FASE 2: Integración de Servicios
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
-from pydantic import BaseModel, EmailStr
+from prometheus_client import CONTENT_TYPE_LATEST
+from pydantic import BaseModel, EmailStr, ValidationError
 from typing import Optional, List
 from datetime import datetime, timezone
+import asyncio
+import base64
+import codecs
+import csv
+import hashlib
+import io
 import json
 import logging
+import time
+import uuid
 
 from config import settings
+from consultas import (
+    SQL_ACTUALIZAR_ESTADO_TICKET, SQL_BUSCAR_TICKETS, SQL_CONTADORES_TICKETS, SQL_EXISTE_TICKET,
+    SQL_INSERTAR_INTERACCION, SQL_INSERTAR_INTERACCIONES_LOTE, SQL_INSERTAR_TICKET, SQL_INSERTAR_TICKETS_LOTE,
+    SQL_INSERTAR_USUARIO, SQL_INTERACCIONES_TICKET, SQL_LISTAR_TICKETS, SQL_LISTAR_USUARIOS, SQL_TICKET,
+    SQL_TICKET_DETALLE, SQL_TICKETS_POR_IDS, SQL_USUARIO, SQL_USUARIOS_POR_IDS, argumentos_conexion,
+    configurar_conexiones, fila_busqueda, fila_interaccion, fila_ticket, fila_usuario, url_psycopg
+)
 from redis_client import redis_client
+from replicas import ENCABEZADO_CONSISTENCIA, EnrutadorLecturas
+from buffer_escritura import BufferEscritura
+from eventos import DifusorEventos
+from metricas import HTTP_DURACION, exponer_metricas, instrumentar_pool, registrar_cache, retirar_proceso
+from perfilado import RespuestaJSONPerfilada, perfilar_peticion, instrumentar_sql as perfilar_sql
+from trazas import cerrar_trazas, configurar_trazas, extraer_contexto, instrumentar_sql, inyectar_contexto, tracer
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+configurar_trazas("tickets-api")
+
 app = FastAPI(
     title="Sistema de Tickets de Soporte",
     description="API para gestión de tickets con FastAPI, Supabase y Redis",
-    version="1.0.0"
+    version="1.0.0",
+    # Con perfilado se mide la serialización JSON de cada respuesta
+    **({"default_response_class": RespuestaJSONPerfilada} if settings.PERFILADO_ACTIVO else {})
 )
 
 # Obtener orígenes CORS
@@ -42,6 +71,7 @@ if settings.CORS_ALLOW_ALL or "*" in cors_origins:
         allow_credentials=False,  # No se puede usar con allow_origins=["*"]
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Consistencia"],  # Token de lectura tras escritura (réplicas)
     )
 else:
     # Configuración normal: orígenes específicos + regex para vercel.app
@@ -60,9 +90,81 @@ else:
     )
 
 # Configuración de base de datos (Supabase)
-DATABASE_URL = settings.get_database_url()
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_size=5, max_overflow=10)
+# psycopg (v3): prepara en el servidor las consultas de consultas.py salvo detrás de un
+# pooler en modo transacción que no lo admita (DB_POOLER, ver argumentos_conexion)
+DATABASE_URL = url_psycopg(settings.get_database_url())
+engine = create_engine(
+    DATABASE_URL, pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW,
+    connect_args=argumentos_conexion()
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+configurar_conexiones(engine)
+instrumentar_pool(engine)
+instrumentar_sql(engine)
+perfilar_sql(engine)
+
+# Réplicas de lectura (SUPABASE_DB_REPLICA_URLS): los endpoints GET usan get_db_lectura
+enrutador_lecturas = EnrutadorLecturas(
+    SessionLocal, engine, [url_psycopg(url) for url in settings.get_replica_urls()],
+    settings.REPLICA_RETRASO_MAX_SEGUNDOS, settings.REPLICA_VERIFICAR_SEGUNDOS,
+    pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW, connect_args=argumentos_conexion()
+)
+for replica in enrutador_lecturas.replicas:
+    configurar_conexiones(replica.engine)
+    instrumentar_sql(replica.engine)
+    perfilar_sql(replica.engine)
+
+# ============================================
+# MÉTRICAS (Prometheus) Y TRAZAS (OpenTelemetry)
+# ============================================
+
+@app.middleware("http")
+async def medir_peticiones(request: Request, call_next):
+    """Latencia y span de servidor por ruta (plantilla, no URL concreta, para acotar la cardinalidad)
+
+    El span continúa un traceparent entrante y es el padre de los spans de
+    Redis y SQL del handler. Si el framework ya abrió un span de servidor
+    (FastAPI con telemetría integrada), este queda anidado en él. En
+    respuestas en streaming (/events, /export/*) se mide hasta enviar los
+    encabezados.
+    """
+    inicio = time.perf_counter()
+    estado = 500
+    anidado = trace.get_current_span().get_span_context().is_valid
+    with tracer.start_as_current_span(
+        request.method,
+        context=None if anidado else extraer_contexto(request.headers),
+        kind=SpanKind.INTERNAL if anidado else SpanKind.SERVER
+    ) as span:
+        try:
+            response = await call_next(request)
+            estado = response.status_code
+            return response
+        finally:
+            ruta = request.scope.get("route")
+            plantilla = ruta.path if ruta else "sin_ruta"
+            span.update_name(f"{request.method} {plantilla}")
+            span.set_attribute("http.route", plantilla)
+            span.set_attribute("http.response.status_code", estado)
+            HTTP_DURACION.labels(request.method, plantilla, str(estado)).observe(time.perf_counter() - inicio)
+
+# Perfilado (PERFILADO_ACTIVO): registrado después, envuelve también a medir_peticiones
+if settings.PERFILADO_ACTIVO:
+    app.middleware("http")(perfilar_peticion)
+
+@app.get("/metrics", include_in_schema=False)
+async def metricas():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(exponer_metricas(), media_type=CONTENT_TYPE_LATEST)
+
+@app.on_event("shutdown")
+async def exportar_trazas_pendientes():
+    cerrar_trazas()
+
+@app.on_event("shutdown")
+async def retirar_metricas_proceso():
+    retirar_proceso()
 
 # Dependencia para obtener sesión de BD
 def get_db():
@@ -72,6 +174,46 @@ def get_db():
     finally:
         db.close()
 
+def get_db_lectura(request: Request):
+    """Sesión para endpoints de solo lectura: una réplica al día con el X-Consistencia del cliente, o la primaria"""
+    db = enrutador_lecturas.sesion(request.headers.get(ENCABEZADO_CONSISTENCIA))
+    try:
+        yield db
+    finally:
+        db.close()
+
+@app.middleware("http")
+async def anotar_consistencia(request: Request, call_next):
+    """Con réplicas, las escrituras responden con el LSN de la primaria (X-Consistencia)
+
+    El cliente lo reenvía en las lecturas siguientes para leer lo que acaba
+    de escribir aunque la réplica vaya retrasada.
+    """
+    response = await call_next(request)
+    if enrutador_lecturas.replicas and request.method in ("POST", "PUT", "PATCH", "DELETE") \
+            and response.status_code < 400:
+        try:
+            response.headers[ENCABEZADO_CONSISTENCIA] = enrutador_lecturas.lsn_primaria()
+        except Exception as e:
+            logger.warning(f"No se pudo obtener el LSN de la primaria: {str(e)}")
+    return response
+
+@app.on_event("startup")
+async def iniciar_replicas():
+    enrutador_lecturas.iniciar()
+
+@app.on_event("shutdown")
+async def detener_replicas():
+    enrutador_lecturas.detener()
+
+def _json_cache(valor) -> str:
+    """Serializar para Redis con fechas ISO 8601, igual que las respuestas de FastAPI
+
+    Así un acierto de caché devuelve exactamente lo mismo que la respuesta
+    original en los endpoints sin response_model (listados, búsqueda).
+    """
+    return json.dumps(valor, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+
 # ============================================
 # MODELOS PYDANTIC
 # ============================================
@@ -124,36 +266,27 @@ class InteraccionResponse(BaseModel):
 # ============================================
 
 @app.get("/usuarios/{usuario_id}", response_model=UsuarioResponse)
-async def obtener_usuario(usuario_id: str, db: Session = Depends(get_db)):
+async def obtener_usuario(usuario_id: str, db: Session = Depends(get_db_lectura)):
     """Obtener usuario con caché Redis"""
     
     # Intentar obtener de caché
     cache_key = f"usuario:{usuario_id}:datos"
     cached = redis_client.get(cache_key)
+    registrar_cache("usuario", bool(cached), not cached)
     
     if cached:
         return json.loads(cached)
     
     # Consultar base de datos
-    result = db.execute(
-        text("SELECT id, email, nombre, rol, activo, fecha_creacion FROM usuarios WHERE id = :id"),
-        {"id": usuario_id}
-    ).fetchone()
+    result = db.execute(SQL_USUARIO, {"id": usuario_id}).fetchone()
     
     if not result:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
-    usuario = {
-        "id": str(result[0]),
-        "email": result[1],
-        "nombre": result[2],
-        "rol": result[3],
-        "activo": result[4],
-        "fecha_creacion": result[5]
-    }
+    usuario = fila_usuario(result)
     
     # Almacenar en caché con TTL de 1 hora
-    redis_client.setex(cache_key, 3600, json.dumps(usuario, default=str))
+    redis_client.setex(cache_key, 3600, _json_cache(usuario))
     
     return usuario
 
@@ -162,28 +295,20 @@ async def crear_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
     """Crear nuevo usuario"""
     
     result = db.execute(
-        text("""
-            INSERT INTO usuarios (email, nombre, rol)
-            VALUES (:email, :nombre, :rol)
-            RETURNING id, email, nombre, rol, activo, fecha_creacion
-        """),
+        SQL_INSERTAR_USUARIO,
         {"email": usuario.email, "nombre": usuario.nombre, "rol": usuario.rol}
     ).fetchone()
     
     db.commit()
     
-    nuevo_usuario = {
-        "id": str(result[0]),
-        "email": result[1],
-        "nombre": result[2],
-        "rol": result[3],
-        "activo": result[4],
-        "fecha_creacion": result[5]
-    }
+    nuevo_usuario = fila_usuario(result)
     
-    # Invalidar caché si existe
+    # Invalidar caché si existe y los listados donde aparece el usuario
     cache_key = f"usuario:{nuevo_usuario['id']}:datos"
-    redis_client.delete(cache_key)
+    redis_client.pipeline(
+        [["DEL", cache_key]]
+        + _comandos_invalidar_etiquetas("usuarios:todos", f"usuarios:activo:{str(nuevo_usuario['activo']).lower()}")
+    )
     
     return nuevo_usuario
 
@@ -191,57 +316,149 @@ async def crear_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
 # ENDPOINTS - TICKETS
 # ============================================
 
+# ============================================
+# BÚSQUEDA DE TEXTO COMPLETO
+# ============================================
+# Definido antes de /tickets/{ticket_id} para que "search" no se tome como id
+
+def _codificar_cursor(rango: float, ticket_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rango, ticket_id]).encode()).decode()
+
+def _decodificar_cursor(cursor: str) -> tuple:
+    try:
+        rango, ticket_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        # Un cursor manipulado no debe llegar a PostgreSQL (CAST a UUID -> 500)
+        return float(rango), str(uuid.UUID(ticket_id))
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Cursor de búsqueda no válido")
+
+@app.get("/tickets/search")
+async def buscar_tickets(
+    q: str = Query(..., min_length=2, max_length=200),
+    estado: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db_lectura)
+):
+    """Buscar tickets por texto en título, descripción e interacciones
+
+    Resultados ordenados por relevancia con paginación keyset: `siguiente`
+    es el cursor a enviar para obtener la página siguiente. Las respuestas
+    se cachean BUSQUEDA_CACHE_TTL segundos, así que las búsquedas populares
+    no vuelven a PostgreSQL mientras el caché esté vigente.
+    """
+    
+    q = " ".join(q.lower().split())
+    cursor_rango, cursor_id = _decodificar_cursor(cursor) if cursor else (None, None)
+    
+    # Intentar obtener de caché
+    cache_key = "busqueda:tickets:" + hashlib.sha1(
+        json.dumps([q, estado, limit, cursor]).encode()
+    ).hexdigest()
+    cached = redis_client.get(cache_key)
+    registrar_cache("busqueda", bool(cached), not cached)
+    
+    if cached:
+        return json.loads(cached)
+    
+    result = db.execute(
+        SQL_BUSCAR_TICKETS,
+        {
+            "q": q,
+            "estado": estado,
+            "cursor_rango": cursor_rango,
+            "cursor_id": cursor_id,
+            "limite": limit
+        }
+    ).fetchall()
+    
+    resultados = [fila_busqueda(row) for row in result]
+    
+    respuesta = {
+        "resultados": resultados,
+        "siguiente": _codificar_cursor(result[-1][8], result[-1][0]) if len(result) == limit else None
+    }
+    
+    redis_client.setex(cache_key, settings.BUSQUEDA_CACHE_TTL, _json_cache(respuesta))
+    
+    return respuesta
+
 @app.get("/tickets/{ticket_id}", response_model=TicketResponse)
-async def obtener_ticket(ticket_id: str, db: Session = Depends(get_db)):
+async def obtener_ticket(ticket_id: str, db: Session = Depends(get_db_lectura)):
     """Obtener ticket con caché Redis"""
     
     # Intentar obtener de caché
     cache_key = f"ticket:{ticket_id}:completo"
     cached = redis_client.get(cache_key)
+    registrar_cache("ticket", bool(cached), not cached)
     
     if cached:
         return json.loads(cached)
     
     # Consultar base de datos
-    result = db.execute(
-        text("""
-            SELECT id, usuario_id, titulo, descripcion, estado, prioridad, 
-                   fecha_creacion, fecha_actualizacion
-            FROM tickets WHERE id = :id
-        """),
-        {"id": ticket_id}
-    ).fetchone()
+    result = db.execute(SQL_TICKET, {"id": ticket_id}).fetchone()
     
     if not result:
         raise HTTPException(status_code=404, detail="Ticket no encontrado")
     
-    ticket = {
-        "id": str(result[0]),
-        "usuario_id": str(result[1]),
-        "titulo": result[2],
-        "descripcion": result[3],
-        "estado": result[4],
-        "prioridad": result[5],
-        "fecha_creacion": result[6],
-        "fecha_actualizacion": result[7]
-    }
+    ticket = fila_ticket(result)
     
     # Almacenar en caché con TTL de 15 minutos
-    redis_client.setex(cache_key, 900, json.dumps(ticket, default=str))
+    redis_client.setex(cache_key, 900, _json_cache(ticket))
     
     return ticket
 
+def _claves_cache_ticket(ticket_id: str) -> list:
+    """Claves de caché que dependen del ticket o de sus interacciones"""
+    return [f"ticket:{ticket_id}:completo", f"ticket:{ticket_id}:detalle"]
+
+@app.get("/tickets/{ticket_id}/full")
+async def obtener_ticket_completo(
+    ticket_id: str,
+    interacciones: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db_lectura)
+):
+    """Obtener ticket, dueño y últimas `interacciones` en una sola llamada
+
+    Se cachea como un valor compuesto: un hash ticket:{id}:detalle con un
+    campo por límite pedido, así cualquier escritura sobre el ticket o sus
+    interacciones lo invalida con un solo DEL. El TTL cuenta desde el primer
+    campo: ningún campo vive más de 5 minutos.
+    """
+    
+    # Intentar obtener de caché
+    cache_key = f"ticket:{ticket_id}:detalle"
+    cached = redis_client.hget(cache_key, str(interacciones))
+    registrar_cache("ticket_detalle", bool(cached), not cached)
+    
+    if cached:
+        return json.loads(cached)
+    
+    result = db.execute(SQL_TICKET_DETALLE, {"id": ticket_id, "limite": interacciones}).fetchone()
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="Ticket no encontrado")
+    
+    detalle = result[0]
+    
+    # Almacenar en caché con TTL de 5 minutos (acota datos del usuario desactualizados).
+    # El TTL se fija solo al crear el hash: renovarlo en cada campo nuevo alargaría la
+    # vida de los campos anteriores (EXPIRE ... NX requiere Redis 7)
+    resultado = redis_client.pipeline([
+        ["HSET", cache_key, str(interacciones), json.dumps(detalle)],
+        ["TTL", cache_key]
+    ])
+    if resultado[1] == -1:
+        redis_client.pipeline([["EXPIRE", cache_key, 300]])
+    
+    return detalle
+
 @app.post("/tickets", response_model=TicketResponse)
 async def crear_ticket(ticket: TicketCreate, db: Session = Depends(get_db)):
     """Crear nuevo ticket y enviar tarea a cola de batch"""
     
     result = db.execute(
-        text("""
-            INSERT INTO tickets (usuario_id, titulo, descripcion, prioridad)
-            VALUES (:usuario_id, :titulo, :descripcion, :prioridad)
-            RETURNING id, usuario_id, titulo, descripcion, estado, prioridad, 
-                      fecha_creacion, fecha_actualizacion
-        """),
+        SQL_INSERTAR_TICKET,
         {
             "usuario_id": ticket.usuario_id,
             "titulo": ticket.titulo,
@@ -252,16 +469,7 @@ async def crear_ticket(ticket: TicketCreate, db: Session = Depends(get_db)):
     
     db.commit()
     
-    nuevo_ticket = {
-        "id": str(result[0]),
-        "usuario_id": str(result[1]),
-        "titulo": result[2],
-        "descripcion": result[3],
-        "estado": result[4],
-        "prioridad": result[5],
-        "fecha_creacion": result[6],
-        "fecha_actualizacion": result[7]
-    }
+    nuevo_ticket = fila_ticket(result)
     
     # Enviar tarea a cola de batch worker
     tarea = {
@@ -269,7 +477,7 @@ async def crear_ticket(ticket: TicketCreate, db: Session = Depends(get_db)):
         "ticket_id": nuevo_ticket["id"],
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
-    redis_client.rpush("cola:batch:procesar", json.dumps(tarea))
+    redis_client.rpush("cola:batch:procesar", json.dumps(inyectar_contexto(tarea)))
     
     # Publicar evento
     evento = {
@@ -279,129 +487,755 @@ async def crear_ticket(ticket: TicketCreate, db: Session = Depends(get_db)):
     }
     redis_client.publish("canal:batch:eventos", json.dumps(evento))
     
+    # Actualizar contadores del dashboard e invalidar listados afectados
+    redis_client.pipeline(
+        _comandos_contadores({
+            "total": 1,
+            f"estado:{nuevo_ticket['estado']}": 1,
+            f"prioridad:{nuevo_ticket['prioridad']}": 1
+        })
+        + _comandos_invalidar_etiquetas("tickets:todos", f"tickets:estado:{nuevo_ticket['estado']}")
+    )
+    
     return nuevo_ticket
 
+# ============================================
+# CARGA MASIVA DE TICKETS
+# ============================================
+
+def _describir_error_validacion(error: ValidationError) -> str:
+    """Resumir errores de Pydantic en una línea"""
+    return "; ".join(
+        f"{'.'.join(str(p) for p in e['loc']) or 'item'}: {e['msg']}" for e in error.errors()
+    )
+
+# Tamaño máximo de un elemento (o línea NDJSON) pendiente de completar; evita
+# acumular el resto del cuerpo cuando un elemento nunca se cierra
+MAX_CARACTERES_ELEMENTO = 1_000_000
+
+async def _leer_items_json(request: Request):
+    """Iterar los objetos de un cuerpo JSON array o NDJSON sin cargarlo completo en memoria
+
+    Los elementos que no se pueden parsear se entregan como instancias de
+    ValueError para que el llamador los reporte por fila. Si lo que falla es la
+    estructura del array (falta una coma, un elemento nunca se cierra) se
+    entrega un ValueError y se deja de leer.
+    """
+    content_type = request.headers.get("content-type", "")
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        async for chunk in request.stream():
+            texto = utf8.decode(chunk)
+            if "\n" not in texto:
+                buffer += texto
+                if len(buffer) > MAX_CARACTERES_ELEMENTO:
+                    yield ValueError(f"Línea de más de {MAX_CARACTERES_ELEMENTO} caracteres")
+                    return
+                continue
+            *lineas, resto = (buffer + texto).split("\n")
+            buffer = resto
+            for linea in lineas:
+                if linea.strip():
+                    try:
+                        yield json.loads(linea)
+                    except json.JSONDecodeError as e:
+                        yield ValueError(f"JSON inválido: {e.msg}")
+        buffer += utf8.decode(b"", final=True)
+        if buffer.strip():
+            try:
+                yield json.loads(buffer)
+            except json.JSONDecodeError as e:
+                yield ValueError(f"JSON inválido: {e.msg}")
+        return
+    
+    # JSON array: cada elemento se delimita con un escaneo incremental (profundidad,
+    # strings y escapes) que continúa donde quedó en el chunk anterior, y se decodifica
+    # una sola vez cuando está completo. Entre elementos se exige ',' o ']'.
+    estado = "inicio"  # inicio | primero | valor | elemento | separador | fin
+    inicio = pos = 0
+    profundidad = 0
+    en_string = escape = False
+    async for chunk in request.stream():
+        buffer += utf8.decode(chunk)
+        while estado != "fin":
+            if estado != "elemento":
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                caracter = buffer[pos]
+                if estado == "inicio":
+                    if caracter != "[":
+                        raise HTTPException(status_code=400, detail="Se esperaba un JSON array o NDJSON")
+                    estado = "primero"
+                    pos += 1
+                elif caracter == "]" and estado in ("primero", "separador"):
+                    estado = "fin"
+                elif estado == "separador":
+                    if caracter != ",":
+                        yield ValueError("JSON array mal formado: se esperaba ',' o ']' entre elementos")
+                        return
+                    estado = "valor"
+                    pos += 1
+                else:
+                    estado = "elemento"
+                    inicio = pos
+                continue
+            
+            completo = False
+            while pos < len(buffer) and not completo:
+                caracter = buffer[pos]
+                if en_string:
+                    if escape:
+                        escape = False
+                    elif caracter == "\\":
+                        escape = True
+                    elif caracter == '"':
+                        en_string = False
+                        completo = profundidad == 0
+                elif caracter == '"':
+                    en_string = True
+                elif caracter in "{[":
+                    profundidad += 1
+                elif caracter in "}]" and profundidad > 0:
+                    profundidad -= 1
+                    completo = profundidad == 0
+                elif profundidad == 0 and (caracter in ",]" or caracter.isspace()):
+                    break  # Fin de un número/literal: el separador no es parte del elemento
+                pos += 1
+            if not completo and (pos >= len(buffer) or pos == inicio):
+                if pos - inicio > MAX_CARACTERES_ELEMENTO:
+                    yield ValueError(f"Elemento de más de {MAX_CARACTERES_ELEMENTO} caracteres sin cerrar")
+                    return
+                if pos == inicio:
+                    yield ValueError("JSON array mal formado: elemento vacío")
+                    return
+                break  # Elemento incompleto: esperar más datos
+            try:
+                yield json.loads(buffer[inicio:pos])
+            except json.JSONDecodeError as e:
+                yield ValueError(f"JSON inválido: {e.msg}")
+            estado = "separador"
+        
+        # Descartar lo ya procesado (se conserva el elemento en curso)
+        corte = inicio if estado == "elemento" else pos
+        buffer = buffer[corte:]
+        pos -= corte
+        inicio -= corte
+    
+    if estado not in ("fin", "inicio") or (estado == "inicio" and buffer.strip()):
+        yield ValueError("JSON array incompleto o mal formado")
+
+def _insertar_lote_tickets(db: Session, lote: list) -> list:
+    """Insertar un lote de tickets con un único INSERT multi-fila, confirmar y encolar sus tareas
+
+    Si el INSERT del lote falla (p. ej. un usuario_id inexistente), se reintenta
+    fila por fila con SAVEPOINT para reportar el error exacto de cada una.
+    """
+    resultados = []
+    creados = []
+    
+    try:
+        # INSERT ... SELECT FROM unnest devuelve las filas en el orden de los arrays
+        rows = db.execute(
+            SQL_INSERTAR_TICKETS_LOTE,
+            {
+                "usuario_ids": [t.usuario_id for _, t in lote],
+                "titulos": [t.titulo for _, t in lote],
+                "descripciones": [t.descripcion for _, t in lote],
+                "prioridades": [t.prioridad for _, t in lote]
+            }
+        ).fetchall()
+        db.commit()
+        creados = list(zip((indice for indice, _ in lote), rows))
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Lote de {len(lote)} tickets falló, reintentando fila por fila: {getattr(e, 'orig', e)}")
+        for indice, ticket in lote:
+            try:
+                with db.begin_nested():
+                    row = db.execute(SQL_INSERTAR_TICKET, ticket.model_dump()).fetchone()
+                creados.append((indice, row))
+            except Exception as e_fila:
+                error = getattr(e_fila, "orig", e_fila)
+                resultados.append({"indice": indice, "error": str(error).strip().splitlines()[0]})
+        db.commit()
+    
+    if not creados:
+        return resultados
+    
+    # Encolar tareas y publicar un solo evento del lote en un solo round-trip
+    # (un evento por ticket provocaba una recarga del listado por ticket en cada cliente)
+    ahora = datetime.now(timezone.utc).isoformat()
+    tareas = [
+        json.dumps(inyectar_contexto({"tipo": "notificar_ticket_creado", "ticket_id": row[0], "timestamp": ahora}))
+        for _, row in creados
+    ]
+    evento = {
+        "evento": "tickets_creados",
+        "ticket_ids": [row[0] for _, row in creados],
+        "cantidad": len(creados),
+        "timestamp": ahora
+    }
+    comandos = [["RPUSH", "cola:batch:procesar", *tareas]]
+    comandos.append(["PUBLISH", "canal:batch:eventos", json.dumps(evento)])
+    deltas = {"total": len(creados)}
+    for _, row in creados:
+        deltas[f"estado:{row[4]}"] = deltas.get(f"estado:{row[4]}", 0) + 1
+        deltas[f"prioridad:{row[5]}"] = deltas.get(f"prioridad:{row[5]}", 0) + 1
+    comandos += _comandos_contadores(deltas)
+    comandos += _comandos_invalidar_etiquetas(
+        "tickets:todos", *(f"tickets:estado:{estado}" for estado in {row[4] for _, row in creados})
+    )
+    redis_client.pipeline(comandos)
+    
+    resultados.extend({"indice": indice, "id": row[0]} for indice, row in creados)
+    return resultados
+
+@app.post("/tickets/bulk")
+async def crear_tickets_bulk(request: Request, db: Session = Depends(get_db)):
+    """Crear tickets en lote desde un JSON array o NDJSON (application/x-ndjson)
+
+    Valida cada elemento a medida que llega, inserta y confirma por lotes de
+    BULK_CHUNK_SIZE filas y devuelve el resultado de cada fila por su índice.
+    """
+    resultados = []
+    lote = []
+    total = 0
+    
+    async for item in _leer_items_json(request):
+        if isinstance(item, ValueError):
+            resultados.append({"indice": total, "error": str(item)})
+        else:
+            try:
+                lote.append((total, TicketCreate.model_validate(item)))
+            except ValidationError as e:
+                resultados.append({"indice": total, "error": _describir_error_validacion(e)})
+        total += 1
+        
+        if len(lote) >= settings.BULK_CHUNK_SIZE:
+            resultados.extend(await asyncio.to_thread(_insertar_lote_tickets, db, lote))
+            lote = []
+    
+    if lote:
+        resultados.extend(await asyncio.to_thread(_insertar_lote_tickets, db, lote))
+    
+    resultados.sort(key=lambda r: r["indice"])
+    errores = sum(1 for r in resultados if "error" in r)
+    
+    return {
+        "total": total,
+        "creados": total - errores,
+        "errores": errores,
+        "resultados": resultados
+    }
+
 @app.patch("/tickets/{ticket_id}/estado")
 async def actualizar_estado_ticket(
     ticket_id: str,
     nuevo_estado: str,
     usuario_id: str,
+    version: Optional[datetime] = None,
     db: Session = Depends(get_db)
 ):
-    """Actualizar estado de ticket con transacción y control de concurrencia"""
+    """Actualizar estado de ticket con control de concurrencia optimista
+
+    UPDATE e INSERT de la interacción viajan en una sola sentencia (CTE), sin
+    SELECT ... FOR UPDATE. Si se envía `version` (el `fecha_actualizacion`
+    leído por el cliente), el UPDATE solo aplica si el ticket no cambió desde
+    entonces; en caso contrario se responde 409.
+    """
     
     try:
-        # Iniciar transacción con bloqueo pesimista
-        db.execute(
-            text("SELECT * FROM tickets WHERE id = :id FOR UPDATE"),
-            {"id": ticket_id}
-        )
-        
-        # Actualizar estado
-        result = db.execute(
-            text("""
-                UPDATE tickets 
-                SET estado = :estado, fecha_actualizacion = CURRENT_TIMESTAMP
-                WHERE id = :id
-                RETURNING id, estado
-            """),
-            {"id": ticket_id, "estado": nuevo_estado}
-        ).fetchone()
+        # Sin `version` no se pidió detectar conflictos: si otra transacción cambió el
+        # ticket durante la sentencia (0 filas), se reintenta sobre la fila nueva
+        for _ in range(1 if version is not None else 3):
+            result = db.execute(
+                SQL_ACTUALIZAR_ESTADO_TICKET,
+                {
+                    "id": ticket_id,
+                    "estado": nuevo_estado,
+                    "version": version,
+                    "usuario_id": usuario_id,
+                    "contenido": f"Estado actualizado a {nuevo_estado}"
+                }
+            ).fetchone()
+            if result:
+                break
+            db.rollback()
         
         if not result:
             db.rollback()
-            raise HTTPException(status_code=404, detail="Ticket no encontrado")
-        
-        # Registrar interacción
-        db.execute(
-            text("""
-                INSERT INTO interacciones (ticket_id, usuario_id, tipo, contenido)
-                VALUES (:ticket_id, :usuario_id, 'cambio_estado', :contenido)
-            """),
-            {
-                "ticket_id": ticket_id,
-                "usuario_id": usuario_id,
-                "contenido": f"Estado actualizado a {nuevo_estado}"
-            }
-        )
+            # Distinguir ticket inexistente de conflicto de versión (solo en el camino de error)
+            existe = db.execute(SQL_EXISTE_TICKET, {"id": ticket_id}).fetchone()
+            if not existe:
+                raise HTTPException(status_code=404, detail="Ticket no encontrado")
+            raise HTTPException(
+                status_code=409,
+                detail="El ticket fue modificado por otra transacción; recarga y reintenta"
+            )
         
         db.commit()
         
         # Invalidar caché
-        redis_client.delete(f"ticket:{ticket_id}:completo")
+        redis_client.delete(*_claves_cache_ticket(ticket_id))
         
-        return {"mensaje": "Estado actualizado correctamente", "estado": result[1]}
+        # Publicar evento y mover el ticket entre contadores de estado
+        evento = {
+            "evento": "ticket_actualizado",
+            "ticket_id": ticket_id,
+            "estado": result[1],
+            "version": result[2].isoformat(),
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+        comandos = [["PUBLISH", "canal:batch:eventos", json.dumps(evento)]]
+        if result[3] != result[1]:
+            comandos += _comandos_contadores({
+                f"estado:{result[3]}": -1,
+                f"estado:{result[1]}": 1
+            })
+        # fecha_actualizacion cambia siempre; el estado, en sus dos listados
+        comandos += _comandos_invalidar_etiquetas(
+            "tickets:todos", f"tickets:estado:{result[3]}", f"tickets:estado:{result[1]}"
+        )
+        redis_client.pipeline(comandos)
         
+        return {
+            "mensaje": "Estado actualizado correctamente",
+            "estado": result[1],
+            "version": result[2]
+        }
+        
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error en transacción: {str(e)}")
 
+# ============================================
+# PRECALENTAMIENTO DE CACHÉ
+# ============================================
+
+@app.on_event("startup")
+async def reenviar_spool_redis():
+    """Reenviar en segundo plano lo que quedó en el spool de Redis (ejecución anterior u otro proceso)"""
+    redis_client.reenviar_pendientes()
+
+@app.on_event("startup")
+async def solicitar_precalentamiento_cache():
+    """Encolar precalentar_cache para el batch worker al iniciar (tras un deploy)
+
+    Con varias instancias o procesos solo el primero la encola: SET NX con
+    ventana de 5 minutos. No bloquea el arranque si Redis no responde.
+    """
+    if not settings.CALENTAR_CACHE_AL_INICIAR:
+        return
+    try:
+        ahora = datetime.now(timezone.utc).isoformat()
+        resultado = redis_client.pipeline([
+            ["SET", "batch:calentamiento:solicitado", ahora, "NX", "EX", 300]
+        ])[0]
+        if resultado and not isinstance(resultado, Exception):
+            redis_client.rpush(
+                "cola:batch:procesar",
+                json.dumps(inyectar_contexto({"tipo": "precalentar_cache", "timestamp": ahora}))
+            )
+            logger.info("Precalentamiento de caché encolado para el batch worker")
+    except Exception as e:
+        logger.warning(f"No se pudo encolar el precalentamiento de caché: {str(e)}")
+
+# ============================================
+# ENDPOINTS - EVENTOS EN TIEMPO REAL
+# ============================================
+
+# Una sola suscripción a canal:batch:eventos por proceso, repartida a los clientes SSE
+difusor_eventos = DifusorEventos(
+    "canal:batch:eventos",
+    max_pendientes=settings.EVENTOS_MAX_PENDIENTES,
+    heartbeat_segundos=settings.EVENTOS_HEARTBEAT_SEGUNDOS
+)
+
+@app.on_event("startup")
+async def iniciar_difusor_eventos():
+    difusor_eventos.iniciar()
+
+@app.on_event("shutdown")
+async def detener_difusor_eventos():
+    difusor_eventos.detener()
+
+@app.get("/events")
+async def flujo_eventos(ticket_id: Optional[List[str]] = Query(None)):
+    """Server-Sent Events con los cambios de tickets e interacciones
+
+    Emite ticket_creado, tickets_creados (un evento por lote de POST
+    /tickets/bulk), ticket_actualizado e interaccion_creada. Con uno o
+    más `ticket_id` solo se reciben los eventos de esos tickets.
+    """
+    suscriptor = difusor_eventos.suscribir(set(ticket_id) if ticket_id else None)
+    return StreamingResponse(
+        difusor_eventos.flujo(suscriptor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ============================================
+# ENDPOINTS - ESTADÍSTICAS
+# ============================================
+
+# Hash con los contadores del dashboard: total, estado:<estado>, prioridad:<prioridad>
+CLAVE_STATS_TICKETS = "stats:tickets"
+
+def _comandos_contadores(deltas: dict) -> list:
+    """Comandos HINCRBY sobre el hash de contadores para cada delta distinto de cero"""
+    return [
+        ["HINCRBY", CLAVE_STATS_TICKETS, campo, delta]
+        for campo, delta in deltas.items() if delta
+    ]
+
+def _formatear_contadores(campos: dict) -> dict:
+    stats = {
+        "total": 0,
+        "por_estado": {},
+        "por_prioridad": {},
+        "reconciliado_en": campos.get("reconciliado_en")
+    }
+    for campo, valor in campos.items():
+        if campo == "total":
+            stats["total"] = int(valor)
+        elif campo.startswith("estado:"):
+            stats["por_estado"][campo.split(":", 1)[1]] = int(valor)
+        elif campo.startswith("prioridad:"):
+            stats["por_prioridad"][campo.split(":", 1)[1]] = int(valor)
+    return stats
+
+def _reconstruir_contadores(db: Session) -> dict:
+    """Recalcular los contadores desde estadisticas_diarias y reemplazar el hash
+
+    Misma consulta (función contadores_tickets) que reconciliar_contadores
+    del batch worker. Se escribe en una clave temporal y se hace RENAME para
+    que los lectores nunca vean un hash a medio construir.
+    """
+    campos = {"total": 0, **dict(db.execute(SQL_CONTADORES_TICKETS).fetchall())}
+    campos["reconciliado_en"] = datetime.now(timezone.utc).isoformat()
+    
+    temporal = f"{CLAVE_STATS_TICKETS}:tmp"
+    redis_client.pipeline([
+        ["DEL", temporal],
+        ["HSET", temporal, *(v for par in campos.items() for v in par)],
+        ["RENAME", temporal, CLAVE_STATS_TICKETS]
+    ])
+    return campos
+
+@app.get("/stats/tickets")
+async def estadisticas_tickets(db: Session = Depends(get_db_lectura)):
+    """Contadores de tickets por estado y prioridad servidos desde un hash de Redis
+
+    crear_ticket y actualizar_estado_ticket los mantienen con HINCRBY y el
+    batch worker los reconcilia periódicamente con PostgreSQL. Si el hash
+    no existe (nunca reconciliado), se reconstruye desde estadisticas_diarias.
+    """
+    campos = redis_client.hgetall(CLAVE_STATS_TICKETS)
+    frio = not campos or "reconciliado_en" not in campos
+    registrar_cache("stats", not frio, frio)
+    
+    if frio:
+        campos = _reconstruir_contadores(db)
+    
+    return _formatear_contadores(campos)
+
 # ============================================
 # ENDPOINTS - INTERACCIONES
 # ============================================
 
 @app.get("/tickets/{ticket_id}/interacciones", response_model=List[InteraccionResponse])
-async def obtener_interacciones(ticket_id: str, db: Session = Depends(get_db)):
-    """Obtener interacciones de un ticket (optimizado con índice compuesto)"""
+async def obtener_interacciones(ticket_id: str, db: Session = Depends(get_db_lectura)):
+    """Obtener interacciones de un ticket (optimizado con índice compuesto)
+
+    El límite inferior por la fecha de creación del ticket no cambia el
+    resultado, pero permite descartar en ejecución las particiones mensuales
+    anteriores al ticket (ver database/06_particionamiento_interacciones.sql).
+    """
     
-    result = db.execute(
-        text("""
-            SELECT id, ticket_id, usuario_id, tipo, contenido, fecha_creacion
-            FROM interacciones
-            WHERE ticket_id = :ticket_id
-            ORDER BY fecha_creacion DESC
-            LIMIT 50
-        """),
-        {"ticket_id": ticket_id}
-    ).fetchall()
+    result = db.execute(SQL_INTERACCIONES_TICKET, {"ticket_id": ticket_id}).fetchall()
     
-    interacciones = [
-        {
-            "id": row[0],
-            "ticket_id": str(row[1]),
-            "usuario_id": str(row[2]) if row[2] else None,
-            "tipo": row[3],
-            "contenido": row[4],
-            "fecha_creacion": row[5]
-        }
-        for row in result
-    ]
+    interacciones = [fila_interaccion(row) for row in result]
     
     return interacciones
 
+def _insertar_interacciones(db: Session, lote: List[InteraccionCreate]) -> list:
+    """Insertar interacciones con un único INSERT multi-fila en una transacción
+
+    Devuelve una lista alineada con `lote`: la fila insertada o la excepción
+    de esa fila. Si el lote falla, se reintenta fila por fila con SAVEPOINT.
+    Las invalidaciones de caché se deduplican por ticket y se envían en un solo DEL.
+    """
+    try:
+        rows = db.execute(
+            SQL_INSERTAR_INTERACCIONES_LOTE,
+            {
+                "ticket_ids": [i.ticket_id for i in lote],
+                "usuario_ids": [i.usuario_id for i in lote],
+                "tipos": [i.tipo for i in lote],
+                "contenidos": [i.contenido for i in lote]
+            }
+        ).fetchall()
+        db.commit()
+        resultados = list(rows)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Lote de {len(lote)} interacciones falló, reintentando fila por fila: {getattr(e, 'orig', e)}")
+        resultados = []
+        for interaccion in lote:
+            try:
+                with db.begin_nested():
+                    resultados.append(db.execute(SQL_INSERTAR_INTERACCION, interaccion.model_dump()).fetchone())
+            except Exception as e_fila:
+                resultados.append(e_fila)
+        db.commit()
+    
+    tickets_afectados = {}
+    for row in resultados:
+        if not isinstance(row, Exception):
+            tickets_afectados[row[1]] = tickets_afectados.get(row[1], 0) + 1
+    _notificar_interacciones(tickets_afectados)
+    
+    return resultados
+
+def _notificar_interacciones(tickets_afectados: dict):
+    """Invalidar caché y publicar interaccion_creada por ticket en un solo pipeline
+
+    `tickets_afectados` mapea ticket_id -> cantidad de interacciones nuevas.
+    """
+    if not tickets_afectados:
+        return
+    ahora = datetime.now(timezone.utc).isoformat()
+    redis_client.pipeline(
+        [["DEL", *(clave for ticket_id in tickets_afectados for clave in _claves_cache_ticket(ticket_id))]]
+        + [
+            ["PUBLISH", "canal:batch:eventos", json.dumps({
+                "evento": "interaccion_creada",
+                "ticket_id": ticket_id,
+                "cantidad": cantidad,
+                "timestamp": ahora
+            })]
+            for ticket_id, cantidad in tickets_afectados.items()
+        ]
+    )
+
+def _resultados_por_indice(indices: list, filas: list) -> list:
+    """Convertir filas insertadas (o excepciones) en resultados por índice de entrada"""
+    return [
+        {"indice": indice, "error": str(getattr(fila, "orig", fila)).strip().splitlines()[0]}
+        if isinstance(fila, Exception) else {"indice": indice, "id": fila[0]}
+        for indice, fila in zip(indices, filas)
+    ]
+
+def _vaciar_buffer_interacciones(lote: List[InteraccionCreate]) -> list:
+    """Procesar un lote del buffer de escritura con su propia sesión"""
+    db = SessionLocal()
+    try:
+        return _insertar_interacciones(db, lote)
+    finally:
+        db.close()
+
+# Buffer opcional de group commit para POST /interacciones
+buffer_interacciones = BufferEscritura(
+    _vaciar_buffer_interacciones,
+    max_filas=settings.INTERACCIONES_BUFFER_MAX_FILAS,
+    max_espera_ms=settings.INTERACCIONES_BUFFER_MS
+) if settings.INTERACCIONES_BUFFER_ENABLED else None
+
+@app.on_event("startup")
+async def iniciar_buffer_interacciones():
+    if buffer_interacciones:
+        buffer_interacciones.iniciar()
+        logger.info(
+            f"Buffer de interacciones activo: {settings.INTERACCIONES_BUFFER_MAX_FILAS} filas / "
+            f"{settings.INTERACCIONES_BUFFER_MS} ms"
+        )
+
+@app.on_event("shutdown")
+async def detener_buffer_interacciones():
+    if buffer_interacciones:
+        await buffer_interacciones.detener()
+
 @app.post("/interacciones", response_model=InteraccionResponse)
 async def crear_interaccion(interaccion: InteraccionCreate, db: Session = Depends(get_db)):
-    """Crear nueva interacción"""
+    """Crear nueva interacción
+
+    Con INTERACCIONES_BUFFER_ENABLED, la inserción se agrupa con otras
+    concurrentes en un solo INSERT multi-fila (group commit).
+    """
     
-    result = db.execute(
-        text("""
-            INSERT INTO interacciones (ticket_id, usuario_id, tipo, contenido)
-            VALUES (:ticket_id, :usuario_id, :tipo, :contenido)
-            RETURNING id, ticket_id, usuario_id, tipo, contenido, fecha_creacion
-        """),
-        {
-            "ticket_id": interaccion.ticket_id,
-            "usuario_id": interaccion.usuario_id,
-            "tipo": interaccion.tipo,
-            "contenido": interaccion.contenido
-        }
-    ).fetchone()
+    if buffer_interacciones:
+        row = await buffer_interacciones.agregar(interaccion)
+        return fila_interaccion(row)
+    
+    result = db.execute(SQL_INSERTAR_INTERACCION, interaccion.model_dump()).fetchone()
     
     db.commit()
     
-    # Invalidar caché del ticket
-    redis_client.delete(f"ticket:{interaccion.ticket_id}:completo")
+    # Invalidar caché del ticket y notificar a los clientes de /events
+    _notificar_interacciones({result[1]: 1})
+    
+    return fila_interaccion(result)
+
+@app.post("/interacciones/bulk")
+async def crear_interacciones_bulk(request: Request, db: Session = Depends(get_db)):
+    """Crear interacciones en lote desde un JSON array o NDJSON (application/x-ndjson)"""
+    resultados = []
+    lote = []
+    indices = []
+    total = 0
     
-    nueva_interaccion = {
-        "id": result[0],
-        "ticket_id": str(result[1]),
-        "usuario_id": str(result[2]) if result[2] else None,
-        "tipo": result[3],
-        "contenido": result[4],
-        "fecha_creacion": result[5]
+    async for item in _leer_items_json(request):
+        if isinstance(item, ValueError):
+            resultados.append({"indice": total, "error": str(item)})
+        else:
+            try:
+                lote.append(InteraccionCreate.model_validate(item))
+                indices.append(total)
+            except ValidationError as e:
+                resultados.append({"indice": total, "error": _describir_error_validacion(e)})
+        total += 1
+        
+        if len(lote) >= settings.BULK_CHUNK_SIZE:
+            resultados.extend(_resultados_por_indice(indices, await asyncio.to_thread(_insertar_interacciones, db, lote)))
+            lote, indices = [], []
+    
+    if lote:
+        resultados.extend(_resultados_por_indice(indices, await asyncio.to_thread(_insertar_interacciones, db, lote)))
+    
+    resultados.sort(key=lambda r: r["indice"])
+    errores = sum(1 for r in resultados if "error" in r)
+    
+    return {
+        "total": total,
+        "creados": total - errores,
+        "errores": errores,
+        "resultados": resultados
     }
+
+# ============================================
+# ENDPOINTS - EXPORTACIÓN
+# ============================================
+
+COLUMNAS_EXPORT_TICKETS = [
+    "id", "usuario_id", "titulo", "descripcion", "estado", "prioridad",
+    "fecha_creacion", "fecha_actualizacion", "fecha_cierre"
+]
+
+COLUMNAS_EXPORT_INTERACCIONES = [
+    "id", "ticket_id", "usuario_id", "tipo", "contenido", "metadata", "fecha_creacion"
+]
+
+def _filtros_export(desde: Optional[datetime], hasta: Optional[datetime]) -> tuple:
+    """Construir condiciones de rango de fechas comunes a las exportaciones"""
+    condiciones = []
+    params = {}
+    if desde:
+        condiciones.append("fecha_creacion >= :desde")
+        params["desde"] = desde
+    if hasta:
+        condiciones.append("fecha_creacion < :hasta")
+        params["hasta"] = hasta
+    return condiciones, params
+
+def _generar_export(query: str, params: dict, columnas: list, formato: str):
+    """Leer con un cursor de servidor y emitir NDJSON/CSV por bloques
+
+    La conexión es propia del generador (no la sesión de la petición) porque
+    vive mientras se transmite la respuesta. `stream_results` usa un cursor
+    con nombre en PostgreSQL, así que solo hay `EXPORT_BATCH_SIZE` filas en memoria.
+    Las fechas salen en ISO 8601 (como en el resto del API) en ambos formatos.
+    """
+    with enrutador_lecturas.engine_lectura().connect() as conn:
+        result = conn.execution_options(
+            stream_results=True,
+            yield_per=settings.EXPORT_BATCH_SIZE
+        ).execute(text(query), params)
+        
+        if formato == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columnas)
+            for filas in result.partitions():
+                writer.writerows(
+                    [
+                        json.dumps(v) if isinstance(v, dict) else v.isoformat() if isinstance(v, datetime) else v
+                        for v in fila
+                    ]
+                    for fila in filas
+                )
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            for filas in result.partitions():
+                yield "".join(
+                    _json_cache(dict(zip(columnas, fila))) + "\n" for fila in filas
+                )
+
+def _respuesta_export(query: str, params: dict, columnas: list, formato: str, nombre: str) -> StreamingResponse:
+    if formato not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="formato debe ser 'ndjson' o 'csv'")
+    
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _generar_export(query, params, columnas, formato),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'}
+    )
+
+@app.get("/export/tickets")
+async def exportar_tickets(
+    formato: str = "ndjson",
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    estado: Optional[str] = None
+):
+    """Exportar tickets en streaming (NDJSON o CSV) filtrando por fecha de creación y estado"""
+    condiciones, params = _filtros_export(desde, hasta)
+    if estado:
+        condiciones.append("estado = :estado")
+        params["estado"] = estado
+    
+    query = f"SELECT {', '.join(COLUMNAS_EXPORT_TICKETS)} FROM tickets"
+    if condiciones:
+        query += " WHERE " + " AND ".join(condiciones)
+    query += " ORDER BY fecha_creacion"
+    
+    return _respuesta_export(query, params, COLUMNAS_EXPORT_TICKETS, formato, "tickets")
+
+@app.get("/export/interacciones")
+async def exportar_interacciones(
+    formato: str = "ndjson",
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    estado: Optional[str] = None,
+    tipo: Optional[str] = None
+):
+    """Exportar interacciones en streaming (NDJSON o CSV)
+
+    `estado` filtra por el estado actual del ticket al que pertenece la interacción.
+    """
+    condiciones, params = _filtros_export(desde, hasta)
+    if tipo:
+        condiciones.append("tipo = :tipo")
+        params["tipo"] = tipo
+    if estado:
+        condiciones.append("ticket_id IN (SELECT id FROM tickets WHERE estado = :estado)")
+        params["estado"] = estado
     
-    return nueva_interaccion
+    query = f"SELECT {', '.join(COLUMNAS_EXPORT_INTERACCIONES)} FROM interacciones"
+    if condiciones:
+        query += " WHERE " + " AND ".join(condiciones)
+    query += " ORDER BY fecha_creacion"
+    
+    return _respuesta_export(query, params, COLUMNAS_EXPORT_INTERACCIONES, formato, "interacciones")
 
 # ============================================
 # HEALTH CHECK
@@ -425,6 +1259,9 @@ async def health_check():
             health["services"]["redis"] = "error"
     except Exception as e:
         health["services"]["redis"] = f"error: {str(e)}"
+    # Estado del circuit breaker (abierto: la caché se omite y las escrituras quedan pendientes)
+    health["redis_circuito"] = redis_client.circuito.estado
+    health["redis_pendientes"] = redis_client.spool.pendientes()
     
     # Verificar Base de Datos
     try:
@@ -435,6 +1272,10 @@ async def health_check():
     except Exception as e:
         health["services"]["database"] = f"error: {str(e)}"
     
+    # Réplicas de lectura (estado de la última verificación de retraso)
+    for nombre, estado in enrutador_lecturas.estado().items():
+        health["services"][f"replica {nombre}"] = estado
+    
     # Determinar estado general
     if any("error" in str(v) for v in health["services"].values()):
         health["status"] = "degraded"
@@ -466,41 +1307,122 @@ async def options_handler(full_path: str):
     """Handler explícito para requests OPTIONS (preflight)"""
     return {"message": "OK"}
 
+# ============================================
+# CACHÉ DE LISTADOS (invalidación por etiquetas)
+# ============================================
+# Cada página cacheada se registra en uno o más sets "etiqueta:..." y las
+# escrituras invalidan solo las etiquetas afectadas:
+#   etiqueta:tickets:todos, etiqueta:tickets:estado:<estado>
+#   etiqueta:usuarios:todos, etiqueta:usuarios:activo:<true|false>
+
+# Borra las páginas de cada etiqueta y la etiqueta en el servidor: una sola
+# llamada (que además puede ir dentro de un pipeline) en lugar de SMEMBERS + DEL
+SCRIPT_INVALIDAR_ETIQUETAS = """
+for _, etiqueta in ipairs(KEYS) do
+    local claves = redis.call('SMEMBERS', etiqueta)
+    for i = 1, #claves, 500 do
+        redis.call('UNLINK', unpack(claves, i, math.min(i + 499, #claves)))
+    end
+    redis.call('DEL', etiqueta)
+end
+return 0
+"""
+
+def _clave_lista(recurso: str, params: dict) -> str:
+    """Clave de una página de listado a partir de sus parámetros normalizados"""
+    return f"lista:{recurso}:" + hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def _comandos_invalidar_etiquetas(*etiquetas: str) -> list:
+    etiquetas = list(dict.fromkeys(f"etiqueta:{e}" for e in etiquetas))
+    return [["EVAL", SCRIPT_INVALIDAR_ETIQUETAS, len(etiquetas), *etiquetas]] if etiquetas else []
+
+def _guardar_lista(clave: str, etiquetas: list, valor: list):
+    """SETEX de la página y registro en sus etiquetas en un solo pipeline"""
+    ttl = settings.LISTAS_CACHE_TTL
+    comandos = [["SETEX", clave, ttl, _json_cache(valor)]]
+    for etiqueta in etiquetas:
+        # La etiqueta vive un poco más que sus páginas; las que vencen antes son inofensivas
+        comandos += [["SADD", f"etiqueta:{etiqueta}", clave], ["EXPIRE", f"etiqueta:{etiqueta}", ttl * 2]]
+    redis_client.pipeline(comandos)
+
+MAX_IDS_POR_CONSULTA = 100
+
+def _normalizar_ids(ids: List[str]) -> List[str]:
+    """Aceptar ?ids=a,b y ?ids=a&ids=b; validar UUIDs y quitar duplicados conservando el orden"""
+    normalizados = []
+    for valor in ids:
+        for parte in valor.split(","):
+            if not parte.strip():
+                continue
+            try:
+                normalizados.append(str(uuid.UUID(parte.strip())))
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"id no válido: {parte.strip()}")
+    normalizados = list(dict.fromkeys(normalizados))
+    if len(normalizados) > MAX_IDS_POR_CONSULTA:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_IDS_POR_CONSULTA} ids por consulta")
+    return normalizados
+
+def _obtener_por_ids(db: Session, ids: List[str], clave: str, query, a_dict, ttl: int) -> list:
+    """Resolver muchos ids con caché: un MGET, una consulta ANY(:ids) para los faltantes
+    y un pipeline de SETEX para rellenar el caché. Devuelve los encontrados en el orden de `ids`.
+    """
+    encontrados = {}
+    faltantes = []
+    for id_, cached in zip(ids, redis_client.mget(*(clave.format(id=id_) for id_ in ids))):
+        if cached:
+            encontrados[id_] = json.loads(cached)
+        else:
+            faltantes.append(id_)
+    
+    registrar_cache(clave.split(":")[0], len(encontrados), len(faltantes))
+    
+    if faltantes:
+        nuevos = [a_dict(row) for row in db.execute(query, {"ids": faltantes}).fetchall()]
+        redis_client.pipeline([
+            ["SETEX", clave.format(id=item["id"]), ttl, _json_cache(item)]
+            for item in nuevos
+        ])
+        encontrados.update((item["id"], item) for item in nuevos)
+    
+    return [encontrados[id_] for id_ in ids if id_ in encontrados]
+
 @app.get("/tickets")
 async def listar_tickets(
     skip: int = 0,
     limit: int = 20,
     estado: Optional[str] = None,
-    db: Session = Depends(get_db)
+    ids: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db_lectura)
 ):
-    """Listar tickets con paginación y filtros"""
+    """Listar tickets con paginación y filtros
+
+    Con `ids` (hasta 100, separados por coma) devuelve esos tickets en ese
+    orden, resueltos con caché (MGET) en lugar de paginar.
+    """
     
-    query = "SELECT id, usuario_id, titulo, descripcion, estado, prioridad, fecha_creacion, fecha_actualizacion FROM tickets WHERE 1=1"
-    params = {}
+    if ids:
+        return _obtener_por_ids(
+            db, _normalizar_ids(ids), "ticket:{id}:completo", SQL_TICKETS_POR_IDS,
+            fila_ticket, 900
+        )
     
-    if estado:
-        query += " AND estado = :estado"
-        params["estado"] = estado
+    # Intentar obtener de caché
+    cache_key = _clave_lista("tickets", {"skip": skip, "limit": limit, "estado": estado})
+    cached = redis_client.get(cache_key)
+    registrar_cache("lista_tickets", bool(cached), not cached)
     
-    query += " ORDER BY fecha_creacion DESC LIMIT :limit OFFSET :skip"
-    params["limit"] = limit
-    params["skip"] = skip
+    if cached:
+        return json.loads(cached)
     
-    result = db.execute(text(query), params).fetchall()
+    result = db.execute(
+        SQL_LISTAR_TICKETS[bool(estado)],
+        {"estado": estado, "limit": limit, "skip": skip}
+    ).fetchall()
     
-    tickets = [
-        {
-            "id": str(row[0]),
-            "usuario_id": str(row[1]),
-            "titulo": row[2],
-            "descripcion": row[3],
-            "estado": row[4],
-            "prioridad": row[5],
-            "fecha_creacion": row[6],
-            "fecha_actualizacion": row[7]
-        }
-        for row in result
-    ]
+    tickets = [fila_ticket(row) for row in result]
+    
+    _guardar_lista(cache_key, [f"tickets:estado:{estado}" if estado else "tickets:todos"], tickets)
     
     return tickets
 
@@ -509,43 +1431,54 @@ async def listar_usuarios(
     skip: int = 0,
     limit: int = 20,
     activo: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    ids: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db_lectura)
 ):
-    """Listar usuarios con paginación y filtros"""
+    """Listar usuarios con paginación y filtros
+
+    Con `ids` (hasta 100, separados por coma) devuelve esos usuarios en ese
+    orden, resueltos con caché (MGET) en lugar de paginar.
+    """
     
-    query = "SELECT id, email, nombre, rol, activo, fecha_creacion FROM usuarios WHERE 1=1"
-    params = {}
+    if ids:
+        return _obtener_por_ids(
+            db, _normalizar_ids(ids), "usuario:{id}:datos", SQL_USUARIOS_POR_IDS,
+            fila_usuario, 3600
+        )
     
-    if activo is not None:
-        query += " AND activo = :activo"
-        params["activo"] = activo
+    # Intentar obtener de caché
+    cache_key = _clave_lista("usuarios", {"skip": skip, "limit": limit, "activo": activo})
+    cached = redis_client.get(cache_key)
+    registrar_cache("lista_usuarios", bool(cached), not cached)
     
-    query += " ORDER BY fecha_creacion DESC LIMIT :limit OFFSET :skip"
-    params["limit"] = limit
-    params["skip"] = skip
+    if cached:
+        return json.loads(cached)
     
-    result = db.execute(text(query), params).fetchall()
+    result = db.execute(
+        SQL_LISTAR_USUARIOS[activo is not None],
+        {"activo": activo, "limit": limit, "skip": skip}
+    ).fetchall()
     
-    usuarios = [
-        {
-            "id": str(row[0]),
-            "email": row[1],
-            "nombre": row[2],
-            "rol": row[3],
-            "activo": row[4],
-            "fecha_creacion": row[5]
-        }
-        for row in result
-    ]
+    usuarios = [fila_usuario(row) for row in result]
+    
+    _guardar_lista(
+        cache_key,
+        [f"usuarios:activo:{str(activo).lower()}" if activo is not None else "usuarios:todos"],
+        usuarios
+    )
     
     return usuarios
 
 if __name__ == "__main__":
+    # Desarrollo: un solo proceso, con recarga si DEBUG. En producción: python servidor.py
     import uvicorn
     uvicorn.run(
-        app, 
+        # reload exige la aplicación como "modulo:atributo"
+        "main:app" if settings.DEBUG else app,
         host=settings.API_HOST, 
         port=settings.API_PORT,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        # Los flujos de /events no terminan solos: no esperar indefinidamente al apagar
+        timeout_graceful_shutdown=5
     )
 
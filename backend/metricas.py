@@ -0,0 +1,177 @@
+"""
+Métricas Prometheus del API
+Latencia por ruta, comandos Redis, aciertos de caché y pool de conexiones
+
+Con varios procesos (servidor.py define PROMETHEUS_MULTIPROC_DIR) cada uno
+escribe sus valores en archivos del directorio y /metrics los agrega; el
+multiprocess_mode de cada Gauge indica cómo combinarlos.
+"""
+
+import os
+import time
+from functools import wraps
+
+from opentelemetry.trace import SpanKind
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from sqlalchemy import event
+
+from perfilado import sumar_fase
+from trazas import tracer
+
+# Buckets pensados para latencias de API/Redis (1 ms a 10 s)
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_DURACION = Histogram(
+    "http_request_duration_seconds",
+    "Duración de las peticiones HTTP por ruta",
+    ["metodo", "ruta", "estado"],
+    buckets=BUCKETS_LATENCIA
+)
+
+REDIS_DURACION = Histogram(
+    "redis_comando_duration_seconds",
+    "Duración de los comandos de RedisClient",
+    ["comando", "modo"],
+    buckets=BUCKETS_LATENCIA
+)
+
+REDIS_ERRORES = Counter(
+    "redis_comando_errores_total",
+    "Comandos de RedisClient que lanzaron excepción",
+    ["comando", "modo"]
+)
+
+REDIS_CIRCUITO_ESTADO = Gauge(
+    "redis_circuito_estado",
+    "Circuit breaker de Redis: 0 cerrado, 1 semiabierto, 2 abierto",
+    multiprocess_mode="livemax"
+)
+
+REDIS_OMITIDOS = Counter(
+    "redis_comando_omitidos_total",
+    "Comandos no enviados a Redis (circuito abierto o fallo de conexión)",
+    ["comando"]
+)
+
+REDIS_PENDIENTES = Gauge(
+    "redis_pendientes",
+    "Escrituras en el spool a la espera de que Redis se recupere",
+    multiprocess_mode="livemax"  # El spool es compartido: todos los procesos ven el mismo valor
+)
+
+REDIS_PENDIENTES_DESCARTADOS = Counter(
+    "redis_pendientes_descartados_total",
+    "Escrituras descartadas por spool lleno (REDIS_SPOOL_MAX_MB)"
+)
+
+REDIS_REENVIADAS = Counter(
+    "redis_spool_reenviadas_total",
+    "Escrituras del spool reenviadas a Redis (su tasa es el throughput de reenvío)"
+)
+
+CACHE_CONSULTAS = Counter(
+    "cache_consultas_total",
+    "Lecturas de caché por familia de claves",
+    ["familia", "resultado"]
+)
+
+DB_POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds",
+    "Tiempo para obtener una conexión del pool (espera + pre-ping)",
+    buckets=BUCKETS_LATENCIA
+)
+
+DB_LECTURAS = Counter(
+    "db_lecturas_total",
+    "Sesiones de lectura por destino (primaria o réplica)",
+    ["destino"]
+)
+
+DB_REPLICA_RETRASO = Gauge(
+    "db_replica_retraso_segundos",
+    "Retraso de reproducción de cada réplica (última verificación)",
+    ["replica"],
+    multiprocess_mode="livemax"
+)
+
+DB_POOL_EN_USO = Gauge("db_pool_conexiones_en_uso", "Conexiones prestadas por el pool", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Conexiones abiertas por encima de pool_size", multiprocess_mode="livesum")
+
+
+def medir_redis(comando: str):
+    """Decorador para métodos de RedisClient: latencia y errores por comando y modo, y un span por comando"""
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            modo = "upstash" if self.is_upstash else "local"
+            inicio = time.perf_counter()
+            with tracer.start_as_current_span(
+                f"redis {comando}",
+                kind=SpanKind.CLIENT,
+                attributes={"db.system": "redis", "db.operation": comando, "redis.modo": modo}
+            ):
+                try:
+                    return metodo(self, *args, **kwargs)
+                except Exception:
+                    REDIS_ERRORES.labels(comando, modo).inc()
+                    raise
+                finally:
+                    duracion = time.perf_counter() - inicio
+                    REDIS_DURACION.labels(comando, modo).observe(duracion)
+                    sumar_fase("redis", duracion)
+        return envoltura
+    return decorador
+
+
+def registrar_cache(familia: str, aciertos: int, fallos: int = 0):
+    """Contar aciertos y fallos de caché (admite lecturas múltiples como MGET)"""
+    if aciertos:
+        CACHE_CONSULTAS.labels(familia, "hit").inc(aciertos)
+    if fallos:
+        CACHE_CONSULTAS.labels(familia, "miss").inc(fallos)
+
+
+def instrumentar_pool(engine):
+    """Medir el checkout del pool de SQLAlchemy y exponer conexiones en uso/overflow
+
+    Pool no tiene un evento previo a la espera, así que se envuelve
+    pool.connect() de esta instancia (lo que usa el engine para cada checkout).
+    Los gauges se actualizan en checkout/checkin (no con set_function, que
+    no funciona en modo multiproceso).
+    """
+    pool = engine.pool
+    conectar = pool.connect
+
+    def connect_medido():
+        inicio = time.perf_counter()
+        try:
+            return conectar()
+        finally:
+            DB_POOL_CHECKOUT.observe(time.perf_counter() - inicio)
+
+    pool.connect = connect_medido
+
+    @event.listens_for(pool, "checkout")
+    def _prestada(conexion_dbapi, registro, proxy):
+        DB_POOL_EN_USO.inc()
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+    @event.listens_for(pool, "checkin")
+    def _devuelta(conexion_dbapi, registro):
+        DB_POOL_EN_USO.dec()
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+def exponer_metricas() -> bytes:
+    """Texto de /metrics: el registro del proceso o, con varios procesos, la suma de todos"""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest()
+    registro = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registro)
+    return generate_latest(registro)
+
+
+def retirar_proceso():
+    """Al apagar un proceso: quitar sus gauges "live" del agregado"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,177 @@
+"""
+Perfilado de peticiones (opt-in con PERFILADO_ACTIVO)
+Desglose de cada petición por fase (Redis, PostgreSQL, serialización JSON
+y resto en Python), registro de peticiones lentas con su SQL y muestreo
+de pilas en formato "folded" para flamegraphs.
+
+Desactivado no se registra ni el middleware ni los eventos SQL: solo queda
+la consulta a una ContextVar en cada comando Redis.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+ENCABEZADO_PERFILAR = "x-perfilar"
+MAX_SQL_REGISTRADAS = 50
+
+
+class PerfilPeticion:
+    """Tiempos acumulados por fase y sentencias SQL de una petición"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases = {"redis": 0.0, "db": 0.0, "serializacion": 0.0}
+        self.sql = []
+
+    def sumar(self, fase: str, segundos: float):
+        self.fases[fase] = self.fases.get(fase, 0.0) + segundos
+
+
+_perfil_actual: ContextVar[Optional[PerfilPeticion]] = ContextVar("perfil_peticion", default=None)
+_peticiones = 0
+
+
+def sumar_fase(fase: str, segundos: float):
+    """Acumular tiempo en la fase de la petición en curso (no-op fuera de una petición perfilada)"""
+    perfil = _perfil_actual.get()
+    if perfil is not None:
+        perfil.sumar(fase, segundos)
+
+
+class RespuestaJSONPerfilada(JSONResponse):
+    """JSONResponse que mide la codificación del cuerpo como fase "serializacion" """
+
+    def render(self, content) -> bytes:
+        inicio = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            sumar_fase("serializacion", time.perf_counter() - inicio)
+
+
+def instrumentar_sql(engine):
+    """Medir cada sentencia SQL (fase "db") y guardarla para el log de peticiones lentas"""
+    if not settings.PERFILADO_ACTIVO:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _iniciar(conn, cursor, statement, parameters, contexto, executemany):
+        contexto._inicio_perfil = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _terminar(conn, cursor, statement, parameters, contexto, executemany):
+        perfil = _perfil_actual.get()
+        if perfil is None:
+            return
+        duracion = time.perf_counter() - contexto._inicio_perfil
+        perfil.sumar("db", duracion)
+        if len(perfil.sql) < MAX_SQL_REGISTRADAS:
+            perfil.sql.append((" ".join(statement.split()), duracion))
+
+
+class Muestreador(threading.Thread):
+    """Muestrea la pila de un hilo cada `intervalo` segundos y cuenta pilas idénticas
+
+    Las peticiones async comparten el hilo del event loop: las muestras pueden
+    incluir trabajo de otras peticiones concurrentes.
+    """
+
+    def __init__(self, hilo_id: int, intervalo: float):
+        super().__init__(name="perfilado-muestreador", daemon=True)
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_id)
+            pila = []
+            while frame is not None:
+                codigo = frame.f_code
+                pila.append(f"{Path(codigo.co_filename).name}:{codigo.co_name}")
+                frame = frame.f_back
+            if pila:
+                self.pilas[";".join(reversed(pila))] += 1
+
+    def detener(self) -> Counter:
+        self._detener.set()
+        self.join()
+        return self.pilas
+
+
+def _guardar_pilas(raiz: str, pilas: Counter):
+    """Agregar las pilas en formato folded (flamegraph.pl, speedscope, inferno)"""
+    directorio = Path(settings.PERFILADO_DIRECTORIO)
+    directorio.mkdir(parents=True, exist_ok=True)
+    with open(directorio / f"perfiles-{os.getpid()}.folded", "a", encoding="utf-8") as archivo:
+        for pila, cantidad in pilas.items():
+            archivo.write(f"{raiz};{pila} {cantidad}\n")
+
+
+def _ms(segundos: float) -> float:
+    return round(segundos * 1000, 2)
+
+
+async def perfilar_peticion(request, call_next):
+    """Middleware: fases por petición (encabezado Server-Timing), log de lentas y muestreo de pilas
+
+    Se muestrea cada PERFILADO_MUESTREO_CADA peticiones o cuando llega el
+    encabezado X-Perfilar: 1.
+    """
+    global _peticiones
+    _peticiones += 1
+    muestrear = request.headers.get(ENCABEZADO_PERFILAR) == "1" or (
+        settings.PERFILADO_MUESTREO_CADA and _peticiones % settings.PERFILADO_MUESTREO_CADA == 0
+    )
+    perfil = PerfilPeticion()
+    token = _perfil_actual.set(perfil)
+    muestreador = None
+    if muestrear:
+        muestreador = Muestreador(threading.get_ident(), settings.PERFILADO_INTERVALO_MS / 1000)
+        muestreador.start()
+
+    estado = 500
+    response = None
+    try:
+        response = await call_next(request)
+        estado = response.status_code
+    finally:
+        total = time.perf_counter() - perfil.inicio
+        _perfil_actual.reset(token)
+        ruta = request.scope.get("route")
+        nombre = f"{request.method} {ruta.path if ruta else request.url.path}"
+        fases = {fase: _ms(segundos) for fase, segundos in perfil.fases.items()}
+        fases["python"] = round(max(_ms(total) - sum(fases.values()), 0.0), 2)
+
+        if muestreador:
+            _guardar_pilas(nombre, muestreador.detener())
+
+        if total * 1000 >= settings.PERFILADO_UMBRAL_MS:
+            logger.warning("Petición lenta: " + json.dumps({
+                "peticion": nombre,
+                "estado": estado,
+                "total_ms": _ms(total),
+                "fases_ms": fases,
+                "sql": [{"ms": _ms(duracion), "sentencia": sentencia[:500]} for sentencia, duracion in perfil.sql],
+            }, ensure_ascii=False))
+
+    response.headers["Server-Timing"] = ", ".join(
+        f"{fase};dur={duracion}" for fase, duracion in {**fases, "total": _ms(total)}.items()
+    )
+    return response
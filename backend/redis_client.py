@@ -1,32 +1,245 @@
 """
 Cliente Redis - Soporte para Redis local y Upstash Redis (REST API)
+
+Cada comando tiene un timeout de milisegundos (REDIS_TIMEOUT_MS) y pasa por
+un circuit breaker: tras REDIS_CIRCUITO_FALLOS fallos de conexión seguidos
+el circuito se abre y los comandos no tocan la red. Las lecturas devuelven
+"no está en caché" (el API va directo a PostgreSQL), las escrituras de caché
+se descartan y las que no se pueden perder (encolar tareas, invalidaciones,
+contadores, eventos) se guardan en un spool en disco (spool_redis.py) y
+se reenvían en orden cuando una sonda en estado semiabierto vuelve a tener
+éxito o al arrancar el proceso.
 """
 
 import json
+import logging
+import os
+import socket
+import threading
+import time
+from functools import wraps
 import httpx
 from typing import Optional, Any
 from config import settings
+from metricas import (
+    REDIS_CIRCUITO_ESTADO, REDIS_OMITIDOS, REDIS_PENDIENTES, REDIS_PENDIENTES_DESCARTADOS, REDIS_REENVIADAS,
+    medir_redis
+)
+from spool_redis import SpoolLleno, SpoolRedis
+
+logger = logging.getLogger(__name__)
+
+# Comandos que se difieren con el circuito abierto en lugar de descartarse
+COMANDOS_DIFERIBLES = {"RPUSH", "DEL", "UNLINK", "EVAL", "HINCRBY", "PUBLISH"}
+TAMANIO_REENVIO = 500
+
+class ResponseError(Exception):
+    """Error devuelto por Redis para un comando individual de un pipeline"""
+
+def verificar_respuesta_upstash(response: httpx.Response):
+    """Clasificar el código HTTP de Upstash
+
+    5xx es un fallo del servicio (ConnectionError: cuenta para el circuit
+    breaker y las escrituras se difieren). 4xx es un error del comando o de
+    la petición (ResponseError: Redis respondió, reintentarlo no cambia nada).
+    """
+    if response.status_code >= 500:
+        raise ConnectionError(f"Upstash Redis respondió {response.status_code}")
+    if response.status_code >= 400:
+        response.read()
+        try:
+            detalle = response.json().get("error", response.text)
+        except (ValueError, AttributeError):
+            detalle = response.text
+        raise ResponseError(f"Upstash Redis rechazó el comando ({response.status_code}): {detalle}")
+
+class CircuitoRedis:
+    """Circuit breaker: cerrado -> abierto tras `umbral` fallos seguidos -> semiabierto tras `espera` s
+
+    En semiabierto pasa un único comando (la sonda): si tiene éxito el
+    circuito se cierra, si falla vuelve a abrirse otros `espera` segundos.
+    """
+    CERRADO, SEMIABIERTO, ABIERTO = "cerrado", "semiabierto", "abierto"
+    
+    def __init__(self, umbral: int, espera: float):
+        self.umbral = umbral
+        self.espera = espera
+        self.estado = self.CERRADO
+        self.fallos = 0
+        self.abierto_desde = 0.0
+        self._lock = threading.Lock()
+    
+    def _cambiar(self, estado: str):
+        self.estado = estado
+        REDIS_CIRCUITO_ESTADO.set((self.CERRADO, self.SEMIABIERTO, self.ABIERTO).index(estado))
+    
+    def permitir(self) -> bool:
+        """¿Puede este comando ir a Redis?"""
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return True
+            if self.estado == self.ABIERTO and time.monotonic() - self.abierto_desde >= self.espera:
+                self._cambiar(self.SEMIABIERTO)
+                return True
+            return False
+    
+    def exito(self) -> bool:
+        """Registrar un comando correcto; True si con él se cerró el circuito"""
+        with self._lock:
+            self.fallos = 0
+            if self.estado == self.CERRADO:
+                return False
+            self._cambiar(self.CERRADO)
+        logger.info("Circuito de Redis cerrado: Redis vuelve a responder")
+        return True
+    
+    def fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self.estado == self.SEMIABIERTO or (self.estado == self.CERRADO and self.fallos >= self.umbral):
+                self._cambiar(self.ABIERTO)
+                self.abierto_desde = time.monotonic()
+                logger.warning(f"Circuito de Redis abierto tras {self.fallos} fallos; reintento en {self.espera} s")
+
+def protegido(si_abierto=None, diferir=None):
+    """Decorador para métodos de RedisClient: pasar el comando por el circuit breaker
+
+    Con el circuito abierto, o si el comando falla por conexión o timeout,
+    no se lanza excepción: se devuelve `si_abierto(*args)` (o el valor tal
+    cual) y los comandos de `diferir(*args)` quedan pendientes de reenvío.
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            if self.circuito.permitir():
+                try:
+                    resultado = metodo(self, *args, **kwargs)
+                except self.errores_conexion as e:
+                    self.circuito.fallo()
+                    logger.warning(f"Redis no disponible en {metodo.__name__}: {str(e)}")
+                except Exception:
+                    # Redis respondió (p. ej. error de tipo de dato): no cuenta como fallo de conexión
+                    if self.circuito.exito():
+                        self.reenviar_pendientes()
+                    raise
+                else:
+                    if self.circuito.exito():
+                        self.reenviar_pendientes()
+                    return resultado
+            REDIS_OMITIDOS.labels(metodo.__name__).inc()
+            if diferir:
+                self._diferir(diferir(*args, **kwargs))
+            return si_abierto(*args, **kwargs) if callable(si_abierto) else si_abierto
+        return envoltura
+    return decorador
 
 class RedisClient:
     """Cliente Redis que soporta Redis local y Upstash REST API"""
     
     def __init__(self):
         self.is_upstash = settings.is_upstash_redis()
+        self.circuito = CircuitoRedis(settings.REDIS_CIRCUITO_FALLOS, settings.REDIS_CIRCUITO_ESPERA_SEGUNDOS)
+        self.spool = SpoolRedis(settings.REDIS_SPOOL_ARCHIVO, settings.REDIS_SPOOL_MAX_MB, settings.REDIS_SPOOL_SINCRONIZACION)
+        self._reenviando = threading.Lock()
+        timeout = settings.REDIS_TIMEOUT_MS / 1000
+        timeout_conexion = settings.REDIS_TIMEOUT_CONEXION_MS / 1000
+        timeout_reenvio = settings.REDIS_TIMEOUT_REENVIO_MS / 1000
         
         if self.is_upstash:
             # Configuración para Upstash Redis (REST API)
             self.upstash_url = settings.UPSTASH_REDIS_REST_URL
             self.upstash_token = settings.UPSTASH_REDIS_REST_TOKEN
             self.client = None  # No se usa cliente Redis tradicional
+            # Cliente HTTP persistente: reutiliza la conexión TLS, sin handshake en cada comando
+            self.http = httpx.Client(timeout=httpx.Timeout(timeout, connect=timeout_conexion))
+            self.http_reenvio = httpx.Client(timeout=httpx.Timeout(timeout_reenvio, connect=timeout_conexion))
+            self.errores_conexion = (ConnectionError, TimeoutError)
         else:
             # Configuración para Redis local
             import redis
-            self.client = redis.Redis(
+            from redis.backoff import NoBackoff
+            from redis.retry import Retry
+            self._parametros_locales = dict(
                 host=settings.REDIS_HOST,
                 port=settings.REDIS_PORT,
                 password=settings.REDIS_PASSWORD or None,
-                decode_responses=True
+                decode_responses=True,
+                socket_connect_timeout=timeout_conexion,
+                # Sin reintentos internos: el circuit breaker decide
+                retry=Retry(NoBackoff(), 0)
             )
+            self.client = redis.Redis(socket_timeout=timeout, **self._parametros_locales)
+            # Conexiones propias del reenvío del spool: pipelines de TAMANIO_REENVIO comandos
+            self.client_reenvio = redis.Redis(socket_timeout=timeout_reenvio, **self._parametros_locales)
+            self.errores_conexion = (ConnectionError, TimeoutError, redis.ConnectionError, redis.TimeoutError)
+    
+    def _diferir(self, comandos: list):
+        """Guardar escrituras en el spool para reenviarlas cuando Redis se recupere"""
+        if not comandos:
+            return
+        try:
+            self.spool.agregar(comandos)
+        except SpoolLleno:
+            REDIS_PENDIENTES_DESCARTADOS.inc(len(comandos))
+            logger.error(f"Spool de Redis lleno (REDIS_SPOOL_MAX_MB): {len(comandos)} escrituras descartadas")
+    
+    def reenviar_pendientes(self):
+        """Reenviar el spool en un hilo aparte si tiene comandos"""
+        pendientes = self.spool.pendientes()
+        REDIS_PENDIENTES.set(pendientes)
+        if pendientes:
+            threading.Thread(target=self._reenviar_pendientes, name="redis-reenvio", daemon=True).start()
+    
+    def _reenviar_pendientes(self):
+        """Reenviar en orden el spool, por bloques de TAMANIO_REENVIO (un pipeline por bloque)
+
+        Cada bloque se quita del spool después de que Redis lo confirma. El
+        reenvío usa sus propias conexiones con REDIS_TIMEOUT_REENVIO_MS y sus
+        fallos no cuentan para el circuit breaker: un bloque que vence se
+        reintenta a la mitad de tamaño mientras el circuito siga cerrado. Los comandos nuevos van
+        directos a Redis mientras tanto, así que pueden
+        adelantarse a los pendientes. Un comando que falló por timeout, o un
+        bloque interrumpido, pudo haberse aplicado: el reenvío es "al menos
+        una vez".
+        """
+        if not self._reenviando.acquire(blocking=False):
+            return
+        propietario = f"{socket.gethostname()}:{os.getpid()}"
+        reenviados, inicio = 0, time.perf_counter()
+        tamanio = TAMANIO_REENVIO
+        try:
+            while self.spool.tomar_turno(propietario):
+                bloque = self.spool.leer(tamanio)
+                if not bloque:
+                    break
+                try:
+                    self._ejecutar_pipeline([comando for _, comando in bloque], reenvio=True)
+                except self.errores_conexion as e:
+                    # No cuenta para el circuito: un bloque grande que vence no debe reabrirlo.
+                    # Si Redis sigue caído, el tráfico normal lo abre y al cerrarse se reenvía de nuevo
+                    tamanio = max(tamanio // 2, 1)
+                    logger.warning(f"Reenvío del spool interrumpido, reintento en {self.circuito.espera} s "
+                                   f"con bloques de {tamanio}: {str(e)}")
+                    time.sleep(self.circuito.espera)
+                    if self.circuito.estado == CircuitoRedis.ABIERTO:
+                        break
+                    continue
+                except ResponseError as e:
+                    # Upstash rechazó la petición completa (4xx): reintentar no cambia nada.
+                    # El bloque queda en el spool para el próximo reenvío
+                    logger.error(f"Reenvío del spool rechazado por Redis: {str(e)}")
+                    break
+                self.spool.confirmar(bloque[-1][0])
+                reenviados += len(bloque)
+                REDIS_REENVIADAS.inc(len(bloque))
+        finally:
+            self.spool.soltar_turno(propietario)
+            REDIS_PENDIENTES.set(self.spool.pendientes())
+            self._reenviando.release()
+        if reenviados:
+            duracion = time.perf_counter() - inicio
+            logger.info(f"Reenviadas {reenviados} escrituras del spool a Redis en {duracion:.2f} s "
+                        f"({reenviados / duracion:,.0f} comandos/s)")
     
     def _upstash_request(self, command: str, *args) -> Any:
         """Realizar petición a Upstash Redis REST API"""
@@ -44,30 +257,77 @@ class RedisClient:
         body = [command.upper()] + [str(arg) for arg in args]
         
         try:
-            with httpx.Client() as client:
-                response = client.post(url, headers=headers, json=body, timeout=10.0)
-                response.raise_for_status()
-                result = response.json()
-                # Upstash devuelve {"result": "valor"} donde valor puede ser string, array, etc.
-                if isinstance(result, dict) and "result" in result:
-                    result_value = result["result"]
-                    # Si el resultado es un string que parece JSON, intentar parsearlo
-                    if isinstance(result_value, str):
-                        # PING devuelve "[]" como string, lo convertimos
-                        if result_value == "[]" and command.upper() == "PING":
-                            return "PONG"
-                        # Intentar parsear si es JSON válido
-                        try:
-                            import json
-                            parsed = json.loads(result_value)
-                            return parsed
-                        except (json.JSONDecodeError, ValueError):
-                            return result_value
-                    return result_value
-                return result
+            response = self.http.post(url, headers=headers, json=body)
+            verificar_respuesta_upstash(response)
+            result = response.json()
+            # Upstash devuelve {"result": "valor"} donde valor puede ser string, array, etc.
+            if isinstance(result, dict) and "result" in result:
+                result_value = result["result"]
+                # Si el resultado es un string que parece JSON, intentar parsearlo
+                if isinstance(result_value, str):
+                    # PING devuelve "[]" como string, lo convertimos
+                    if result_value == "[]" and command.upper() == "PING":
+                        return "PONG"
+                    # Intentar parsear si es JSON válido
+                    try:
+                        import json
+                        parsed = json.loads(result_value)
+                        return parsed
+                    except (json.JSONDecodeError, ValueError):
+                        return result_value
+                return result_value
+            return result
+        except httpx.HTTPError as e:
+            raise ConnectionError(f"Error conectando con Upstash Redis: {str(e)}")
+    
+    def _upstash_pipeline(self, comandos: list, http: httpx.Client) -> list:
+        """Enviar varios comandos a Upstash en una sola petición (endpoint /pipeline)"""
+        url = f"{self.upstash_url.rstrip('/')}/pipeline"
+        headers = {
+            "Authorization": f"Bearer {self.upstash_token}",
+            "Content-Type": "application/json"
+        }
+        body = [[str(comando[0]).upper()] + [str(arg) for arg in comando[1:]] for comando in comandos]
+        
+        try:
+            response = http.post(url, headers=headers, json=body)
+            verificar_respuesta_upstash(response)
+            # Upstash devuelve [{"result": ...} | {"error": ...}, ...] en el mismo orden
+            return [
+                item.get("result") if "error" not in item else ResponseError(item["error"])
+                for item in response.json()
+            ]
         except httpx.HTTPError as e:
             raise ConnectionError(f"Error conectando con Upstash Redis: {str(e)}")
     
+    @protegido(
+        si_abierto=lambda comandos: [None] * len(comandos),
+        diferir=lambda comandos: [c for c in comandos if str(c[0]).upper() in COMANDOS_DIFERIBLES]
+    )
+    @medir_redis("PIPELINE")
+    def pipeline(self, comandos: list) -> list:
+        """Ejecutar varios comandos en un solo round-trip
+
+        `comandos` es una lista de listas: [["RPUSH", "cola", "v1"], ["PUBLISH", "canal", "m"]].
+        Devuelve los resultados en el mismo orden; los errores por comando se
+        devuelven como instancias de excepción en lugar de lanzarse. Con el
+        circuito abierto todos los resultados son None.
+        """
+        return self._ejecutar_pipeline(comandos)
+    
+    def _ejecutar_pipeline(self, comandos: list, reenvio: bool = False) -> list:
+        if not comandos:
+            return []
+        if self.is_upstash:
+            return self._upstash_pipeline(comandos, self.http_reenvio if reenvio else self.http)
+        else:
+            pipe = (self.client_reenvio if reenvio else self.client).pipeline(transaction=False)
+            for comando in comandos:
+                pipe.execute_command(*comando)
+            return pipe.execute(raise_on_error=False)
+    
+    @protegido()
+    @medir_redis("GET")
     def get(self, key: str) -> Optional[str]:
         """Obtener valor de una clave"""
         if self.is_upstash:
@@ -75,6 +335,8 @@ class RedisClient:
         else:
             return self.client.get(key)
     
+    @protegido(si_abierto=False)
+    @medir_redis("SET")
     def set(self, key: str, value: str) -> bool:
         """Establecer valor de una clave"""
         if self.is_upstash:
@@ -83,6 +345,8 @@ class RedisClient:
         else:
             return self.client.set(key, value)
     
+    @protegido(si_abierto=False)
+    @medir_redis("SETEX")
     def setex(self, key: str, time: int, value: str) -> bool:
         """Establecer valor con TTL"""
         if self.is_upstash:
@@ -92,6 +356,33 @@ class RedisClient:
         else:
             return self.client.setex(key, time, value)
     
+    @protegido(si_abierto=lambda *keys: [None] * len(keys))
+    @medir_redis("MGET")
+    def mget(self, *keys: str) -> list:
+        """Obtener varias claves en un round-trip (None para las que no existen)"""
+        if not keys:
+            return []
+        if self.is_upstash:
+            result = self._upstash_request("MGET", *keys)
+            return result if isinstance(result, list) else [None] * len(keys)
+        else:
+            return self.client.mget(keys)
+    
+    @protegido(si_abierto=False)
+    @medir_redis("MSET")
+    def mset(self, mapping: dict) -> bool:
+        """Establecer varias claves en un round-trip (sin TTL; para TTL usar pipeline con SETEX)"""
+        if not mapping:
+            return True
+        if self.is_upstash:
+            args = [v for par in mapping.items() for v in par]
+            result = self._upstash_request("MSET", *args)
+            return result == "OK"
+        else:
+            return self.client.mset(mapping)
+    
+    @protegido(si_abierto=0, diferir=lambda *keys: [["DEL", *keys]] if keys else [])
+    @medir_redis("DEL")
     def delete(self, *keys: str) -> int:
         """Eliminar una o más claves"""
         if self.is_upstash:
@@ -100,6 +391,8 @@ class RedisClient:
         else:
             return self.client.delete(*keys)
     
+    @protegido(si_abierto=0, diferir=lambda key, *values: [["RPUSH", key, *values]])
+    @medir_redis("RPUSH")
     def rpush(self, key: str, *values: str) -> int:
         """Agregar valores al final de una lista"""
         if self.is_upstash:
@@ -108,6 +401,8 @@ class RedisClient:
         else:
             return self.client.rpush(key, *values)
     
+    @protegido(si_abierto=0, diferir=lambda channel, message: [["PUBLISH", channel, message]])
+    @medir_redis("PUBLISH")
     def publish(self, channel: str, message: str) -> int:
         """Publicar mensaje en un canal (Pub/Sub)"""
         if self.is_upstash:
@@ -117,6 +412,77 @@ class RedisClient:
         else:
             return self.client.publish(channel, message)
     
+    def suscribir(self, *canales: str):
+        """Suscribirse a canales Pub/Sub; generador bloqueante de (canal, mensaje)
+
+        Termina con excepción si se pierde la conexión; quien lo consume
+        decide si reconectar.
+        """
+        if self.is_upstash:
+            # Upstash entrega SUBSCRIBE como Server-Sent Events:
+            # "data: message,<canal>,<mensaje>" por cada publicación
+            headers = {
+                "Authorization": f"Bearer {self.upstash_token}",
+                "Accept": "text/event-stream"
+            }
+            body = ["SUBSCRIBE"] + list(canales)
+            try:
+                with httpx.Client(timeout=httpx.Timeout(10.0, read=None)) as client:
+                    with client.stream("POST", self.upstash_url, headers=headers, json=body) as response:
+                        verificar_respuesta_upstash(response)
+                        for linea in response.iter_lines():
+                            if not linea.startswith("data:"):
+                                continue
+                            partes = linea[5:].strip().split(",", 2)
+                            if len(partes) == 3 and partes[0] == "message":
+                                yield partes[1], partes[2]
+            except httpx.HTTPError as e:
+                raise ConnectionError(f"Error conectando con Upstash Redis: {str(e)}")
+        else:
+            # Conexión propia sin socket_timeout: la suscripción espera mensajes indefinidamente
+            import redis
+            pubsub = redis.Redis(**self._parametros_locales).pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(*canales)
+            try:
+                for mensaje in pubsub.listen():
+                    yield mensaje["channel"], mensaje["data"]
+            finally:
+                pubsub.close()
+    
+    @protegido(si_abierto=0, diferir=lambda key, field, amount=1: [["HINCRBY", key, field, amount]])
+    @medir_redis("HINCRBY")
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        """Incrementar atómicamente un campo de un hash"""
+        if self.is_upstash:
+            result = self._upstash_request("HINCRBY", key, field, str(amount))
+            return int(result) if result is not None else 0
+        else:
+            return self.client.hincrby(key, field, amount)
+    
+    @protegido()
+    @medir_redis("HGET")
+    def hget(self, key: str, field: str) -> Optional[str]:
+        """Obtener un campo de un hash"""
+        if self.is_upstash:
+            result = self._upstash_request("HGET", key, field)
+            return result if isinstance(result, str) or result is None else json.dumps(result)
+        else:
+            return self.client.hget(key, field)
+    
+    @protegido(si_abierto=lambda key: {})
+    @medir_redis("HGETALL")
+    def hgetall(self, key: str) -> dict:
+        """Obtener todos los campos de un hash"""
+        if self.is_upstash:
+            result = self._upstash_request("HGETALL", key)
+            # Upstash devuelve una lista plana [campo, valor, campo, valor, ...]
+            if isinstance(result, list):
+                return dict(zip(result[::2], result[1::2]))
+            return result if isinstance(result, dict) else {}
+        else:
+            return self.client.hgetall(key)
+    
+    @medir_redis("PING")
     def ping(self) -> bool:
         """Verificar conexión"""
         if self.is_upstash:
@@ -131,6 +497,8 @@ class RedisClient:
             except:
                 return False
     
+    @protegido(si_abierto=0)
+    @medir_redis("LLEN")
     def llen(self, key: str) -> int:
         """Obtener longitud de una lista"""
         if self.is_upstash:
@@ -139,6 +507,8 @@ class RedisClient:
         else:
             return self.client.llen(key)
     
+    @protegido(si_abierto=lambda key, start, end: [])
+    @medir_redis("LRANGE")
     def lrange(self, key: str, start: int, end: int) -> list:
         """Obtener rango de elementos de una lista"""
         if self.is_upstash:
@@ -0,0 +1,150 @@
+"""
+Enrutamiento de lecturas a réplicas de PostgreSQL
+Los endpoints de solo lectura piden su sesión a EnrutadorLecturas, que
+elige una réplica sana y al día o, si no hay ninguna, la primaria.
+
+Lectura de las propias escrituras: cada escritura responde con el LSN de
+la primaria en el encabezado X-Consistencia; si el cliente lo reenvía, solo
+se usan réplicas que ya reprodujeron ese LSN (medido por la verificación
+periódica, así que el criterio es conservador).
+"""
+
+import itertools
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from metricas import DB_LECTURAS, DB_REPLICA_RETRASO
+
+logger = logging.getLogger(__name__)
+
+ENCABEZADO_CONSISTENCIA = "X-Consistencia"
+
+# Sin escrituras en la primaria pg_last_xact_replay_timestamp() no avanza:
+# si la réplica ya reprodujo todo lo recibido, el retraso es 0
+CONSULTA_ESTADO = text("""
+    SELECT
+        CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END::text,
+        CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+             ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+""")
+
+
+def lsn_a_entero(lsn: str) -> int:
+    """'16/B374D848' -> posición en bytes (comparable)"""
+    alto, bajo = lsn.split("/")
+    return (int(alto, 16) << 32) | int(bajo, 16)
+
+
+class Replica:
+    def __init__(self, url: str, **opciones_pool):
+        destino = make_url(url)
+        self.nombre = f"{destino.host}:{destino.port or 5432}" if destino.host else destino.database
+        self.engine = create_engine(url, pool_pre_ping=True, **opciones_pool)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.lsn: Optional[int] = None
+        self.retraso: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def verificar(self):
+        """Actualizar LSN reproducido y retraso (segundos) de la réplica"""
+        try:
+            with self.engine.connect() as conn:
+                lsn, retraso = conn.execute(CONSULTA_ESTADO).one()
+            self.lsn, self.retraso, self.error = lsn_a_entero(lsn), float(retraso or 0), None
+            DB_REPLICA_RETRASO.labels(self.nombre).set(self.retraso)
+        except Exception as e:
+            if self.error is None:
+                logger.warning(f"Réplica {self.nombre} no disponible: {str(e)}")
+            self.lsn, self.retraso, self.error = None, None, str(e)
+
+
+class EnrutadorLecturas:
+    """Reparte las lecturas entre réplicas (round-robin) con retraso máximo y LSN mínimo"""
+
+    def __init__(self, sesion_primaria, engine_primario, urls: list, retraso_max: float, intervalo: float,
+                 **opciones_pool):
+        self.sesion_primaria = sesion_primaria
+        self.engine_primario = engine_primario
+        self.replicas = [Replica(url, **opciones_pool) for url in urls]
+        self.retraso_max = retraso_max
+        self.intervalo = intervalo
+        self._turno = itertools.count()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _elegir(self, lsn_minimo: Optional[int]) -> Optional[Replica]:
+        candidatas = [
+            r for r in self.replicas
+            if r.error is None and r.retraso is not None and r.retraso <= self.retraso_max
+            and (lsn_minimo is None or (r.lsn is not None and r.lsn >= lsn_minimo))
+        ]
+        if not candidatas:
+            return None
+        return candidatas[next(self._turno) % len(candidatas)]
+
+    def sesion(self, consistencia: Optional[str] = None):
+        """Sesión de lectura; `consistencia` es el LSN recibido en X-Consistencia"""
+        lsn_minimo = None
+        if consistencia:
+            try:
+                lsn_minimo = lsn_a_entero(consistencia)
+            except ValueError:
+                # Token inválido: la primaria siempre está al día
+                DB_LECTURAS.labels("primaria").inc()
+                return self.sesion_primaria()
+        replica = self._elegir(lsn_minimo)
+        DB_LECTURAS.labels("replica" if replica else "primaria").inc()
+        return replica.SessionLocal() if replica else self.sesion_primaria()
+
+    def engine_lectura(self):
+        """Engine para lecturas largas sin token (exportaciones en streaming)"""
+        replica = self._elegir(None)
+        DB_LECTURAS.labels("replica" if replica else "primaria").inc()
+        return replica.engine if replica else self.engine_primario
+
+    def lsn_primaria(self) -> str:
+        """LSN actual de la primaria: token de consistencia tras una escritura"""
+        with self.engine_primario.connect() as conn:
+            return conn.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+
+    def _verificar_periodicamente(self):
+        while not self._detener.wait(self.intervalo):
+            for replica in self.replicas:
+                replica.verificar()
+
+    def iniciar(self):
+        if not self.replicas:
+            return
+        for replica in self.replicas:
+            replica.verificar()
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._verificar_periodicamente, name="verificar-replicas", daemon=True)
+        self._hilo.start()
+        logger.info(f"Lecturas enrutadas a {len(self.replicas)} réplica(s): "
+                    f"{', '.join(r.nombre for r in self.replicas)}")
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=self.intervalo + 1)
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+    def estado(self) -> dict:
+        """Estado por réplica para /health"""
+        resultado = {}
+        for r in self.replicas:
+            if r.error:
+                resultado[r.nombre] = f"error: {r.error}"
+            elif r.retraso is None:
+                resultado[r.nombre] = "sin verificar"
+            elif r.retraso > self.retraso_max:
+                resultado[r.nombre] = f"retrasada ({r.retraso:.1f} s)"
+            else:
+                resultado[r.nombre] = f"ok ({r.retraso:.2f} s)"
+        return resultado
@@ -0,0 +1,112 @@
+"""
+Arranque de producción del API: varios procesos uvicorn
+Un proceso por núcleo (WEB_WORKERS), uvloop + httptools si están instalados
+(uvicorn[standard]), backlog y keep-alive configurables y pool de conexiones
+por proceso dimensionado para que el total no supere DB_CONEXIONES_MAX.
+
+Reinicio sin cortes: `kill -HUP <pid del proceso padre>` reemplaza los
+procesos uno a uno; cada nuevo entra en servicio antes de retirar al viejo,
+que termina sus peticiones en curso (hasta 5 s).
+
+Uso:
+    python servidor.py
+    python servidor.py --workers 4 --port 8000
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("servidor")
+
+# Conexiones mínimas por proceso; con menos se reduce la cantidad de procesos
+MIN_CONEXIONES_POR_WORKER = 2
+
+
+def nucleos_disponibles() -> int:
+    """Núcleos que puede usar este proceso (respeta la afinidad de CPU en contenedores)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def calcular_workers(solicitados: int) -> int:
+    """WEB_WORKERS (0 = un proceso por núcleo), acotado por el presupuesto de conexiones"""
+    workers = solicitados or nucleos_disponibles()
+    # +1: durante un reinicio conviven el proceso nuevo y el que se retira
+    maximo = max(settings.DB_CONEXIONES_MAX // MIN_CONEXIONES_POR_WORKER - 1, 1)
+    if workers > maximo:
+        logger.warning(
+            f"{workers} procesos no caben en DB_CONEXIONES_MAX={settings.DB_CONEXIONES_MAX} "
+            f"(mínimo {MIN_CONEXIONES_POR_WORKER} conexiones por proceso): se usan {maximo}"
+        )
+        workers = maximo
+    return workers
+
+
+def dimensionar_pool(workers: int) -> tuple:
+    """(pool_size, max_overflow) por proceso: DB_POOL_SIZE/DB_MAX_OVERFLOW recortados al presupuesto"""
+    por_worker = settings.DB_CONEXIONES_MAX // (workers + 1)
+    pool_size = min(settings.DB_POOL_SIZE, por_worker)
+    max_overflow = min(settings.DB_MAX_OVERFLOW, por_worker - pool_size)
+    return pool_size, max_overflow
+
+
+def preparar_metricas() -> str:
+    """Directorio de métricas multiproceso de Prometheus, sin archivos de ejecuciones anteriores"""
+    directorio = Path(os.environ.get("PROMETHEUS_MULTIPROC_DIR") or Path(tempfile.gettempdir()) / "metricas-api")
+    directorio.mkdir(parents=True, exist_ok=True)
+    for archivo in directorio.glob("*.db"):
+        archivo.unlink()
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(directorio)
+    return str(directorio)
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de producción del API (varios procesos)")
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS, help="Procesos (0 = uno por núcleo)")
+    parser.add_argument("--host", default=settings.API_HOST)
+    parser.add_argument("--port", type=int, default=settings.API_PORT)
+    args = parser.parse_args()
+
+    workers = calcular_workers(args.workers)
+    pool_size, max_overflow = dimensionar_pool(workers)
+    # Los procesos hijos leen la configuración del entorno al importar main
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+    directorio_metricas = preparar_metricas()
+
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    logger.info(
+        f"{workers} proceso(s) en {args.host}:{args.port} | loop={loop} http={http} | "
+        f"pool por proceso {pool_size}+{max_overflow} (DB_CONEXIONES_MAX={settings.DB_CONEXIONES_MAX}) | "
+        f"métricas en {directorio_metricas}"
+    )
+
+    config = uvicorn.Config(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=settings.WEB_BACKLOG,
+        timeout_keep_alive=settings.WEB_KEEPALIVE_SEGUNDOS,
+        # Los flujos de /events no terminan solos: no esperar indefinidamente al apagar
+        timeout_graceful_shutdown=5
+    )
+    # Supervisor de uvicorn también con un solo proceso: así SIGHUP siempre reinicia sin cortes
+    Multiprocess(config, sockets=[config.bind_socket()]).run()
+
+
+if __name__ == "__main__":
+    main()
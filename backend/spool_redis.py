@@ -0,0 +1,92 @@
+"""
+Spool en disco de escrituras a Redis (SQLite, solo biblioteca estándar)
+Mientras el circuito de Redis está abierto, las escrituras que no se pueden
+perder (encolar tareas, invalidaciones, contadores, eventos) se guardan
+aquí en orden de llegada y se reenvían por bloques cuando Redis se recupera.
+
+Un archivo por host, compartido por todos los procesos del API (modo WAL).
+Solo un proceso reenvía a la vez (turno con vencimiento en la tabla
+`turno`), y lo pendiente sobrevive a reinicios y deploys.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+SINCRONIZACIONES = {
+    "full": "FULL",      # fsync en cada escritura: no se pierde nada aunque se caiga el host
+    "normal": "NORMAL",  # fsync en cada checkpoint del WAL: resiste caídas del proceso
+    "off": "OFF",        # sin fsync: lo decide el sistema operativo
+}
+DURACION_TURNO = 30  # segundos; se renueva con cada bloque reenviado
+
+
+class SpoolLleno(Exception):
+    """El spool alcanzó su tamaño máximo"""
+
+
+class SpoolRedis:
+    """Cola FIFO persistente de comandos Redis ([comando, arg, ...])"""
+
+    def __init__(self, archivo: str, max_mb: float, sincronizacion: str = "normal"):
+        if sincronizacion not in SINCRONIZACIONES:
+            raise ValueError(f"Sincronización de spool no válida: {sincronizacion} (usar full, normal u off)")
+        self.archivo = archivo
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(archivo, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={SINCRONIZACIONES[sincronizacion]}")
+        tamanio_pagina = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        self._conn.execute(f"PRAGMA max_page_count={max(int(max_mb * 1024 * 1024 / tamanio_pagina), 16)}")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS comandos (id INTEGER PRIMARY KEY AUTOINCREMENT, comando TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS turno (id INTEGER PRIMARY KEY CHECK (id = 1), propietario TEXT, hasta REAL)")
+        self._conn.execute("INSERT OR IGNORE INTO turno (id, propietario, hasta) VALUES (1, NULL, 0)")
+
+    def agregar(self, comandos: list):
+        """Guardar comandos al final (todos o ninguno); SpoolLleno si no caben"""
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany(
+                    "INSERT INTO comandos (comando) VALUES (?)",
+                    [(json.dumps(comando),) for comando in comandos]
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.OperationalError as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                if "full" in str(e):
+                    raise SpoolLleno(str(e))
+                raise
+
+    def leer(self, cantidad: int) -> list:
+        """Los `cantidad` comandos más antiguos como [(id, comando), ...] sin quitarlos"""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT id, comando FROM comandos ORDER BY id LIMIT ?", (cantidad,)
+            ).fetchall()
+        return [(id_, json.loads(comando)) for id_, comando in filas]
+
+    def confirmar(self, hasta_id: int):
+        """Quitar los comandos ya reenviados (hasta `hasta_id` inclusive)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM comandos WHERE id <= ?", (hasta_id,))
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM comandos").fetchone()[0]
+
+    def tomar_turno(self, propietario: str) -> bool:
+        """Reservar (o renovar) el turno de reenvío; False si lo tiene otro proceso"""
+        ahora = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE turno SET propietario = ?, hasta = ? WHERE id = 1 AND (hasta < ? OR propietario = ?)",
+                (propietario, ahora + DURACION_TURNO, ahora, propietario)
+            )
+            return cursor.rowcount == 1
+
+    def soltar_turno(self, propietario: str):
+        with self._lock:
+            self._conn.execute("UPDATE turno SET hasta = 0 WHERE id = 1 AND propietario = ?", (propietario,))
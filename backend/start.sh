@@ -19,5 +19,5 @@ fi
 
 # Iniciar servidor
 echo "✅ Iniciando servidor en http://localhost:8000"
-python main.py
+python servidor.py
 
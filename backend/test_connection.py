@@ -3,6 +3,7 @@ Script de prueba para verificar conexiones
 """
 
 from config import settings
+from consultas import url_psycopg
 from redis_client import redis_client
 from sqlalchemy import create_engine, text
 
@@ -15,7 +16,7 @@ def test_database():
         safe_url = db_url.split('@')[1] if '@' in db_url else db_url
         print(f"   URL: postgresql://***@{safe_url}")
         
-        engine = create_engine(db_url, pool_pre_ping=True)
+        engine = create_engine(url_psycopg(db_url), pool_pre_ping=True)
         with engine.connect() as conn:
             result = conn.execute(text("SELECT version()"))
             version = result.fetchone()[0]
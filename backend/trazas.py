@@ -0,0 +1,100 @@
+"""
+Trazas distribuidas (OpenTelemetry)
+Spans de peticiones, comandos Redis y sentencias SQL; el contexto viaja
+dentro de las tareas de cola:batch:procesar hasta el Batch Worker
+"""
+
+import logging
+
+from opentelemetry import propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sin TracerProvider configurado la API de OpenTelemetry es no-op
+tracer = trace.get_tracer("tickets.api")
+
+
+def configurar_trazas(servicio: str):
+    """Registrar el exportador de TRAZAS_EXPORTADOR ("" = desactivado)
+
+    - otlp: OTLP/HTTP a OTEL_EXPORTER_OTLP_ENDPOINT (por defecto http://localhost:4318)
+    - archivo: un span JSON por línea en TRAZAS_ARCHIVO
+    """
+    exportador = settings.TRAZAS_EXPORTADOR.strip().lower()
+    if not exportador:
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if exportador == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        destino = OTLPSpanExporter()
+    elif exportador == "archivo":
+        destino = ConsoleSpanExporter(
+            out=open(settings.TRAZAS_ARCHIVO, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    else:
+        raise ValueError(f"TRAZAS_EXPORTADOR no válido: {exportador} (usar otlp o archivo)")
+
+    proveedor = TracerProvider(resource=Resource.create({"service.name": servicio}))
+    proveedor.add_span_processor(BatchSpanProcessor(destino))
+    trace.set_tracer_provider(proveedor)
+    logger.info(f"Trazas OpenTelemetry activas ({exportador}) para {servicio}")
+
+
+def cerrar_trazas():
+    """Exportar los spans pendientes antes de terminar el proceso"""
+    proveedor = trace.get_tracer_provider()
+    if hasattr(proveedor, "shutdown"):
+        proveedor.shutdown()
+
+
+def inyectar_contexto(tarea: dict) -> dict:
+    """Agregar el contexto de la traza actual (traceparent) a una tarea encolada"""
+    portador = {}
+    propagate.inject(portador)
+    if portador:
+        tarea["traza"] = portador
+    return tarea
+
+
+def extraer_contexto(portador):
+    """Contexto padre desde encabezados HTTP o el campo "traza" de una tarea"""
+    return propagate.extract(portador or {})
+
+
+def instrumentar_sql(engine):
+    """Un span por sentencia SQL (hijo del span activo de la petición o tarea)"""
+    if not settings.TRAZAS_EXPORTADOR:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _iniciar(conn, cursor, statement, parameters, contexto, executemany):
+        operacion = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        contexto._span_sql = tracer.start_span(
+            f"SQL {operacion}",
+            kind=SpanKind.CLIENT,
+            attributes={"db.system": "postgresql", "db.operation": operacion, "db.statement": statement}
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _terminar(conn, cursor, statement, parameters, contexto, executemany):
+        span = getattr(contexto, "_span_sql", None)
+        if span is not None:
+            span.set_attribute("db.rowcount", cursor.rowcount)
+            span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _fallar(contexto_excepcion):
+        span = getattr(contexto_excepcion.execution_context, "_span_sql", None)
+        if span is not None:
+            span.record_exception(contexto_excepcion.original_exception)
+            span.set_status(Status(StatusCode.ERROR))
+            span.end()
@@ -0,0 +1,76 @@
+"""
+Backfill de la tabla estadisticas_diarias
+Recalcula el rollup desde tickets para un rango de fechas (o completo) y
+verifica que coincida con un conteo directo sobre tickets.
+
+Con --verificar no recalcula: solo compara lo que mantuvieron los triggers
+contra el conteo directo (termina con código 1 si hay diferencias).
+
+Uso:
+    python backfill_estadisticas.py
+    python backfill_estadisticas.py --desde 2024-01-01 --hasta 2024-12-31
+    python backfill_estadisticas.py --verificar
+"""
+
+import argparse
+import sys
+
+from sqlalchemy import text
+
+from main import SessionLocal, recalcular_estadisticas
+
+# Grupos cuyo conteo en estadisticas_diarias no coincide con tickets (una sola
+# instantánea para ambos lados: la comparación es consistente aunque haya escrituras)
+SQL_DIFERENCIAS = """
+    WITH esperado AS (
+        SELECT (fecha_creacion AT TIME ZONE 'UTC')::DATE AS fecha, estado, prioridad, COUNT(*) AS cantidad
+        FROM tickets
+        WHERE (CAST(:desde AS DATE) IS NULL OR fecha_creacion >= (CAST(:desde AS DATE)::TIMESTAMP AT TIME ZONE 'UTC'))
+          AND (CAST(:hasta AS DATE) IS NULL OR fecha_creacion < ((CAST(:hasta AS DATE) + 1)::TIMESTAMP AT TIME ZONE 'UTC'))
+        GROUP BY 1, 2, 3
+    ), actual AS (
+        SELECT fecha, estado, prioridad, cantidad
+        FROM estadisticas_diarias
+        WHERE cantidad <> 0
+          AND (CAST(:desde AS DATE) IS NULL OR fecha >= CAST(:desde AS DATE))
+          AND (CAST(:hasta AS DATE) IS NULL OR fecha <= CAST(:hasta AS DATE))
+    )
+    SELECT fecha, estado, prioridad, COALESCE(a.cantidad, 0) AS rollup, COALESCE(e.cantidad, 0) AS tickets
+    FROM esperado e
+    FULL JOIN actual a USING (fecha, estado, prioridad)
+    WHERE a.cantidad IS DISTINCT FROM e.cantidad
+    ORDER BY fecha, estado, prioridad
+"""
+
+def verificar(db, desde, hasta) -> list:
+    """Diferencias (fecha, estado, prioridad, rollup, tickets) entre el rollup y tickets"""
+    filas = db.execute(text(SQL_DIFERENCIAS), {"desde": desde, "hasta": hasta}).fetchall()
+    db.commit()
+    return filas
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcular estadisticas_diarias desde tickets")
+    parser.add_argument("--desde", default=None, help="Fecha inicial (YYYY-MM-DD), inclusiva")
+    parser.add_argument("--hasta", default=None, help="Fecha final (YYYY-MM-DD), inclusiva")
+    parser.add_argument("--verificar", action="store_true", help="Solo comparar el rollup con tickets, sin recalcular")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if not args.verificar:
+            filas = recalcular_estadisticas({"desde": args.desde, "hasta": args.hasta}, db)
+            print(f"[OK] {filas} grupos recalculados")
+
+        diferencias = verificar(db, args.desde, args.hasta)
+    finally:
+        db.close()
+
+    if diferencias:
+        print(f"[ERROR] {len(diferencias)} grupos no coinciden con tickets:")
+        for fecha, estado, prioridad, rollup, tickets in diferencias[:20]:
+            print(f"  {fecha} {estado:<10} {prioridad:<8} rollup={rollup} tickets={tickets}")
+        sys.exit(1)
+    print("[OK] estadisticas_diarias coincide con tickets")
+
+if __name__ == "__main__":
+    main()
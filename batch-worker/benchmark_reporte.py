@@ -0,0 +1,64 @@
+"""
+Benchmark de generar_reporte: recorrido de tickets vs rollup estadisticas_diarias
+
+Uso:
+    python benchmark_reporte.py --dias 30 --repeticiones 50
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from main import SessionLocal
+
+CONSULTA_RECORRIDO = """
+    SELECT estado, COUNT(*) as cantidad
+    FROM tickets
+    WHERE DATE(fecha_creacion) BETWEEN CAST(:desde AS DATE) AND CAST(:hasta AS DATE)
+    GROUP BY estado
+"""
+
+CONSULTA_ROLLUP = """
+    SELECT estado, SUM(cantidad) as cantidad
+    FROM estadisticas_diarias
+    WHERE fecha BETWEEN CAST(:desde AS DATE) AND CAST(:hasta AS DATE)
+    GROUP BY estado
+"""
+
+def medir(db, consulta, params, repeticiones):
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = db.execute(text(consulta), params).fetchall()
+        latencias.append(time.perf_counter() - inicio)
+    latencias.sort()
+    p50 = latencias[len(latencias) // 2] * 1000
+    p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000
+    return p50, p99, {row[0]: int(row[1]) for row in resultado}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latencia del reporte de estadísticas")
+    parser.add_argument("--dias", type=int, default=1, help="Días hacia atrás incluidos en el reporte")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+    
+    hasta = datetime.now(timezone.utc).date()
+    params = {"desde": str(hasta - timedelta(days=args.dias - 1)), "hasta": str(hasta)}
+    
+    db = SessionLocal()
+    try:
+        total = db.execute(text("SELECT COUNT(*) FROM tickets")).scalar()
+        print("=" * 60)
+        print(f"BENCHMARK DE REPORTE - {total:,} tickets, rango {params['desde']} a {params['hasta']}")
+        print("=" * 60)
+        
+        for nombre, consulta in (("recorrido", CONSULTA_RECORRIDO), ("rollup", CONSULTA_ROLLUP)):
+            p50, p99, resultado = medir(db, consulta, params, args.repeticiones)
+            print(f"{nombre:<10} p50 {p50:>9.3f} ms   p99 {p99:>9.3f} ms   {resultado}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,10 @@ class Settings(BaseSettings):
     # Fallback: Usar la misma URL del API si no está configurado el batch
     SUPABASE_DB_URL: Optional[str] = None  # URL del API (fallback)
     
+    # Réplica de lectura para reportes (generar_reporte); vacío = primaria
+    SUPABASE_DB_URL_REPLICA_BATCH: Optional[str] = None
+    REPLICA_RETRASO_MAX_SEGUNDOS: float = 30  # Más retrasada: el reporte se lee de la primaria
+    
     # Redis Configuration (Upstash)
     UPSTASH_REDIS_REST_URL: Optional[str] = None
     UPSTASH_REDIS_REST_TOKEN: Optional[str] = None
@@ -36,6 +40,36 @@ class Settings(BaseSettings):
     COLA_FALLIDAS: str = "cola:batch:fallidas"
     TIMEOUT_BLPOP: int = 30  # Segundos
     
+    # Procesamiento incremental de tickets vencidos
+    VENCIDOS_CHUNK_SIZE: int = 1000
+    CHECKPOINT_VENCIDOS: str = "batch:checkpoint:tickets_vencidos"
+    
+    # Reconciliación de contadores del dashboard (hash stats:tickets)
+    CLAVE_STATS_TICKETS: str = "stats:tickets"
+    RECONCILIAR_CONTADORES_SEGUNDOS: int = 300  # 0 = desactivado
+    
+    # Mantenimiento programado de particiones de interacciones (sin partición DEFAULT:
+    # si la ventana de particiones futuras se agota, los INSERT fallan)
+    MANTENER_PARTICIONES_SEGUNDOS: int = 21600  # 0 = desactivado
+    PARTICIONES_MESES_ADELANTE: int = 3
+    PARTICIONES_MESES_RETENCION: int = 0  # Meses a conservar vinculados; 0 = no desvincular en la ejecución programada
+    
+    # Precalentamiento de caché (tarea precalentar_cache)
+    CALENTAMIENTO_LOTE: int = 100  # SETEX por pipeline
+    CALENTAMIENTO_CLAVES_POR_SEGUNDO: int = 1000  # 0 = sin límite
+    LISTAS_CACHE_TTL: int = 60  # Igual que en el backend
+    
+    # Limpieza de caché por patrón (tarea limpiar_cache)
+    LIMPIEZA_LOTE: int = 500  # COUNT de cada SCAN
+    LIMPIEZA_CLAVES_POR_SEGUNDO: int = 5000  # 0 = sin límite
+    
+    # Métricas Prometheus (servidor HTTP en /metrics)
+    METRICAS_PUERTO: int = 9101  # 0 = desactivado
+    
+    # Trazas OpenTelemetry: "" (desactivado), "otlp" (OTEL_EXPORTER_OTLP_ENDPOINT) o "archivo"
+    TRAZAS_EXPORTADOR: str = ""
+    TRAZAS_ARCHIVO: str = "trazas.jsonl"  # Un span JSON por línea
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -3,15 +3,21 @@ Batch Worker - Procesamiento Asíncrono de Tareas
 FASE 2: Integración de Servicios
 """
 
+import hashlib
 import json
 import time
 from datetime import datetime, timezone
+from typing import Optional
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 import logging
 
 from config import settings
 from redis_client import redis_client
+from metricas import TAREA_DURACION, TAREA_FALLOS, instrumentar_pool, registrar_colas
+from prometheus_client import start_http_server
+from trazas import cerrar_trazas, configurar_trazas, extraer_contexto, instrumentar_sql, tracer
+from opentelemetry.trace import SpanKind
 
 # Configuración de logging
 logging.basicConfig(
@@ -24,6 +30,22 @@ logger = logging.getLogger(__name__)
 DATABASE_URL = settings.get_database_url()
 engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_size=3, max_overflow=5)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrumentar_pool(engine)
+instrumentar_sql(engine)
+
+# Réplica de lectura opcional para tareas que toleran datos algo atrasados (reportes)
+ReplicaSession = None
+if settings.SUPABASE_DB_URL_REPLICA_BATCH:
+    engine_replica = create_engine(settings.SUPABASE_DB_URL_REPLICA_BATCH, pool_pre_ping=True, pool_size=1, max_overflow=2)
+    ReplicaSession = sessionmaker(autocommit=False, autoflush=False, bind=engine_replica)
+    instrumentar_sql(engine_replica)
+
+# Retraso de reproducción; 0 si la réplica ya aplicó todo lo recibido (o si no es réplica)
+CONSULTA_RETRASO_REPLICA = text("""
+    SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+""")
+registrar_colas(redis_client, [settings.COLA_PRINCIPAL, settings.COLA_PROCESADAS, settings.COLA_FALLIDAS])
 
 # ============================================
 # FUNCIONES DE PROCESAMIENTO
@@ -55,96 +77,481 @@ def procesar_ticket_creado(tarea: dict, db):
     
     db.commit()
 
+def _leer_checkpoint(clave: str) -> Optional[dict]:
+    """Leer cursor guardado en Redis (Upstash puede devolverlo ya parseado)"""
+    valor = redis_client.get(clave)
+    if not valor:
+        return None
+    if isinstance(valor, str):
+        valor = json.loads(valor)
+    return valor
+
 def procesar_tickets_vencidos(tarea: dict, db):
-    """Procesar tickets vencidos usando procedimiento almacenado"""
+    """Procesar tickets vencidos por bloques, reanudando desde el checkpoint en Redis
+
+    Recorre los tickets con keyset sobre (fecha_creacion, id) usando
+    procesar_tickets_vencidos_lote(). Tras cada bloque guarda el cursor en
+    Redis y publica un evento de progreso, de modo que una ejecución
+    interrumpida continúa donde quedó y la siguiente solo lee los tickets
+    que vencieron después. Con "reiniciar": true se recorre desde el inicio.
+    """
     # Asegurarse de que tarea es un dict
     if isinstance(tarea, str):
-        import json
         tarea = json.loads(tarea)
     
-    logger.info("Ejecutando procedimiento: procesar_tickets_vencidos")
+    tamano_bloque = int(tarea.get("tamano_bloque", settings.VENCIDOS_CHUNK_SIZE))
     
-    # Ejecutar procedimiento almacenado
-    result = db.execute(
-        text("SELECT * FROM procesar_tickets_vencidos()")
-    ).fetchall()
+    if tarea.get("reiniciar"):
+        redis_client.delete(settings.CHECKPOINT_VENCIDOS)
+    checkpoint = _leer_checkpoint(settings.CHECKPOINT_VENCIDOS) or {}
     
-    tickets_vencidos = []
-    for row in result:
-        tickets_vencidos.append({
-            "ticket_id": str(row[0]),
-            "dias_abierto": row[1],
-            "estado_actual": row[2]
-        })
+    logger.info(f"Ejecutando procedimiento: procesar_tickets_vencidos_lote (desde {checkpoint or 'el inicio'})")
+    
+    total = 0
+    bloque = 0
+    while True:
+        # Solo se materializa un bloque a la vez
+        filas = db.execute(
+            text("SELECT * FROM procesar_tickets_vencidos_lote(:desde_fecha, :desde_id, :limite)"),
+            {
+                "desde_fecha": checkpoint.get("fecha_creacion"),
+                "desde_id": checkpoint.get("id"),
+                "limite": tamano_bloque
+            }
+        ).fetchall()
+        db.commit()
+        
+        if not filas:
+            break
+        
+        bloque += 1
+        total += len(filas)
+        ultima = filas[-1]
+        checkpoint = {"fecha_creacion": ultima[3].isoformat(), "id": str(ultima[0])}
+        redis_client.set(settings.CHECKPOINT_VENCIDOS, json.dumps(checkpoint))
+        
+        redis_client.publish(
+            "canal:batch:eventos",
+            json.dumps({
+                "evento": "tickets_vencidos_progreso",
+                "bloque": bloque,
+                "cantidad": len(filas),
+                "acumulado": total,
+                "checkpoint": checkpoint,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            })
+        )
+        logger.info(f"Bloque {bloque}: {len(filas)} tickets vencidos (acumulado {total})")
+        
+        if len(filas) < tamano_bloque:
+            break
     
-    logger.info(f"Encontrados {len(tickets_vencidos)} tickets vencidos")
+    logger.info(f"Encontrados {total} tickets vencidos nuevos")
     
     # Publicar resultado
     redis_client.publish(
         "canal:batch:eventos",
         json.dumps({
             "evento": "tickets_vencidos_procesados",
-            "cantidad": len(tickets_vencidos),
+            "cantidad": total,
+            "bloques": bloque,
             "timestamp": datetime.now(timezone.utc).isoformat()
         })
     )
     
-    return tickets_vencidos
+    return {"cantidad": total, "bloques": bloque, "checkpoint": checkpoint}
+
+def sesion_lectura():
+    """Sesión en la réplica si está configurada y dentro de REPLICA_RETRASO_MAX_SEGUNDOS; si no, la primaria"""
+    if ReplicaSession is None:
+        return SessionLocal()
+    db = ReplicaSession()
+    try:
+        retraso = float(db.execute(CONSULTA_RETRASO_REPLICA).scalar() or 0)
+        if retraso <= settings.REPLICA_RETRASO_MAX_SEGUNDOS:
+            return db
+        logger.warning(f"Réplica retrasada {retraso:.1f} s: se usa la primaria")
+    except Exception as e:
+        logger.warning(f"Réplica no disponible, se usa la primaria: {str(e)}")
+    db.close()
+    return SessionLocal()
 
 def generar_reporte(tarea: dict, db):
-    """Generar reporte de estadísticas"""
+    """Generar reporte de estadísticas desde el rollup estadisticas_diarias
+
+    Acepta "fecha" (un día) o "desde"/"hasta" (rango inclusivo). Lee la
+    tabla pre-agregada en lugar de recorrer tickets con DATE(fecha_creacion).
+    """
     # Asegurarse de que tarea es un dict
     if isinstance(tarea, str):
         import json
         tarea = json.loads(tarea)
     
-    fecha = tarea.get("fecha", datetime.now().strftime("%Y-%m-%d"))
-    logger.info(f"Generando reporte para fecha: {fecha}")
+    fecha = tarea.get("fecha", datetime.now(timezone.utc).strftime("%Y-%m-%d"))
+    desde = tarea.get("desde", fecha)
+    hasta = tarea.get("hasta", desde)
+    logger.info(f"Generando reporte para rango: {desde} a {hasta}")
     
     # Consultar estadísticas (solo SELECT permitido para rol_batch)
     stats = db.execute(
         text("""
-            SELECT 
-                estado,
-                COUNT(*) as cantidad
-            FROM tickets
-            WHERE DATE(fecha_creacion) = :fecha
-            GROUP BY estado
+            SELECT estado, prioridad, SUM(cantidad) as cantidad
+            FROM estadisticas_diarias
+            WHERE fecha BETWEEN CAST(:desde AS DATE) AND CAST(:hasta AS DATE)
+            GROUP BY estado, prioridad
+            HAVING SUM(cantidad) > 0
         """),
-        {"fecha": fecha}
+        {"desde": desde, "hasta": hasta}
     ).fetchall()
     
-    reporte = {row[0]: row[1] for row in stats}
+    reporte = {"desde": desde, "hasta": hasta, "total": 0, "por_estado": {}, "por_prioridad": {}}
+    for estado, prioridad, cantidad in stats:
+        reporte["total"] += cantidad
+        reporte["por_estado"][estado] = reporte["por_estado"].get(estado, 0) + cantidad
+        reporte["por_prioridad"][prioridad] = reporte["por_prioridad"].get(prioridad, 0) + cantidad
     logger.info(f"Reporte generado: {reporte}")
     
     return reporte
 
-def limpiar_cache(tarea: dict):
-    """Limpiar caché según patrón"""
+def recalcular_estadisticas(tarea: dict, db):
+    """Backfill de estadisticas_diarias para un rango (o completo sin rango)"""
+    # Asegurarse de que tarea es un dict
+    if isinstance(tarea, str):
+        tarea = json.loads(tarea)
+    
+    desde = tarea.get("desde")
+    hasta = tarea.get("hasta")
+    logger.info(f"Recalculando estadísticas diarias: {desde or 'inicio'} a {hasta or 'hoy'}")
+    
+    filas = db.execute(
+        text("SELECT recalcular_estadisticas_diarias(CAST(:desde AS DATE), CAST(:hasta AS DATE))"),
+        {"desde": desde, "hasta": hasta}
+    ).scalar()
+    db.commit()
+    
+    logger.info(f"Estadísticas recalculadas: {filas} grupos")
+    
+    return filas
+
+def reconciliar_contadores(tarea: dict, db):
+    """Reemplazar el hash de contadores del dashboard con los valores de PostgreSQL
+
+    Los contadores se mantienen con HINCRBY desde el API; si Redis perdió
+    datos o una escritura no llegó a incrementarlos, esta tarea los corrige.
+    La agregación es la función contadores_tickets (la misma que usa el API
+    cuando el hash no existe). Se construye en una clave temporal y se aplica
+    con RENAME.
+    """
+    rows = db.execute(text("SELECT campo, cantidad FROM contadores_tickets()")).fetchall()
+    
+    campos = {"total": 0, **dict(rows)}
+    campos["reconciliado_en"] = datetime.now(timezone.utc).isoformat()
+    
+    temporal = f"{settings.CLAVE_STATS_TICKETS}:tmp"
+    redis_client.pipeline([
+        ["DEL", temporal],
+        ["HSET", temporal, *(v for par in campos.items() for v in par)],
+        ["RENAME", temporal, settings.CLAVE_STATS_TICKETS]
+    ])
+    
+    logger.info(f"Contadores reconciliados: {campos['total']} tickets")
+    
+    return campos
+
+def mantener_particiones(tarea: dict, db):
+    """Crear particiones futuras de interacciones y desvincular las antiguas"""
     # Asegurarse de que tarea es un dict
     if isinstance(tarea, str):
         import json
         tarea = json.loads(tarea)
     
-    patron = tarea.get("patron", "ticket:*")
-    logger.info(f"Limpiando caché con patrón: {patron}")
+    meses_adelante = int(tarea.get("meses_adelante", 3))
+    meses_retencion = int(tarea.get("meses_retencion", 12))
+    logger.info(f"Manteniendo particiones de interacciones: +{meses_adelante} meses, retención {meses_retencion} meses")
+    
+    creadas = db.execute(
+        text("SELECT crear_particiones_interacciones(:meses)"),
+        {"meses": meses_adelante}
+    ).scalar()
+    
+    # meses_retencion <= 0: solo crear (la ejecución programada no desvincula salvo que se configure)
+    desvinculadas = [
+        row[0] for row in db.execute(
+            text("SELECT * FROM desvincular_particiones_interacciones(:meses)"),
+            {"meses": meses_retencion}
+        )
+    ] if meses_retencion > 0 else []
+    
+    db.commit()
+    
+    logger.info(f"Particiones creadas: {creadas} - Desvinculadas: {desvinculadas}")
+    
+    return {"creadas": creadas, "desvinculadas": desvinculadas}
+
+# Mismas columnas, claves y TTL que obtener_ticket / obtener_usuario del API
+# Plan del precalentamiento: solo ids; los valores se leen por bloque al escribir
+SQL_CALENTAR_TICKETS_RECIENTES = """
+    SELECT id
+    FROM tickets
+    ORDER BY fecha_actualizacion DESC
+    LIMIT :limite
+"""
+SQL_CALENTAR_USUARIOS = """
+    SELECT id
+    FROM usuarios
+    WHERE activo = TRUE
+    LIMIT :limite
+"""
+SQL_CALENTAR_TICKETS_PAGINA = """
+    SELECT id, usuario_id, titulo, descripcion, estado, prioridad, fecha_creacion, fecha_actualizacion
+    FROM tickets
+    WHERE (CAST(:estado AS VARCHAR) IS NULL OR estado = :estado)
+    ORDER BY fecha_creacion DESC
+    LIMIT :limite OFFSET :skip
+"""
+SQL_CALENTAR_TICKETS_POR_IDS = """
+    SELECT id, usuario_id, titulo, descripcion, estado, prioridad, fecha_creacion, fecha_actualizacion
+    FROM tickets
+    WHERE id = ANY(CAST(:ids AS UUID[]))
+"""
+SQL_CALENTAR_USUARIOS_POR_IDS = """
+    SELECT id, email, nombre, rol, activo, fecha_creacion
+    FROM usuarios
+    WHERE id = ANY(CAST(:ids AS UUID[]))
+"""
+
+def _json_cache(valor) -> str:
+    """Mismo formato que _json_cache del API (fechas ISO 8601)"""
+    return json.dumps(valor, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+
+def _ticket_a_cache(row) -> tuple:
+    return f"ticket:{row[0]}:completo", 900, {
+        "id": str(row[0]),
+        "usuario_id": str(row[1]),
+        "titulo": row[2],
+        "descripcion": row[3],
+        "estado": row[4],
+        "prioridad": row[5],
+        "fecha_creacion": row[6],
+        "fecha_actualizacion": row[7]
+    }
+
+def _usuario_a_cache(row) -> tuple:
+    return f"usuario:{row[0]}:datos", 3600, {
+        "id": str(row[0]),
+        "email": row[1],
+        "nombre": row[2],
+        "rol": row[3],
+        "activo": row[4],
+        "fecha_creacion": row[5]
+    }
+
+def _clave_lista(recurso: str, params: dict) -> str:
+    """Misma clave que _clave_lista del API para una página de listado"""
+    return f"lista:{recurso}:" + hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def _leer_bloque_calentamiento(db, bloque: list, tamano_pagina: int) -> list:
+    """(clave, ttl, valor, etiqueta) de un bloque del plan, leídos justo antes de escribirlo
+
+    Los tickets y usuarios del bloque se leen con una consulta por tipo y cada
+    página de listado con la misma consulta que listar_tickets. Las filas que
+    ya no existen se omiten.
+    """
+    ids = {"ticket": [], "usuario": []}
+    valores = []
+    for clave, (tipo, dato) in bloque:
+        if tipo == "pagina":
+            estado, skip = dato
+            filas = db.execute(
+                text(SQL_CALENTAR_TICKETS_PAGINA), {"estado": estado, "limite": tamano_pagina, "skip": skip}
+            )
+            valores.append((
+                clave,
+                settings.LISTAS_CACHE_TTL,
+                [_ticket_a_cache(row)[2] for row in filas],
+                f"etiqueta:tickets:estado:{estado}" if estado else "etiqueta:tickets:todos"
+            ))
+        else:
+            ids[tipo].append(dato)
+    if ids["ticket"]:
+        for row in db.execute(text(SQL_CALENTAR_TICKETS_POR_IDS), {"ids": ids["ticket"]}):
+            valores.append((*_ticket_a_cache(row), None))
+    if ids["usuario"]:
+        for row in db.execute(text(SQL_CALENTAR_USUARIOS_POR_IDS), {"ids": ids["usuario"]}):
+            valores.append((*_usuario_a_cache(row), None))
+    # No dejar la transacción abierta durante la pausa entre bloques
+    db.commit()
+    return valores
+
+def precalentar_cache(tarea: dict, db):
+    """Precargar en Redis las entidades más consultadas tras un deploy
+
+    Tickets actualizados recientemente, las primeras páginas de GET /tickets
+    (sin filtro y por estado, como entidades y como páginas de listado
+    registradas en su etiqueta) y usuarios activos (idx_usuarios_activo).
+
+    Primero se arma el plan de claves (solo ids) y luego se escribe en lotes,
+    pausando entre lotes para no superar CALENTAMIENTO_CLAVES_POR_SEGUNDO y no
+    competir con el tráfico real. Cada lote se lee de PostgreSQL justo antes de
+    escribirlo y se escribe con SET ... EX ... NX: un valor que el API ya
+    rellenó no se pisa, y una clave invalidada durante el calentamiento no se
+    recrea con datos de antes de la invalidación.
+    """
+    # Asegurarse de que tarea es un dict
+    if isinstance(tarea, str):
+        tarea = json.loads(tarea)
+    
+    tickets_recientes = int(tarea.get("tickets_recientes", 1000))
+    paginas = int(tarea.get("paginas", 5))
+    tamano_pagina = int(tarea.get("tamano_pagina", 20))
+    usuarios = int(tarea.get("usuarios", 1000))
+    
+    # Plan: clave -> (tipo, id o (estado, skip)), sin duplicados entre grupos
+    plan = {}
+    for (ticket_id,) in db.execute(text(SQL_CALENTAR_TICKETS_RECIENTES), {"limite": tickets_recientes}):
+        plan[f"ticket:{ticket_id}:completo"] = ("ticket", str(ticket_id))
+    for estado in (None, "abierto", "en_proceso", "resuelto", "cerrado"):
+        filas = db.execute(
+            text(SQL_CALENTAR_TICKETS_PAGINA), {"estado": estado, "limite": paginas * tamano_pagina, "skip": 0}
+        )
+        for row in filas:
+            plan[f"ticket:{row[0]}:completo"] = ("ticket", str(row[0]))
+        # Mismas claves que listar_tickets para cada página
+        for pagina in range(paginas):
+            skip = pagina * tamano_pagina
+            clave = _clave_lista("tickets", {"skip": skip, "limit": tamano_pagina, "estado": estado})
+            plan[clave] = ("pagina", (estado, skip))
+    for (usuario_id,) in db.execute(text(SQL_CALENTAR_USUARIOS), {"limite": usuarios}):
+        plan[f"usuario:{usuario_id}:datos"] = ("usuario", str(usuario_id))
+    db.commit()
+    
+    total = len(plan)
+    logger.info(f"Precalentando caché: {total} claves")
+    
+    lote = settings.CALENTAMIENTO_LOTE
+    pausa = lote / settings.CALENTAMIENTO_CLAVES_POR_SEGUNDO if settings.CALENTAMIENTO_CLAVES_POR_SEGUNDO else 0
+    items = list(plan.items())
+    procesadas = 0
+    escritas = 0
+    for desde in range(0, total, lote):
+        inicio = time.monotonic()
+        bloque = items[desde:desde + lote]
+        valores = _leer_bloque_calentamiento(db, bloque, tamano_pagina)
+        comandos = []
+        for clave, ttl, valor, etiqueta in valores:
+            comandos.append(["SET", clave, _json_cache(valor), "EX", ttl, "NX"])
+            if etiqueta:
+                comandos += [["SADD", etiqueta, clave], ["EXPIRE", etiqueta, ttl * 2]]
+        resultados = redis_client.pipeline(comandos)
+        # SET NX devuelve nil si la clave ya estaba en caché (Upstash devuelve "OK")
+        escritas += sum(
+            1 for comando, resultado in zip(comandos, resultados)
+            if comando[0] == "SET" and (resultado is True or resultado == "OK")
+        )
+        procesadas += len(bloque)
+        
+        redis_client.publish(
+            "canal:batch:eventos",
+            json.dumps({
+                "evento": "cache_calentamiento_progreso",
+                "escritas": procesadas,
+                "total": total,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            })
+        )
+        logger.info(f"Caché precalentado: {procesadas}/{total} claves ({escritas} escritas)")
+        
+        # Limitar el ritmo de escritura
+        restante = pausa - (time.monotonic() - inicio)
+        if restante > 0 and procesadas < total:
+            time.sleep(restante)
+    
+    return {"claves": total, "escritas": escritas}
+
+# Claves de estado del sistema que una purga por patrón nunca debe borrar
+PREFIJOS_PROTEGIDOS = ("cola:", "batch:", "stats:")
+
+def limpiar_cache(tarea: dict):
+    """Limpiar caché por claves explícitas o por patrón
+
+    Con patrón, recorre las claves con SCAN (no bloquea Redis como KEYS y
+    funciona también en Upstash) y borra cada bloque con UNLINK (liberación
+    de memoria en segundo plano) en un solo pipeline junto con MEMORY USAGE
+    para informar los bytes liberados. Entre bloques se pausa para no pasar
+    de LIMPIEZA_CLAVES_POR_SEGUNDO. Nunca borra colas, checkpoints ni contadores.
+    """
+    # Asegurarse de que tarea es un dict
+    if isinstance(tarea, str):
+        tarea = json.loads(tarea)
     
-    # Nota: Upstash REST API no soporta KEYS directamente
-    # En producción, usa estructuras de datos específicas o listas de claves
     claves_especificas = tarea.get("claves", [])
     
     if claves_especificas:
         deleted = redis_client.delete(*claves_especificas)
         logger.info(f"Eliminadas {deleted} claves de caché")
-    else:
-        logger.warning("No se proporcionaron claves específicas para eliminar. Upstash REST API no soporta KEYS.")
+        return {"eliminadas": deleted}
+    
+    patron = tarea.get("patron", "ticket:*")
+    lote = int(tarea.get("lote", settings.LIMPIEZA_LOTE))
+    claves_por_segundo = int(tarea.get("claves_por_segundo", settings.LIMPIEZA_CLAVES_POR_SEGUNDO))
+    logger.info(f"Limpiando caché con patrón: {patron}")
+    
+    revisadas = eliminadas = bytes_liberados = 0
+    for bloque in redis_client.scan_iter(match=patron, count=lote):
+        inicio = time.monotonic()
+        revisadas += len(bloque)
+        claves = [clave for clave in bloque if not clave.startswith(PREFIJOS_PROTEGIDOS)]
+        if claves:
+            resultados = redis_client.pipeline(
+                [["MEMORY", "USAGE", clave] for clave in claves] + [["UNLINK", *claves]]
+            )
+            # MEMORY USAGE puede no estar disponible (algunos servicios gestionados): cuenta 0
+            bytes_liberados += sum(r for r in resultados[:-1] if isinstance(r, int))
+            eliminadas += resultados[-1] if isinstance(resultados[-1], int) else 0
+        
+        # Limitar el ritmo para no afectar la latencia de Redis
+        if claves_por_segundo:
+            restante = len(bloque) / claves_por_segundo - (time.monotonic() - inicio)
+            if restante > 0:
+                time.sleep(restante)
+    
+    logger.info(
+        f"Caché limpiada ({patron}): {eliminadas} claves eliminadas de {revisadas} revisadas, "
+        f"~{bytes_liberados / 1024:.1f} KiB liberados"
+    )
+    
+    redis_client.publish(
+        "canal:batch:eventos",
+        json.dumps({
+            "evento": "cache_limpiada",
+            "patron": patron,
+            "revisadas": revisadas,
+            "eliminadas": eliminadas,
+            "bytes_liberados": bytes_liberados,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        })
+    )
+    
+    return {"revisadas": revisadas, "eliminadas": eliminadas, "bytes_liberados": bytes_liberados}
 
 # ============================================
 # ROUTER DE TAREAS
 # ============================================
 
+def _atributos_tarea(tarea) -> dict:
+    """Atributos del span de la tarea, con la espera en cola si trae timestamp de encolado"""
+    atributos = {"tarea.tipo": str(tarea.get("tipo"))}
+    try:
+        encolada = datetime.fromisoformat(tarea["timestamp"].replace("Z", "+00:00"))
+        atributos["tarea.espera_cola_s"] = max((datetime.now(timezone.utc) - encolada).total_seconds(), 0.0)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        pass
+    return atributos
+
 def procesar_tarea(tarea_data):
     """Procesar una tarea de la cola"""
+    inicio = time.perf_counter()
+    tipo = None
     try:
         # tarea_data puede venir como string JSON o como dict (dependiendo de cómo Redis lo devuelva)
         if isinstance(tarea_data, str):
@@ -158,36 +565,60 @@ def procesar_tarea(tarea_data):
         
         logger.info(f"Procesando tarea tipo: {tipo}")
         
-        db = SessionLocal()
-        try:
-            if tipo == "notificar_ticket_creado":
-                procesar_ticket_creado(tarea, db)
+        # Continuar la traza de la petición que encoló la tarea (campo "traza")
+        with tracer.start_as_current_span(
+            f"procesar_tarea {tipo}",
+            context=extraer_contexto(tarea.get("traza")),
+            kind=SpanKind.CONSUMER,
+            attributes=_atributos_tarea(tarea)
+        ):
+            db = SessionLocal()
+            try:
+                if tipo == "notificar_ticket_creado":
+                    procesar_ticket_creado(tarea, db)
             
-            elif tipo == "procesar_tickets_vencidos":
-                procesar_tickets_vencidos(tarea, db)
+                elif tipo == "procesar_tickets_vencidos":
+                    procesar_tickets_vencidos(tarea, db)
             
-            elif tipo == "generar_reporte":
-                generar_reporte(tarea, db)
+                elif tipo == "generar_reporte":
+                    lectura = sesion_lectura()
+                    try:
+                        generar_reporte(tarea, lectura)
+                    finally:
+                        lectura.close()
             
-            elif tipo == "limpiar_cache":
-                limpiar_cache(tarea)
+                elif tipo == "limpiar_cache":
+                    limpiar_cache(tarea)
             
-            else:
-                logger.warning(f"Tipo de tarea desconocido: {tipo}")
+                elif tipo == "mantener_particiones":
+                    mantener_particiones(tarea, db)
             
-            # Marcar tarea como procesada
-            tarea_procesada = {
-                "tarea": tarea,
-                "procesada_en": datetime.now(timezone.utc).isoformat(),
-                "estado": "exitoso"
-            }
-            redis_client.rpush(settings.COLA_PROCESADAS, json.dumps(tarea_procesada))
+                elif tipo == "recalcular_estadisticas":
+                    recalcular_estadisticas(tarea, db)
+            
+                elif tipo == "reconciliar_contadores":
+                    reconciliar_contadores(tarea, db)
+            
+                elif tipo == "precalentar_cache":
+                    precalentar_cache(tarea, db)
+            
+                else:
+                    logger.warning(f"Tipo de tarea desconocido: {tipo}")
+            
+                # Marcar tarea como procesada
+                tarea_procesada = {
+                    "tarea": tarea,
+                    "procesada_en": datetime.now(timezone.utc).isoformat(),
+                    "estado": "exitoso"
+                }
+                redis_client.rpush(settings.COLA_PROCESADAS, json.dumps(tarea_procesada))
             
-        finally:
-            db.close()
+            finally:
+                db.close()
             
     except Exception as e:
         logger.error(f"Error procesando tarea: {str(e)}", exc_info=True)
+        TAREA_FALLOS.labels(tipo or "desconocido").inc()
         
         # Registrar tarea fallida
         # Asegurarse de que tarea_data sea serializable como dict
@@ -204,10 +635,13 @@ def procesar_tarea(tarea_data):
         tarea_fallida = {
             "tarea": tarea_dict,
             "error": str(e),
-            "procesada_en": datetime.now(datetime.timezone.utc).isoformat(),
+            "procesada_en": datetime.now(timezone.utc).isoformat(),
             "estado": "fallido"
         }
         redis_client.rpush(settings.COLA_FALLIDAS, json.dumps(tarea_fallida))
+    
+    finally:
+        TAREA_DURACION.labels(tipo or "desconocido").observe(time.perf_counter() - inicio)
 
 # ============================================
 # LOOP PRINCIPAL
@@ -243,10 +677,47 @@ def main():
     logger.info(f"✅ Conexión a Redis establecida")
     logger.info(f"Cola principal: {settings.COLA_PRINCIPAL}")
     logger.info(f"Timeout BLPOP: {settings.TIMEOUT_BLPOP} segundos")
+    
+    configurar_trazas("batch-worker")
+    
+    if settings.METRICAS_PUERTO:
+        start_http_server(settings.METRICAS_PUERTO)
+        logger.info(f"📊 Métricas Prometheus en :{settings.METRICAS_PUERTO}/metrics")
     logger.info("=" * 50)
     
+    ultima_reconciliacion = 0.0
+    ultimo_mantenimiento_particiones = 0.0
+    
     while True:
         try:
+            # Particiones futuras de interacciones (al iniciar y luego periódicamente)
+            if settings.MANTENER_PARTICIONES_SEGUNDOS and \
+                    time.monotonic() - ultimo_mantenimiento_particiones >= settings.MANTENER_PARTICIONES_SEGUNDOS:
+                ultimo_mantenimiento_particiones = time.monotonic()
+                db = SessionLocal()
+                try:
+                    mantener_particiones({
+                        "meses_adelante": settings.PARTICIONES_MESES_ADELANTE,
+                        "meses_retencion": settings.PARTICIONES_MESES_RETENCION
+                    }, db)
+                except Exception as e:
+                    db.rollback()
+                    # Reintentar en el próximo ciclo: sin particiones futuras los INSERT de interacciones fallan
+                    ultimo_mantenimiento_particiones = 0.0
+                    logger.error(f"❌ No se pudieron crear las particiones de interacciones: {str(e)}")
+                finally:
+                    db.close()
+            
+            # Reconciliación periódica de contadores (entre tareas)
+            if settings.RECONCILIAR_CONTADORES_SEGUNDOS and \
+                    time.monotonic() - ultima_reconciliacion >= settings.RECONCILIAR_CONTADORES_SEGUNDOS:
+                ultima_reconciliacion = time.monotonic()
+                db = SessionLocal()
+                try:
+                    reconciliar_contadores({}, db)
+                finally:
+                    db.close()
+            
             # Bloquear esperando tarea (BLPOP)
             resultado = redis_client.blpop(settings.COLA_PRINCIPAL, timeout=settings.TIMEOUT_BLPOP)
             
@@ -262,6 +733,7 @@ def main():
             logger.info("\n" + "=" * 50)
             logger.info("Deteniendo Batch Worker...")
             logger.info("=" * 50)
+            cerrar_trazas()
             break
         except Exception as e:
             logger.error(f"❌ Error en loop principal: {str(e)}", exc_info=True)
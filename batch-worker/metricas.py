@@ -0,0 +1,122 @@
+"""
+Métricas Prometheus del Batch Worker
+Duración y fallos por tipo de tarea, profundidad de colas, comandos Redis y pool
+"""
+
+import time
+from functools import wraps
+
+from opentelemetry.trace import SpanKind
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import REGISTRY
+
+from trazas import tracer
+
+# Buckets de comandos Redis (1 ms a 10 s) y de tareas (10 ms a 10 min)
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_TAREAS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+TAREA_DURACION = Histogram(
+    "batch_tarea_duration_seconds",
+    "Duración de las tareas procesadas por tipo",
+    ["tipo"],
+    buckets=BUCKETS_TAREAS
+)
+
+TAREA_FALLOS = Counter(
+    "batch_tarea_fallos_total",
+    "Tareas que terminaron en cola:batch:fallidas por tipo",
+    ["tipo"]
+)
+
+REDIS_DURACION = Histogram(
+    "redis_comando_duration_seconds",
+    "Duración de los comandos de RedisClient",
+    ["comando", "modo"],
+    buckets=BUCKETS_LATENCIA
+)
+
+REDIS_ERRORES = Counter(
+    "redis_comando_errores_total",
+    "Comandos de RedisClient que lanzaron excepción",
+    ["comando", "modo"]
+)
+
+DB_POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds",
+    "Tiempo para obtener una conexión del pool (espera + pre-ping)",
+    buckets=BUCKETS_LATENCIA
+)
+
+
+def medir_redis(comando: str):
+    """Decorador para métodos de RedisClient: latencia y errores por comando y modo, y un span por comando"""
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            modo = "upstash" if self.is_upstash else "local"
+            inicio = time.perf_counter()
+            with tracer.start_as_current_span(
+                f"redis {comando}",
+                kind=SpanKind.CLIENT,
+                attributes={"db.system": "redis", "db.operation": comando, "redis.modo": modo}
+            ):
+                try:
+                    return metodo(self, *args, **kwargs)
+                except Exception:
+                    REDIS_ERRORES.labels(comando, modo).inc()
+                    raise
+                finally:
+                    REDIS_DURACION.labels(comando, modo).observe(time.perf_counter() - inicio)
+        return envoltura
+    return decorador
+
+
+class ColectorColas:
+    """Profundidad de las colas cola:batch:* leída con LLEN en cada scrape"""
+
+    def __init__(self, redis_client, colas):
+        self.redis_client = redis_client
+        self.colas = colas
+
+    def collect(self):
+        metrica = GaugeMetricFamily("batch_cola_longitud", "Elementos en cada cola del batch worker", labels=["cola"])
+        for cola in self.colas:
+            try:
+                metrica.add_metric([cola], self.redis_client.llen(cola))
+            except Exception:
+                # Sin Redis no se informa la cola (el error ya queda en redis_comando_errores_total)
+                pass
+        yield metrica
+
+
+def registrar_colas(redis_client, colas):
+    REGISTRY.register(ColectorColas(redis_client, colas))
+
+
+class ColectorPool:
+    """Conexiones en uso y overflow del pool de SQLAlchemy en cada scrape"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def collect(self):
+        yield GaugeMetricFamily("db_pool_conexiones_en_uso", "Conexiones prestadas por el pool", value=self.pool.checkedout())
+        yield GaugeMetricFamily("db_pool_overflow", "Conexiones abiertas por encima de pool_size", value=max(self.pool.overflow(), 0))
+
+
+def instrumentar_pool(engine):
+    """Medir el checkout del pool (envolviendo pool.connect()) y exponer uso/overflow"""
+    pool = engine.pool
+    conectar = pool.connect
+
+    def connect_medido():
+        inicio = time.perf_counter()
+        try:
+            return conectar()
+        finally:
+            DB_POOL_CHECKOUT.observe(time.perf_counter() - inicio)
+
+    pool.connect = connect_medido
+    REGISTRY.register(ColectorPool(pool))
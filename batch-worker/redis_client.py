@@ -7,6 +7,10 @@ import json
 import httpx
 from typing import Optional, Any
 from config import settings
+from metricas import medir_redis
+
+class ResponseError(Exception):
+    """Error devuelto por Redis para un comando individual de un pipeline"""
 
 class RedisClient:
     """Cliente Redis que soporta Redis local y Upstash REST API"""
@@ -92,6 +96,41 @@ class RedisClient:
         except Exception as e:
             raise ConnectionError(f"Error procesando respuesta de Upstash: {str(e)}")
     
+    def _upstash_pipeline(self, comandos: list) -> list:
+        """Enviar varios comandos a Upstash en una sola petición (endpoint /pipeline)"""
+        url = f"{self.upstash_url.rstrip('/')}/pipeline"
+        headers = {
+            "Authorization": f"Bearer {self.upstash_token}",
+            "Content-Type": "application/json"
+        }
+        body = [[str(comando[0]).upper()] + [str(arg) for arg in comando[1:]] for comando in comandos]
+        
+        try:
+            with httpx.Client() as client:
+                response = client.post(url, headers=headers, json=body, timeout=10.0)
+                response.raise_for_status()
+                # Upstash devuelve [{"result": ...} | {"error": ...}, ...] en el mismo orden
+                return [
+                    item.get("result") if "error" not in item else ResponseError(item["error"])
+                    for item in response.json()
+                ]
+        except httpx.HTTPError as e:
+            raise ConnectionError(f"Error conectando con Upstash Redis: {str(e)}")
+    
+    @medir_redis("PIPELINE")
+    def pipeline(self, comandos: list) -> list:
+        """Ejecutar varios comandos en un solo round-trip (mismo contrato que el backend)"""
+        if not comandos:
+            return []
+        if self.is_upstash:
+            return self._upstash_pipeline(comandos)
+        else:
+            pipe = self.client.pipeline(transaction=False)
+            for comando in comandos:
+                pipe.execute_command(*comando)
+            return pipe.execute(raise_on_error=False)
+    
+    @medir_redis("GET")
     def get(self, key: str) -> Optional[str]:
         """Obtener valor de una clave"""
         if self.is_upstash:
@@ -99,6 +138,7 @@ class RedisClient:
         else:
             return self.client.get(key)
     
+    @medir_redis("SET")
     def set(self, key: str, value: str) -> bool:
         """Establecer valor de una clave"""
         if self.is_upstash:
@@ -108,6 +148,7 @@ class RedisClient:
         else:
             return self.client.set(key, value)
     
+    @medir_redis("RPUSH")
     def rpush(self, key: str, *values: str) -> int:
         """Agregar valores al final de una lista"""
         if self.is_upstash:
@@ -116,6 +157,7 @@ class RedisClient:
         else:
             return self.client.rpush(key, *values)
     
+    @medir_redis("PUBLISH")
     def publish(self, channel: str, message: str) -> int:
         """Publicar mensaje en un canal (Pub/Sub)"""
         if self.is_upstash:
@@ -156,6 +198,7 @@ class RedisClient:
             result = self.client.blpop(keys, timeout=timeout)
             return result if result else None
     
+    @medir_redis("PING")
     def ping(self) -> bool:
         """Verificar conexi?n"""
         if self.is_upstash:
@@ -175,6 +218,7 @@ class RedisClient:
                 logging.error(f"Error en ping a Redis local: {str(e)}")
                 return False
     
+    @medir_redis("LLEN")
     def llen(self, key: str) -> int:
         """Obtener longitud de una lista"""
         if self.is_upstash:
@@ -183,6 +227,7 @@ class RedisClient:
         else:
             return self.client.llen(key)
     
+    @medir_redis("LRANGE")
     def lrange(self, key: str, start: int, end: int) -> list:
         """Obtener rango de elementos de una lista"""
         if self.is_upstash:
@@ -198,17 +243,37 @@ class RedisClient:
         else:
             return self.client.lrange(key, start, end)
     
-    def keys(self, pattern: str) -> list:
-        """Obtener claves que coincidan con un patr?n"""
+    @medir_redis("SCAN")
+    def scan(self, cursor: int = 0, match: Optional[str] = None, count: int = 100) -> tuple:
+        """Una iteración de SCAN: devuelve (siguiente_cursor, claves); el cursor 0 indica fin"""
         if self.is_upstash:
-            # Upstash REST API no soporta KEYS directamente
-            # Nota: En producci?n, evita usar KEYS, usa SCAN o estructuras de datos espec?ficas
-            import logging
-            logging.warning("KEYS no est? disponible en Upstash REST API. Considera usar estructuras de datos espec?ficas.")
-            return []
+            args = [str(cursor)]
+            if match:
+                args += ["MATCH", match]
+            args += ["COUNT", str(count)]
+            result = self._upstash_request("SCAN", *args)
+            # Upstash devuelve ["cursor", ["clave", ...]]
+            if isinstance(result, list) and len(result) == 2:
+                return int(result[0]), result[1] or []
+            return 0, []
         else:
-            return self.client.keys(pattern)
+            return self.client.scan(cursor=cursor, match=match, count=count)
+    
+    def scan_iter(self, match: Optional[str] = None, count: int = 100):
+        """Recorrer por bloques las claves que coinciden con `match` sin bloquear Redis"""
+        cursor = 0
+        while True:
+            cursor, claves = self.scan(cursor, match=match, count=count)
+            if claves:
+                yield claves
+            if cursor == 0:
+                break
+    
+    def keys(self, pattern: str) -> list:
+        """Obtener claves que coincidan con un patrón (con SCAN: no bloquea Redis y funciona en Upstash)"""
+        return [clave for bloque in self.scan_iter(match=pattern) for clave in bloque]
     
+    @medir_redis("DEL")
     def delete(self, *keys: str) -> int:
         """Eliminar una o m?s claves"""
         if self.is_upstash:
@@ -0,0 +1,288 @@
+"""
+Generador de carga HTTP para el API (modelo abierto)
+Envía peticiones a una tasa de llegada fija (Poisson o constante) según un
+perfil de tráfico, y registra la latencia en histogramas HDR.
+
+La latencia se mide desde el instante en que la petición DEBÍA enviarse según
+la tasa, no desde que se envió: si el servidor (o el propio generador) se
+atrasa, la espera acumulada cuenta como latencia y no se pierde
+(corrección de "coordinated omission"). Se registra también el tiempo de
+servicio (envío -> respuesta) para ver cuánto de la latencia es cola.
+
+Uso:
+    python carga.py --url http://localhost:8000 --perfil dashboard --tasa 200 --duracion 60
+    python carga.py --perfil mixto --tasa 500 --duracion 120 --salida resultados/mixto
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from hdrh.histogram import HdrHistogram
+
+# Rango de los histogramas en microsegundos (1 µs a 60 s, 3 cifras significativas)
+LATENCIA_MAX_US = 60_000_000
+CIFRAS_SIGNIFICATIVAS = 3
+
+ESTADOS = ["abierto", "en_proceso", "resuelto", "cerrado"]
+PRIORIDADES = ["baja", "media", "media", "alta", "critica"]
+TERMINOS_BUSQUEDA = ["error", "vpn", "impresora lento", "certificado firewall", "contraseña"]
+
+# Exponente para elegir ids con sesgo: pocos tickets concentran las lecturas
+SESGO_LECTURAS = 3
+
+
+# ============================================
+# OPERACIONES: (rng, datos) -> (etiqueta, método, url, kwargs de httpx)
+# ============================================
+
+def _ticket(rng, datos):
+    return datos["tickets"][int(len(datos["tickets"]) * rng.random() ** SESGO_LECTURAS)]
+
+
+def listar_tickets(rng, datos):
+    return "GET /tickets", "GET", "/tickets", {"params": {"limit": 20, "skip": 20 * int(5 * rng.random() ** 2)}}
+
+
+def obtener_ticket(rng, datos):
+    return "GET /tickets/{id}", "GET", f"/tickets/{_ticket(rng, datos)}", {}
+
+
+def obtener_interacciones(rng, datos):
+    return "GET /tickets/{id}/interacciones", "GET", f"/tickets/{_ticket(rng, datos)}/interacciones", {}
+
+
+def estadisticas(rng, datos):
+    return "GET /stats/tickets", "GET", "/stats/tickets", {}
+
+
+def buscar(rng, datos):
+    return "GET /tickets/search", "GET", "/tickets/search", {"params": {"q": rng.choice(TERMINOS_BUSQUEDA)}}
+
+
+def crear_ticket(rng, datos):
+    return "POST /tickets", "POST", "/tickets", {"json": {
+        "usuario_id": rng.choice(datos["usuarios"]),
+        "titulo": f"carga {rng.randrange(10**9)}",
+        "descripcion": "ticket creado por benchmarks/carga.py",
+        "prioridad": rng.choice(PRIORIDADES),
+    }}
+
+
+def actualizar_estado(rng, datos):
+    return "PATCH /tickets/{id}/estado", "PATCH", f"/tickets/{_ticket(rng, datos)}/estado", {"params": {
+        "nuevo_estado": rng.choice(ESTADOS),
+        "usuario_id": rng.choice(datos["usuarios"]),
+    }}
+
+
+# Perfiles: lista de (peso, operación)
+PERFILES = {
+    # Panel de operadores: lectura intensiva, mayormente servida por la caché
+    "dashboard": [
+        (30, listar_tickets),
+        (40, obtener_ticket),
+        (25, obtener_interacciones),
+        (5, estadisticas),
+    ],
+    # Ráfaga de escrituras: alta de tickets y cambios de estado
+    "escritura": [
+        (60, crear_ticket),
+        (40, actualizar_estado),
+    ],
+    # Tráfico mixto habitual
+    "mixto": [
+        (25, listar_tickets),
+        (30, obtener_ticket),
+        (20, obtener_interacciones),
+        (5, estadisticas),
+        (5, buscar),
+        (10, crear_ticket),
+        (5, actualizar_estado),
+    ],
+}
+
+
+# ============================================
+# REGISTRO DE LATENCIAS
+# ============================================
+
+class Registro:
+    """Histogramas HDR de respuesta (desde el envío previsto) y servicio, por operación y total"""
+
+    def __init__(self):
+        self.respuesta = {}
+        self.servicio = {}
+        self.errores = {}
+        self.total = 0
+
+    def _histograma(self, tabla, etiqueta):
+        if etiqueta not in tabla:
+            tabla[etiqueta] = HdrHistogram(1, LATENCIA_MAX_US, CIFRAS_SIGNIFICATIVAS)
+        return tabla[etiqueta]
+
+    def registrar(self, etiqueta, respuesta_s, servicio_s, error):
+        for nombre in (etiqueta, "TOTAL"):
+            self._histograma(self.respuesta, nombre).record_value(min(max(int(respuesta_s * 1e6), 1), LATENCIA_MAX_US))
+            self._histograma(self.servicio, nombre).record_value(min(max(int(servicio_s * 1e6), 1), LATENCIA_MAX_US))
+            if error:
+                self.errores[nombre] = self.errores.get(nombre, 0) + 1
+        self.total += 1
+
+
+def _ms(histograma, percentil):
+    return histograma.get_value_at_percentile(percentil) / 1000
+
+
+def resumen(registro, duracion):
+    filas = []
+    for etiqueta in sorted(registro.respuesta, key=lambda e: (e == "TOTAL", e)):
+        respuesta = registro.respuesta[etiqueta]
+        servicio = registro.servicio[etiqueta]
+        filas.append({
+            "operacion": etiqueta,
+            "peticiones": respuesta.get_total_count(),
+            "errores": registro.errores.get(etiqueta, 0),
+            "rps": respuesta.get_total_count() / duracion,
+            "p50_ms": _ms(respuesta, 50),
+            "p90_ms": _ms(respuesta, 90),
+            "p99_ms": _ms(respuesta, 99),
+            "p999_ms": _ms(respuesta, 99.9),
+            "max_ms": respuesta.get_max_value() / 1000,
+            "servicio_p99_ms": _ms(servicio, 99),
+        })
+    return filas
+
+
+def imprimir(filas):
+    print(f"{'Operación':<32} {'pet.':>8} {'err.':>6} {'rps':>8} {'p50':>9} {'p90':>9} {'p99':>9} "
+          f"{'p99.9':>9} {'max':>9} {'serv p99':>9}")
+    for f in filas:
+        print(f"{f['operacion']:<32} {f['peticiones']:>8} {f['errores']:>6} {f['rps']:>8.1f} {f['p50_ms']:>9.2f} "
+              f"{f['p90_ms']:>9.2f} {f['p99_ms']:>9.2f} {f['p999_ms']:>9.2f} {f['max_ms']:>9.2f} "
+              f"{f['servicio_p99_ms']:>9.2f}")
+    print("(latencias en ms desde el envío previsto; 'serv p99' = envío real -> respuesta)")
+
+
+def guardar(registro, filas, args, destino):
+    """<destino>.json con resumen e histogramas codificados, y un .hgrm por operación"""
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    for etiqueta, histograma in registro.respuesta.items():
+        nombre = etiqueta.replace("/", "_").replace(" ", "").replace("{", "").replace("}", "")
+        with open(f"{destino}.{nombre}.hgrm", "wb") as archivo:
+            # Escala 1000: el .hgrm queda en milisegundos (compatible con el plotter de HdrHistogram)
+            histograma.output_percentile_distribution(archivo, 1000)
+    Path(f"{destino}.json").write_text(json.dumps({
+        "perfil": args.perfil, "tasa": args.tasa, "llegadas": args.llegadas, "duracion_s": args.duracion,
+        "url": args.url, "resultados": filas,
+        "histogramas": {e: h.encode().decode() for e, h in registro.respuesta.items()},
+    }, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+# ============================================
+# GENERADOR (modelo abierto)
+# ============================================
+
+async def cargar_datos(cliente, paginas):
+    """Ids de tickets y usuarios existentes, leídos del propio API"""
+    tickets = []
+    for pagina in range(paginas):
+        respuesta = await cliente.get("/tickets", params={"limit": 100, "skip": 100 * pagina})
+        respuesta.raise_for_status()
+        lote = respuesta.json()
+        tickets.extend(t["id"] for t in lote)
+        if len(lote) < 100:
+            break
+    respuesta = await cliente.get("/usuarios", params={"limit": 100})
+    respuesta.raise_for_status()
+    usuarios = [u["id"] for u in respuesta.json()]
+    if not tickets or not usuarios:
+        raise SystemExit("El API no devolvió tickets o usuarios: cargar datos con database/generar_datos.py")
+    return {"tickets": tickets, "usuarios": usuarios}
+
+
+async def enviar(cliente, operacion, previsto, registro, registrar, semaforo):
+    etiqueta, metodo, url, kwargs = operacion
+    async with semaforo:
+        envio = time.perf_counter()
+        error = False
+        try:
+            respuesta = await cliente.request(metodo, url, **kwargs)
+            error = respuesta.status_code >= 400
+        except httpx.HTTPError:
+            error = True
+        fin = time.perf_counter()
+    if registrar:
+        registro.registrar(etiqueta, fin - previsto, fin - envio, error)
+
+
+async def generar(args):
+    rng = random.Random(args.semilla)
+    perfil = PERFILES[args.perfil]
+    pesos = [peso for peso, _ in perfil]
+    operaciones = [operacion for _, operacion in perfil]
+    registro = Registro()
+    limites = httpx.Limits(max_connections=args.conexiones, max_keepalive_connections=args.conexiones)
+    # Las peticiones que esperan conexión siguen contando desde su envío previsto
+    semaforo = asyncio.Semaphore(args.max_en_vuelo)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=args.timeout) as cliente:
+        datos = await cargar_datos(cliente, args.paginas_ids)
+        print(f"Perfil {args.perfil}: {args.tasa} pet/s ({args.llegadas}) durante {args.duracion} s "
+              f"+ {args.calentamiento} s de calentamiento | {len(datos['tickets'])} tickets, "
+              f"{len(datos['usuarios'])} usuarios", file=sys.stderr)
+
+        pendientes = set()
+        inicio = time.perf_counter()
+        fin_calentamiento = inicio + args.calentamiento
+        fin = fin_calentamiento + args.duracion
+        previsto = inicio
+        while previsto < fin:
+            # Próximo envío según la tasa, independiente de cuándo respondieron los anteriores
+            previsto += rng.expovariate(args.tasa) if args.llegadas == "poisson" else 1 / args.tasa
+            espera = previsto - time.perf_counter()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            operacion = rng.choices(operaciones, weights=pesos)[0](rng, datos)
+            tarea = asyncio.create_task(enviar(
+                cliente, operacion, previsto, registro, previsto >= fin_calentamiento, semaforo
+            ))
+            pendientes.add(tarea)
+            tarea.add_done_callback(pendientes.discard)
+        if pendientes:
+            await asyncio.wait(pendientes)
+    return registro
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga HTTP con perfiles de tráfico")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base del API")
+    parser.add_argument("--perfil", choices=sorted(PERFILES), default="mixto", help="Mezcla de operaciones")
+    parser.add_argument("--tasa", type=float, default=100, help="Peticiones por segundo (llegadas)")
+    parser.add_argument("--llegadas", choices=["poisson", "constante"], default="poisson", help="Distribución entre llegadas")
+    parser.add_argument("--duracion", type=float, default=60, help="Segundos medidos")
+    parser.add_argument("--calentamiento", type=float, default=10, help="Segundos iniciales sin registrar")
+    parser.add_argument("--conexiones", type=int, default=100, help="Conexiones HTTP simultáneas máximas")
+    parser.add_argument("--max-en-vuelo", type=int, default=10_000, help="Peticiones en curso máximas (protege la memoria del generador)")
+    parser.add_argument("--timeout", type=float, default=10, help="Timeout por petición, incluida la espera de conexión (s)")
+    parser.add_argument("--paginas-ids", type=int, default=10, help="Páginas de 100 tickets a usar como ids")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla de llegadas y selección de operaciones")
+    parser.add_argument("--salida", default=None, help="Prefijo de los archivos .json y .hgrm")
+    args = parser.parse_args()
+
+    registro = asyncio.run(generar(args))
+    filas = resumen(registro, args.duracion)
+    imprimir(filas)
+    if args.salida:
+        guardar(registro, filas, args, args.salida)
+        print(f"Resultados guardados en {args.salida}.json (+ .hgrm por operación)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
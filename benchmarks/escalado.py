@@ -0,0 +1,189 @@
+"""
+Escalado del API con la cantidad de procesos (backend/servidor.py)
+Para cada valor de --workers levanta servidor.py, lo satura con clientes en
+bucle cerrado (cada cliente envía la siguiente petición al recibir la
+respuesta anterior) y mide peticiones/s y latencia de servicio.
+
+Los clientes crecen con los procesos (--clientes-por-worker) para que cada
+proceso tenga el mismo trabajo en vuelo; por debajo de su pool de conexiones
+(ver "Límite conocido" en README.md). El generador también usa CPU: en una
+máquina de N núcleos medir hasta ~N/2 procesos del API y repartir el
+generador con --procesos-generador.
+
+Uso:
+    python escalado.py --workers 1 2 4 --duracion 30
+    python escalado.py --workers 1 2 4 8 --perfil mixto --procesos-generador 4 --salida resultados/escalado.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from hdrh.histogram import HdrHistogram
+
+from carga import CIFRAS_SIGNIFICATIVAS, LATENCIA_MAX_US, PERFILES, cargar_datos
+
+DIR_BACKEND = Path(__file__).resolve().parent.parent / "backend"
+
+
+# ============================================
+# GENERADOR (bucle cerrado, un proceso por --procesos-generador)
+# ============================================
+
+async def _cliente(cliente, rng, perfil, datos, desde, hasta, histograma, errores):
+    pesos = [peso for peso, _ in perfil]
+    operaciones = [operacion for _, operacion in perfil]
+    while time.perf_counter() < hasta:
+        _, metodo, url, kwargs = rng.choices(operaciones, weights=pesos)[0](rng, datos)
+        inicio = time.perf_counter()
+        error = False
+        try:
+            respuesta = await cliente.request(metodo, url, **kwargs)
+            error = respuesta.status_code >= 400
+        except httpx.HTTPError:
+            error = True
+        fin = time.perf_counter()
+        # Solo cuentan las peticiones completas dentro de la ventana medida
+        if inicio >= desde and fin <= hasta:
+            histograma.record_value(min(max(int((fin - inicio) * 1e6), 1), LATENCIA_MAX_US))
+            errores[0] += error
+
+
+async def _generar(url, perfil, clientes, calentamiento, duracion, semilla):
+    histograma = HdrHistogram(1, LATENCIA_MAX_US, CIFRAS_SIGNIFICATIVAS)
+    errores = [0]
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30) as cliente:
+        datos = await cargar_datos(cliente, 10)
+        desde = time.perf_counter() + calentamiento
+        hasta = desde + duracion
+        await asyncio.gather(*(
+            _cliente(cliente, random.Random(semilla * 1000 + i), PERFILES[perfil], datos, desde, hasta, histograma, errores)
+            for i in range(clientes)
+        ))
+    return histograma.encode(), errores[0]
+
+
+def _proceso_generador(parametros):
+    return asyncio.run(_generar(*parametros))
+
+
+def medir(url, perfil, clientes, procesos, calentamiento, duracion, semilla) -> dict:
+    """Repartir `clientes` entre `procesos` generadores y combinar sus histogramas"""
+    procesos = max(min(procesos, clientes), 1)
+    reparto = [clientes // procesos + (i < clientes % procesos) for i in range(procesos)]
+    parametros = [(url, perfil, n, calentamiento, duracion, semilla + i) for i, n in enumerate(reparto)]
+    with multiprocessing.Pool(procesos) as pool:
+        partes = pool.map(_proceso_generador, parametros)
+
+    histograma = HdrHistogram(1, LATENCIA_MAX_US, CIFRAS_SIGNIFICATIVAS)
+    errores = 0
+    for codificado, errores_parte in partes:
+        histograma.add(HdrHistogram.decode(codificado))
+        errores += errores_parte
+    return {
+        "peticiones": histograma.get_total_count(),
+        "errores": errores,
+        "rps": histograma.get_total_count() / duracion,
+        "p50_ms": histograma.get_value_at_percentile(50) / 1000,
+        "p99_ms": histograma.get_value_at_percentile(99) / 1000,
+    }
+
+
+# ============================================
+# SERVIDOR
+# ============================================
+
+def iniciar_servidor(workers: int, puerto: int) -> subprocess.Popen:
+    proceso = subprocess.Popen(
+        [sys.executable, "servidor.py", "--workers", str(workers), "--port", str(puerto)],
+        cwd=DIR_BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise SystemExit(f"servidor.py terminó con código {proceso.returncode}: ejecutarlo a mano para ver el error")
+        try:
+            if httpx.get(f"http://127.0.0.1:{puerto}/health", timeout=2).status_code == 200:
+                return proceso
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    detener_servidor(proceso)
+    raise SystemExit("servidor.py no respondió /health en 60 s")
+
+
+def detener_servidor(proceso: subprocess.Popen):
+    proceso.terminate()
+    try:
+        proceso.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proceso.kill()
+        proceso.wait()
+
+
+def imprimir(filas):
+    print(f"{'procesos':>8} {'clientes':>8} {'pet.':>8} {'err.':>6} {'rps':>9} {'p50':>8} {'p99':>8} "
+          f"{'escalado':>9} {'eficiencia':>10}")
+    for f in filas:
+        print(f"{f['workers']:>8} {f['clientes']:>8} {f['peticiones']:>8} {f['errores']:>6} {f['rps']:>9.1f} "
+              f"{f['p50_ms']:>8.2f} {f['p99_ms']:>8.2f} {f['escalado']:>8.2f}x {f['eficiencia']:>9.0%}")
+    print("(latencias de servicio en ms; escalado = rps / rps con el primer valor de --workers, "
+          "eficiencia = escalado / proporción de procesos)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peticiones/s del API según la cantidad de procesos")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Cantidades de procesos a medir")
+    parser.add_argument("--perfil", choices=sorted(PERFILES), default="dashboard", help="Mezcla de operaciones (carga.py)")
+    parser.add_argument("--clientes-por-worker", type=int, default=8, help="Clientes en bucle cerrado por proceso del API")
+    parser.add_argument("--procesos-generador", type=int, default=1, help="Procesos del generador de carga")
+    parser.add_argument("--duracion", type=float, default=30, help="Segundos medidos por cantidad de procesos")
+    parser.add_argument("--calentamiento", type=float, default=5, help="Segundos iniciales sin registrar")
+    parser.add_argument("--puerto", type=int, default=8100, help="Puerto del servidor de prueba")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla de selección de operaciones")
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    nucleos = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"{nucleos} núcleo(s) | perfil {args.perfil} | {args.clientes_por_worker} clientes por proceso | "
+          f"{args.duracion} s + {args.calentamiento} s de calentamiento", file=sys.stderr)
+
+    filas = []
+    url = f"http://127.0.0.1:{args.puerto}"
+    for workers in args.workers:
+        clientes = workers * args.clientes_por_worker
+        servidor = iniciar_servidor(workers, args.puerto)
+        try:
+            resultado = medir(url, args.perfil, clientes, args.procesos_generador,
+                              args.calentamiento, args.duracion, args.semilla)
+        finally:
+            detener_servidor(servidor)
+        filas.append({"workers": workers, "clientes": clientes, **resultado})
+        print(f"{workers} proceso(s): {resultado['rps']:.1f} pet/s", file=sys.stderr)
+
+    base = filas[0]
+    for f in filas:
+        f["escalado"] = f["rps"] / base["rps"] if base["rps"] else 0.0
+        f["eficiencia"] = f["escalado"] / (f["workers"] / base["workers"])
+    imprimir(filas)
+
+    if args.salida:
+        Path(args.salida).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.salida).write_text(json.dumps({
+            "nucleos": nucleos, "perfil": args.perfil, "clientes_por_worker": args.clientes_por_worker,
+            "duracion_s": args.duracion, "resultados": filas,
+        }, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Resultados guardados en {args.salida}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
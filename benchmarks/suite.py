@@ -0,0 +1,382 @@
+"""
+Suite de benchmarks reproducible del API y del Batch Worker
+Ejecuta un conjunto fijo de escenarios contra PostgreSQL y Redis locales,
+registra throughput y percentiles de latencia en un archivo JSON y lo
+compara con una ejecución anterior para detectar regresiones.
+
+Cada grupo corre en un proceso propio dentro del directorio de su servicio
+(backend/ y batch-worker/ tienen módulos con los mismos nombres):
+- api: peticiones en proceso con TestClient (sin red), con la caché Redis real
+- worker: funciones de tarea de batch-worker/main.py llamadas directamente
+
+Cargar antes un volumen representativo con database/generar_datos.py.
+Escribe tickets e interacciones: no ejecutar contra producción.
+
+Uso:
+    python suite.py --salida resultados/base.json
+    python suite.py --salida resultados/actual.json --comparar resultados/base.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Cargar variables de entorno del backend
+load_dotenv(dotenv_path=RAIZ / "backend" / ".env")
+
+DIRECTORIOS = {"api": RAIZ / "backend", "worker": RAIZ / "batch-worker"}
+MARCA_RESULTADOS = "RESULTADOS "
+
+# Sin efectos laterales ajenos al escenario (tareas al arrancar, puerto de métricas, trazas)
+ENTORNO_HIJO = {"CALENTAR_CACHE_AL_INICIAR": "false", "METRICAS_PUERTO": "0", "TRAZAS_EXPORTADOR": ""}
+
+TERMINOS_BUSQUEDA = ["error", "vpn", "impresora lento", "certificado firewall", "sincronización calendario"]
+ESTADOS = ["abierto", "en_proceso", "resuelto", "cerrado"]
+
+# Exponente para elegir ids con sesgo: pocos tickets reciben la mayoría de las lecturas
+SESGO_LECTURAS = 3
+
+
+def percentiles(latencias):
+    muestras = sorted(latencias)
+    p = lambda q: muestras[min(len(muestras) - 1, int(len(muestras) * q))] * 1000
+    return {"p50_ms": p(0.50), "p95_ms": p(0.95), "p99_ms": p(0.99), "max_ms": muestras[-1] * 1000}
+
+
+def ejecutar_escenario(nombre, operacion, n, calentamiento, preparar=None):
+    """Medir `n` llamadas a operacion(i) tras `calentamiento` llamadas sin medir
+
+    preparar(i), si existe, corre antes de cada operación fuera de la medición.
+    """
+    for i in range(calentamiento):
+        if preparar:
+            preparar(i)
+        operacion(i)
+
+    latencias, errores = [], 0
+    total = 0.0
+    for i in range(n):
+        if preparar:
+            preparar(i)
+        inicio = time.perf_counter()
+        try:
+            operacion(i)
+        except Exception as e:
+            errores += 1
+            logging.getLogger("suite").warning(f"{nombre}: {e}")
+        transcurrido = time.perf_counter() - inicio
+        latencias.append(transcurrido)
+        total += transcurrido
+
+    resultado = {"escenario": nombre, "operaciones": n, "errores": errores,
+                 "duracion_s": total, "ops_s": n / total if total else 0.0}
+    resultado.update(percentiles(latencias))
+    print(f"   {nombre:<32} {resultado['ops_s']:>9.1f} ops/s  p50 {resultado['p50_ms']:>8.2f} ms  "
+          f"p99 {resultado['p99_ms']:>8.2f} ms", file=sys.stderr)
+    return resultado
+
+
+def elegir_sesgado(rng, valores):
+    return valores[int(len(valores) * rng.random() ** SESGO_LECTURAS)]
+
+
+def muestra_ids(conn, tabla, n, semilla):
+    """Muestra determinista de ids (mismo orden en cada ejecución con la misma semilla)"""
+    filas = conn.execute(
+        text(f"SELECT id FROM {tabla} ORDER BY md5(id::text || :semilla) LIMIT :n"),
+        {"semilla": str(semilla), "n": n}
+    ).fetchall()
+    return [str(fila[0]) for fila in filas]
+
+
+# ============================================
+# GRUPO API (se ejecuta dentro de backend/)
+# ============================================
+
+def grupo_api(args):
+    from fastapi.testclient import TestClient
+    import main
+
+    logging.getLogger().setLevel(logging.WARNING)
+    rng = random.Random(args.semilla)
+    with main.engine.connect() as conn:
+        tickets = muestra_ids(conn, "tickets", 1000, args.semilla)
+        usuarios = muestra_ids(conn, "usuarios", 200, args.semilla)
+    if not tickets or not usuarios:
+        raise SystemExit("No hay datos: cargar con database/generar_datos.py")
+
+    n, cal = args.operaciones, args.calentamiento
+    resultados = []
+    with TestClient(main.app) as cliente:
+        def get(url):
+            respuesta = cliente.get(url)
+            if respuesta.status_code >= 400:
+                raise RuntimeError(f"GET {url}: {respuesta.status_code}")
+
+        def invalidar_listas(_):
+            main.redis_client.pipeline(main._comandos_invalidar_etiquetas("tickets:todos"))
+
+        resultados.append(ejecutar_escenario(
+            "api.listar_tickets_cache", lambda i: get("/tickets?limit=20"), n, cal))
+        resultados.append(ejecutar_escenario(
+            "api.listar_tickets_sin_cache", lambda i: get(f"/tickets?limit=20&skip={20 * (i % 50)}"), n, cal,
+            preparar=invalidar_listas))
+        resultados.append(ejecutar_escenario(
+            "api.obtener_ticket", lambda i: get(f"/tickets/{elegir_sesgado(rng, tickets)}"), n, cal))
+        resultados.append(ejecutar_escenario(
+            "api.obtener_interacciones", lambda i: get(f"/tickets/{elegir_sesgado(rng, tickets)}/interacciones"), n, cal))
+        resultados.append(ejecutar_escenario(
+            "api.ticket_detalle", lambda i: get(f"/tickets/{elegir_sesgado(rng, tickets)}/full"), n, cal))
+        resultados.append(ejecutar_escenario(
+            "api.buscar_tickets", lambda i: get(f"/tickets/search?q={rng.choice(TERMINOS_BUSQUEDA)}"), n, cal))
+
+        def crear(i):
+            respuesta = cliente.post("/tickets", json={
+                "usuario_id": rng.choice(usuarios),
+                "titulo": f"benchmark {i}",
+                "descripcion": "ticket creado por benchmarks/suite.py",
+                "prioridad": "media"
+            })
+            if respuesta.status_code >= 400:
+                raise RuntimeError(f"POST /tickets: {respuesta.status_code}")
+
+        def actualizar(i):
+            respuesta = cliente.patch(
+                f"/tickets/{tickets[i % len(tickets)]}/estado",
+                params={"nuevo_estado": ESTADOS[i % len(ESTADOS)], "usuario_id": rng.choice(usuarios)}
+            )
+            if respuesta.status_code >= 400:
+                raise RuntimeError(f"PATCH estado: {respuesta.status_code}")
+
+        resultados.append(ejecutar_escenario("api.crear_ticket", crear, n, cal))
+        resultados.append(ejecutar_escenario("api.actualizar_estado", actualizar, n, cal))
+
+    resultados += escenarios_spool(main.redis_client, n, cal)
+
+    if args.vaciar_cola:
+        main.redis_client.delete("cola:batch:procesar")
+    return resultados
+
+
+def escenarios_spool(redis_client, n, cal):
+    """Costo de guardar en el spool de Redis (con REDIS_SPOOL_SINCRONIZACION) y throughput de reenvío
+
+    Usa un spool temporal y una lista propia en Redis; el spool real no se toca.
+    """
+    import tempfile
+    from config import settings
+    from redis_client import TAMANIO_REENVIO
+    from spool_redis import SpoolRedis
+
+    clave = "benchmark:spool"
+    comando = ["RPUSH", clave, json.dumps({"tipo": "notificar_ticket_creado", "ticket_id": "0" * 36})]
+    original = redis_client.spool
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        redis_client.spool = SpoolRedis(str(Path(directorio) / "spool.db"), 256, settings.REDIS_SPOOL_SINCRONIZACION)
+        try:
+            resultados.append(ejecutar_escenario(
+                f"api.spool_agregar_{settings.REDIS_SPOOL_SINCRONIZACION}",
+                lambda i: redis_client.spool.agregar([comando]), n, cal))
+            redis_client._reenviar_pendientes()
+
+            # Una operación = reenviar un bloque completo (un pipeline de TAMANIO_REENVIO comandos)
+            bloques = max(n // 10, 1)
+            resultado = ejecutar_escenario(
+                "api.spool_reenvio_bloque", lambda i: redis_client._reenviar_pendientes(), bloques, 1,
+                preparar=lambda i: redis_client.spool.agregar([comando] * TAMANIO_REENVIO))
+            resultado["comandos_s"] = resultado["ops_s"] * TAMANIO_REENVIO
+            print(f"   {'':<32} {resultado['comandos_s']:>9.0f} comandos/s reenviados", file=sys.stderr)
+            resultados.append(resultado)
+        finally:
+            redis_client.spool = original
+            redis_client.delete(clave)
+    return resultados
+
+
+# ============================================
+# GRUPO WORKER (se ejecuta dentro de batch-worker/)
+# ============================================
+
+def grupo_worker(args):
+    import main
+
+    logging.getLogger().setLevel(logging.WARNING)
+    rng = random.Random(args.semilla)
+    db = main.SessionLocal()
+    try:
+        tickets = muestra_ids(db, "tickets", 1000, args.semilla)
+        if not tickets:
+            raise SystemExit("No hay datos: cargar con database/generar_datos.py")
+
+        resultados = [ejecutar_escenario(
+            "worker.notificar_ticket_creado",
+            lambda i: main.procesar_ticket_creado({"ticket_id": rng.choice(tickets)}, db),
+            args.operaciones, args.calentamiento
+        )]
+
+        hoy = datetime.now(timezone.utc).date()
+        resultados.append(ejecutar_escenario(
+            "worker.generar_reporte_30_dias",
+            lambda i: main.generar_reporte({"desde": str(hoy - timedelta(days=30)), "hasta": str(hoy)}, db),
+            max(args.operaciones // 10, 5), 1
+        ))
+
+        # Recorrido completo desde el inicio; se restaura el checkpoint real al terminar
+        checkpoint = main.redis_client.get(main.settings.CHECKPOINT_VENCIDOS)
+        try:
+            resultados.append(ejecutar_escenario(
+                "worker.procesar_tickets_vencidos",
+                lambda i: main.procesar_tickets_vencidos({"reiniciar": True}, db),
+                args.repeticiones_recorrido, 0
+            ))
+        finally:
+            if checkpoint:
+                main.redis_client.set(
+                    main.settings.CHECKPOINT_VENCIDOS,
+                    checkpoint if isinstance(checkpoint, str) else json.dumps(checkpoint)
+                )
+            else:
+                main.redis_client.delete(main.settings.CHECKPOINT_VENCIDOS)
+        return resultados
+    finally:
+        db.close()
+
+
+# ============================================
+# ORQUESTACIÓN Y COMPARACIÓN
+# ============================================
+
+def ejecutar_grupo(grupo, args):
+    comando = [
+        sys.executable, str(Path(__file__).resolve()), "--grupo", grupo,
+        "--operaciones", str(args.operaciones), "--calentamiento", str(args.calentamiento),
+        "--semilla", str(args.semilla), "--repeticiones-recorrido", str(args.repeticiones_recorrido),
+    ]
+    if args.vaciar_cola:
+        comando.append("--vaciar-cola")
+    proceso = subprocess.run(
+        comando, cwd=DIRECTORIOS[grupo], env={**os.environ, **ENTORNO_HIJO},
+        stdout=subprocess.PIPE, text=True
+    )
+    if proceso.returncode != 0:
+        raise SystemExit(f"El grupo {grupo} terminó con código {proceso.returncode}")
+    linea = next(l for l in reversed(proceso.stdout.splitlines()) if l.startswith(MARCA_RESULTADOS))
+    return json.loads(linea[len(MARCA_RESULTADOS):])
+
+
+def volumen():
+    """Filas estimadas (pg_class.reltuples) para saber con qué volumen se midió"""
+    engine = create_engine(os.environ["SUPABASE_DB_URL"])
+    try:
+        with engine.connect() as conn:
+            filas = conn.execute(text("""
+                SELECT c.relname, GREATEST(c.reltuples, 0)::BIGINT + COALESCE(SUM(GREATEST(h.reltuples, 0)), 0)::BIGINT
+                FROM pg_class c
+                LEFT JOIN pg_inherits i ON i.inhparent = c.oid
+                LEFT JOIN pg_class h ON h.oid = i.inhrelid
+                WHERE c.relname IN ('usuarios', 'tickets', 'interacciones') AND c.relkind IN ('r', 'p')
+                GROUP BY c.relname, c.reltuples
+            """)).fetchall()
+        return {nombre: int(cantidad) for nombre, cantidad in filas}
+    finally:
+        engine.dispose()
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual, base, tolerancia):
+    """Imprimir diferencias por escenario; devuelve la cantidad de regresiones"""
+    previos = {r["escenario"]: r for r in base["resultados"]}
+    regresiones = 0
+    print()
+    print(f"Comparación con {base.get('commit') or 'base'} ({base.get('fecha')}), tolerancia {tolerancia:.0%}")
+    print(f"{'Escenario':<34} {'ops/s':>18} {'p95 ms':>20} {'p99 ms':>20}")
+    for r in actual["resultados"]:
+        previo = previos.get(r["escenario"])
+        if not previo:
+            print(f"{r['escenario']:<34} (nuevo)")
+            continue
+        delta = lambda clave: (r[clave] - previo[clave]) / previo[clave] if previo[clave] else 0.0
+        regresion = (delta("ops_s") < -tolerancia or delta("p95_ms") > tolerancia or delta("p99_ms") > tolerancia)
+        regresiones += regresion
+        print(f"{r['escenario']:<34} {r['ops_s']:>9.1f} ({delta('ops_s'):+6.1%}) "
+              f"{r['p95_ms']:>10.2f} ({delta('p95_ms'):+6.1%}) {r['p99_ms']:>10.2f} ({delta('p99_ms'):+6.1%})"
+              f"{'  ⚠️ regresión' if regresion else ''}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks del API y del Batch Worker")
+    parser.add_argument("--grupos", default="api,worker", help="Grupos a ejecutar (api, worker)")
+    parser.add_argument("--operaciones", type=int, default=500, help="Operaciones medidas por escenario")
+    parser.add_argument("--calentamiento", type=int, default=50, help="Operaciones previas sin medir")
+    parser.add_argument("--repeticiones-recorrido", type=int, default=3, help="Recorridos completos de tickets vencidos")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla de la selección de ids")
+    parser.add_argument("--salida", default=None, help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", default=None, help="Resultados anteriores para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="Variación admitida antes de marcar regresión")
+    parser.add_argument("--vaciar-cola", action="store_true", help="Vaciar cola:batch:procesar tras los escenarios de escritura")
+    parser.add_argument("--grupo", choices=sorted(DIRECTORIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.grupo:
+        # Proceso hijo: dentro del directorio del servicio
+        sys.path.insert(0, os.getcwd())
+        resultados = grupo_api(args) if args.grupo == "api" else grupo_worker(args)
+        print(MARCA_RESULTADOS + json.dumps(resultados))
+        return
+
+    if not os.getenv("SUPABASE_DB_URL"):
+        print("❌ Error: No se encontró SUPABASE_DB_URL en las variables de entorno")
+        return
+
+    print("=" * 70, file=sys.stderr)
+    print("SUITE DE BENCHMARKS", file=sys.stderr)
+    print("=" * 70, file=sys.stderr)
+
+    informe = {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "commit": commit_actual(),
+        "host": {"python": platform.python_version(), "sistema": platform.platform(), "cpus": os.cpu_count()},
+        "volumen": volumen(),
+        "parametros": {"operaciones": args.operaciones, "calentamiento": args.calentamiento, "semilla": args.semilla},
+        "resultados": [],
+    }
+    print(f"Volumen: {informe['volumen']}", file=sys.stderr)
+    for grupo in args.grupos.split(","):
+        print(f"\n[{grupo}]", file=sys.stderr)
+        informe["resultados"].extend(ejecutar_grupo(grupo.strip(), args))
+
+    if args.salida:
+        Path(args.salida).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.salida).write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nResultados guardados en {args.salida}", file=sys.stderr)
+
+    if args.comparar:
+        base = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        if comparar(informe, base, args.tolerancia):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
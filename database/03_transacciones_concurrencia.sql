@@ -177,6 +177,39 @@ VALUES (
 COMMIT;
 */
 
+-- ============================================
+-- CONCURRENCIA OPTIMISTA (Usada por PATCH /tickets/{id}/estado)
+-- ============================================
+-- En lugar de bloquear la fila con SELECT ... FOR UPDATE y luego hacer
+-- UPDATE + INSERT (3 round-trips con el lock tomado), se usa una sola
+-- sentencia. fecha_actualizacion actúa como número de versión: si otra
+-- transacción modificó el ticket, el UPDATE no afecta filas, el INSERT
+-- tampoco se ejecuta y el API responde 409.
+-- El API además lee el estado anterior sin lock explícito, uniendo tickets
+-- consigo misma (ver SQL_ACTUALIZAR_ESTADO_TICKET en backend/consultas.py):
+-- la condición t.fecha_actualizacion = anterior.fecha_actualizacion hace
+-- que, si otra transacción cambió la fila, la reevaluación del UPDATE no
+-- afecte filas, así el estado anterior nunca es uno desactualizado. Sin
+-- versión del cliente, el API reintenta la sentencia.
+
+/*
+WITH actualizado AS (
+    UPDATE tickets
+    SET estado = 'en_proceso',
+        fecha_actualizacion = CURRENT_TIMESTAMP
+    WHERE id = '00000000-0000-0000-0000-000000000001'
+      AND fecha_actualizacion = '2024-01-15 10:30:00.123456+00'  -- versión leída
+    RETURNING id, estado, fecha_actualizacion
+), interaccion AS (
+    INSERT INTO interacciones (ticket_id, usuario_id, tipo, contenido)
+    SELECT id, '00000000-0000-0000-0000-000000000002', 'cambio_estado',
+           'Estado actualizado a en_proceso'
+    FROM actualizado
+)
+SELECT id, estado, fecha_actualizacion FROM actualizado;
+-- 0 filas => conflicto de versión (o ticket inexistente)
+*/
+
 -- ============================================
 -- TRANSACCIÓN CON MANEJO DE ERRORES
 -- ============================================
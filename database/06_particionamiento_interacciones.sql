@@ -0,0 +1,247 @@
+-- ============================================
+-- FASE 3.1: PARTICIONAMIENTO DE LA TABLA INTERACCIONES
+-- Particionamiento declarativo mensual por fecha_creacion
+-- ============================================
+
+-- ============================================
+-- JUSTIFICACIÓN
+-- ============================================
+-- interacciones es la tabla de mayor volumen y crece sin límite. Con una sola
+-- tabla, idx_interacciones_ticket_fecha, idx_interacciones_tipo y el índice GIN
+-- de metadata crecen con ella: cada INSERT mantiene índices cada vez más grandes
+-- y VACUUM recorre la tabla completa aunque solo cambien los datos recientes.
+--
+-- Con particiones mensuales (RANGE sobre fecha_creacion):
+-- - Los INSERT solo tocan la partición del mes actual y sus índices (pequeños, en caché)
+-- - VACUUM/ANALYZE trabajan partición por partición; los meses cerrados quedan congelados
+-- - Los meses antiguos se desvinculan (DETACH) y archivan sin DELETE masivo
+-- - Las consultas con límite inferior sobre fecha_creacion descartan particiones (pruning)
+--
+-- Restricciones de PostgreSQL a tener en cuenta:
+-- - La PRIMARY KEY debe incluir la clave de partición: (id, fecha_creacion)
+-- - id sigue usando la secuencia interacciones_id_seq, por lo que sigue siendo único
+-- - No se crea partición DEFAULT: impediría el "ordered append" que usa
+--   ORDER BY fecha_creacion DESC LIMIT para leer solo las particiones más recientes.
+--   Las particiones futuras se crean por adelantado (ver crear_particiones_interacciones
+--   y AUTOMATIZACIÓN)
+
+-- ============================================
+-- FUNCIONES DE MANTENIMIENTO DE PARTICIONES
+-- ============================================
+
+-- Crear la partición de un mes: <tabla>_pYYYY_MM
+CREATE OR REPLACE FUNCTION crear_particion_interacciones(
+    p_mes DATE,
+    p_tabla TEXT DEFAULT 'interacciones'
+)
+RETURNS TEXT AS $$
+DECLARE
+    v_desde DATE := date_trunc('month', p_mes)::DATE;
+    v_hasta DATE := (date_trunc('month', p_mes) + INTERVAL '1 month')::DATE;
+    v_nombre TEXT := format('%s_p%s', p_tabla, to_char(v_desde, 'YYYY_MM'));
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+        v_nombre, p_tabla, v_desde, v_hasta
+    );
+    RETURN v_nombre;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Crear las particiones del mes actual y de los próximos p_meses_adelante meses
+CREATE OR REPLACE FUNCTION crear_particiones_interacciones(
+    p_meses_adelante INTEGER DEFAULT 3
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_mes DATE;
+    v_creadas INTEGER := 0;
+BEGIN
+    FOR v_mes IN
+        SELECT generate_series(
+            date_trunc('month', CURRENT_DATE),
+            date_trunc('month', CURRENT_DATE) + make_interval(months => p_meses_adelante),
+            INTERVAL '1 month'
+        )::DATE
+    LOOP
+        IF to_regclass(format('interacciones_p%s', to_char(v_mes, 'YYYY_MM'))) IS NULL THEN
+            PERFORM crear_particion_interacciones(v_mes);
+            v_creadas := v_creadas + 1;
+        END IF;
+    END LOOP;
+    RETURN v_creadas;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Desvincular (DETACH) las particiones anteriores a la ventana de retención.
+-- Las tablas desvinculadas se conservan para archivarlas (pg_dump) y eliminarlas
+-- según 04_estrategia_backup.sql.
+CREATE OR REPLACE FUNCTION desvincular_particiones_interacciones(
+    p_meses_retencion INTEGER DEFAULT 12
+)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    v_particion TEXT;
+    v_limite DATE := (date_trunc('month', CURRENT_DATE) - make_interval(months => p_meses_retencion))::DATE;
+BEGIN
+    FOR v_particion IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'interacciones'::regclass
+          AND c.relname ~ '^interacciones_p[0-9]{4}_[0-9]{2}$'
+          AND to_date(substring(c.relname FROM '[0-9]{4}_[0-9]{2}$'), 'YYYY_MM') < v_limite
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE interacciones DETACH PARTITION %I', v_particion);
+        RETURN NEXT v_particion;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+COMMENT ON FUNCTION crear_particiones_interacciones IS 'Crea por adelantado las particiones mensuales de interacciones (ejecutado por Batch Worker)';
+COMMENT ON FUNCTION desvincular_particiones_interacciones IS 'Desvincula particiones de interacciones fuera de la ventana de retención (ejecutado por Batch Worker)';
+
+-- ============================================
+-- MIGRACIÓN DESDE LA TABLA EXISTENTE
+-- ============================================
+-- Ejecutar en una ventana de mantenimiento. La tabla original se bloquea para
+-- escritura durante la copia y queda como interacciones_legacy hasta verificar.
+-- Para tablas muy grandes, copiar por rangos de meses antes del swap y dentro
+-- de la transacción copiar solo el último tramo.
+
+BEGIN;
+
+-- Bloquear escrituras (las lecturas siguen funcionando)
+LOCK TABLE interacciones IN EXCLUSIVE MODE;
+
+CREATE TABLE interacciones_particionada (
+    id BIGINT NOT NULL DEFAULT nextval('interacciones_id_seq'),
+    ticket_id UUID NOT NULL,
+    usuario_id UUID NULL,
+    tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('comentario', 'cambio_estado', 'asignacion', 'archivo')),
+    contenido TEXT NOT NULL,
+    metadata JSONB NULL,
+    fecha_creacion TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT pk_interacciones_particionada PRIMARY KEY (id, fecha_creacion),
+    CONSTRAINT fk_interacciones_particionada_ticket FOREIGN KEY (ticket_id)
+        REFERENCES tickets(id) ON DELETE CASCADE,
+    CONSTRAINT fk_interacciones_particionada_usuario FOREIGN KEY (usuario_id)
+        REFERENCES usuarios(id) ON DELETE SET NULL
+) PARTITION BY RANGE (fecha_creacion);
+
+-- Particiones para todos los meses con datos existentes y los próximos 3 meses
+SELECT crear_particion_interacciones(mes::DATE, 'interacciones_particionada')
+FROM generate_series(
+    date_trunc('month', COALESCE((SELECT MIN(fecha_creacion) FROM interacciones), CURRENT_TIMESTAMP)),
+    date_trunc('month', CURRENT_TIMESTAMP) + INTERVAL '3 months',
+    INTERVAL '1 month'
+) AS mes;
+
+-- Copiar datos (antes de crear índices: la carga es más rápida)
+INSERT INTO interacciones_particionada (id, ticket_id, usuario_id, tipo, contenido, metadata, fecha_creacion)
+SELECT id, ticket_id, usuario_id, tipo, contenido, metadata, fecha_creacion
+FROM interacciones;
+
+-- Índices en la tabla padre: se crean automáticamente en cada partición
+CREATE INDEX idx_interacciones_particionada_ticket_fecha
+    ON interacciones_particionada(ticket_id, fecha_creacion DESC);
+CREATE INDEX idx_interacciones_particionada_usuario_id ON interacciones_particionada(usuario_id)
+    WHERE usuario_id IS NOT NULL;
+CREATE INDEX idx_interacciones_particionada_tipo ON interacciones_particionada(tipo);
+CREATE INDEX idx_interacciones_particionada_metadata ON interacciones_particionada USING GIN(metadata);
+
+-- La secuencia debe pasar a la tabla nueva antes de que la legacy pueda eliminarse
+ALTER SEQUENCE interacciones_id_seq OWNED BY interacciones_particionada.id;
+
+-- Swap de nombres: la tabla legacy conserva sus índices con sufijo _legacy
+ALTER TABLE interacciones RENAME TO interacciones_legacy;
+ALTER INDEX interacciones_pkey RENAME TO interacciones_legacy_pkey;
+ALTER INDEX idx_interacciones_ticket_fecha RENAME TO idx_interacciones_legacy_ticket_fecha;
+ALTER INDEX idx_interacciones_usuario_id RENAME TO idx_interacciones_legacy_usuario_id;
+ALTER INDEX idx_interacciones_tipo RENAME TO idx_interacciones_legacy_tipo;
+ALTER INDEX idx_interacciones_metadata RENAME TO idx_interacciones_legacy_metadata;
+
+ALTER TABLE interacciones_particionada RENAME TO interacciones;
+ALTER TABLE interacciones RENAME CONSTRAINT pk_interacciones_particionada TO interacciones_pkey;
+ALTER TABLE interacciones RENAME CONSTRAINT interacciones_particionada_tipo_check TO interacciones_tipo_check;
+ALTER TABLE interacciones RENAME CONSTRAINT fk_interacciones_particionada_ticket TO fk_interacciones_ticket;
+ALTER TABLE interacciones RENAME CONSTRAINT fk_interacciones_particionada_usuario TO fk_interacciones_usuario;
+ALTER INDEX idx_interacciones_particionada_ticket_fecha RENAME TO idx_interacciones_ticket_fecha;
+ALTER INDEX idx_interacciones_particionada_usuario_id RENAME TO idx_interacciones_usuario_id;
+ALTER INDEX idx_interacciones_particionada_tipo RENAME TO idx_interacciones_tipo;
+ALTER INDEX idx_interacciones_particionada_metadata RENAME TO idx_interacciones_metadata;
+
+-- Renombrar particiones al esquema interacciones_pYYYY_MM que usan las funciones de mantenimiento
+DO $$
+DECLARE
+    v_particion TEXT;
+BEGIN
+    FOR v_particion IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'interacciones'::regclass
+    LOOP
+        EXECUTE format(
+            'ALTER TABLE %I RENAME TO %I',
+            v_particion,
+            replace(v_particion, 'interacciones_particionada_', 'interacciones_')
+        );
+    END LOOP;
+END $$;
+
+-- Permisos (los mismos que 02_dcl_roles_permisos.sql otorga sobre la tabla original)
+GRANT SELECT, INSERT, UPDATE ON interacciones TO rol_api;
+GRANT SELECT ON interacciones TO rol_batch;
+REVOKE DELETE ON interacciones FROM rol_api;
+REVOKE INSERT, UPDATE, DELETE ON interacciones FROM rol_batch;
+
+COMMENT ON TABLE interacciones IS 'Tabla de interacciones/comentarios en tickets (alto volumen, particionada por mes)';
+COMMENT ON COLUMN interacciones.id IS 'Identificador BIGINT (secuencia interacciones_id_seq), único junto a fecha_creacion';
+COMMENT ON INDEX idx_interacciones_ticket_fecha IS 'Índice compuesto optimizado para consultas por ticket y fecha';
+
+COMMIT;
+
+-- Otorgar permiso EXECUTE al rol_batch para el mantenimiento programado
+GRANT EXECUTE ON FUNCTION crear_particiones_interacciones(INTEGER) TO rol_batch;
+GRANT EXECUTE ON FUNCTION desvincular_particiones_interacciones(INTEGER) TO rol_batch;
+
+-- Después de verificar la migración:
+-- DROP TABLE interacciones_legacy;
+
+-- ============================================
+-- AUTOMATIZACIÓN
+-- ============================================
+-- Sin partición DEFAULT, un INSERT fuera de la ventana creada falla: al menos
+-- una de estas opciones debe estar activa.
+--
+-- Opción 1 (por defecto): Batch Worker. Ejecuta crear_particiones_interacciones
+-- al iniciar y cada MANTENER_PARTICIONES_SEGUNDOS (ver batch-worker/README.md);
+-- desvincula solo si PARTICIONES_MESES_RETENCION > 0. También como tarea manual:
+--   {"tipo": "mantener_particiones", "meses_adelante": 3, "meses_retencion": 12}
+--
+-- Opción 2: pg_cron (disponible en Supabase)
+-- SELECT cron.schedule('particiones-interacciones', '0 3 1 * *',
+--     $$SELECT crear_particiones_interacciones(3); SELECT desvincular_particiones_interacciones(12);$$);
+
+-- ============================================
+-- VERIFICACIÓN
+-- ============================================
+
+-- Particiones existentes y sus rangos
+-- SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS rango
+-- FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+-- WHERE i.inhparent = 'interacciones'::regclass ORDER BY c.relname;
+
+-- Pruning de la consulta del API (GET /tickets/{id}/interacciones):
+-- EXPLAIN (ANALYZE, COSTS OFF)
+-- SELECT id, ticket_id, usuario_id, tipo, contenido, fecha_creacion
+-- FROM interacciones
+-- WHERE ticket_id = '00000000-0000-0000-0000-000000000001'
+--   AND fecha_creacion >= (SELECT fecha_creacion FROM tickets WHERE id = '00000000-0000-0000-0000-000000000001')
+-- ORDER BY fecha_creacion DESC
+-- LIMIT 50;
+-- => Las particiones anteriores a la creación del ticket aparecen como "(never executed)"
+--    o se eliminan del plan ("Subplans Removed")
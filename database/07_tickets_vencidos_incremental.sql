@@ -0,0 +1,100 @@
+-- ============================================
+-- FASE 3.2: PROCESAMIENTO INCREMENTAL DE TICKETS VENCIDOS
+-- Keyset pagination sobre (fecha_creacion, id)
+-- ============================================
+
+-- ============================================
+-- JUSTIFICACIÓN
+-- ============================================
+-- procesar_tickets_vencidos() devuelve en un solo resultado todos los tickets
+-- abiertos con más de 7 días. A escala son cientos de miles de filas por
+-- ejecución, y cada ejecución vuelve a recorrerlas todas.
+--
+-- procesar_tickets_vencidos_lote() devuelve un bloque a partir de un cursor
+-- (fecha_creacion, id). El Batch Worker guarda el último cursor procesado en
+-- Redis, por lo que una ejecución interrumpida se reanuda donde quedó y las
+-- ejecuciones siguientes solo leen los tickets que vencieron desde la anterior.
+
+-- ============================================
+-- ÍNDICE PARCIAL: Tickets abiertos por fecha de creación
+-- ============================================
+-- Solo indexa tickets abiertos/en proceso (los cerrados, que son la mayoría
+-- con el tiempo, no ocupan espacio). El orden (fecha_creacion, id) coincide
+-- con el del keyset, así que cada bloque es un Index Scan acotado por LIMIT.
+
+CREATE INDEX IF NOT EXISTS idx_tickets_abiertos_fecha
+    ON tickets(fecha_creacion, id)
+    WHERE estado IN ('abierto', 'en_proceso');
+
+COMMENT ON INDEX idx_tickets_abiertos_fecha IS 'Índice parcial para recorrer tickets abiertos por antigüedad (keyset)';
+
+-- ============================================
+-- FUNCIÓN: Bloque de tickets vencidos a partir de un cursor
+-- ============================================
+
+CREATE OR REPLACE FUNCTION procesar_tickets_vencidos_lote(
+    p_desde_fecha TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_desde_id UUID DEFAULT NULL,
+    p_limite INTEGER DEFAULT 1000
+)
+RETURNS TABLE (
+    ticket_id UUID,
+    dias_abierto INTEGER,
+    estado_actual VARCHAR(20),
+    fecha_creacion TIMESTAMP WITH TIME ZONE
+) AS $$
+BEGIN
+    -- Dos sentencias en lugar de "p_desde_fecha IS NULL OR (...) > (...)": PL/pgSQL
+    -- cachea el plan de cada una y tras 5 ejecuciones puede pasar a un plan
+    -- genérico, en el que el OR no se simplifica y el cursor no puede usarse como
+    -- condición de inicio del índice (recorrería desde el principio filtrando)
+    IF p_desde_fecha IS NULL THEN
+        RETURN QUERY
+        SELECT
+            t.id,
+            EXTRACT(DAY FROM (CURRENT_TIMESTAMP - t.fecha_creacion))::INTEGER as dias_abierto,
+            t.estado,
+            t.fecha_creacion
+        FROM tickets t
+        WHERE t.estado IN ('abierto', 'en_proceso')
+          AND t.fecha_creacion < CURRENT_TIMESTAMP - INTERVAL '7 days'
+        ORDER BY t.fecha_creacion ASC, t.id ASC
+        LIMIT p_limite;
+    ELSE
+        RETURN QUERY
+        SELECT
+            t.id,
+            EXTRACT(DAY FROM (CURRENT_TIMESTAMP - t.fecha_creacion))::INTEGER as dias_abierto,
+            t.estado,
+            t.fecha_creacion
+        FROM tickets t
+        WHERE t.estado IN ('abierto', 'en_proceso')
+          AND t.fecha_creacion < CURRENT_TIMESTAMP - INTERVAL '7 days'
+          AND (t.fecha_creacion, t.id) > (p_desde_fecha, COALESCE(p_desde_id, '00000000-0000-0000-0000-000000000000'::UUID))
+        ORDER BY t.fecha_creacion ASC, t.id ASC
+        LIMIT p_limite;
+    END IF;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Otorgar permiso EXECUTE al rol_batch
+GRANT EXECUTE ON FUNCTION procesar_tickets_vencidos_lote(TIMESTAMP WITH TIME ZONE, UUID, INTEGER) TO rol_batch;
+
+COMMENT ON FUNCTION procesar_tickets_vencidos_lote IS 'Bloque de tickets vencidos desde un cursor (fecha_creacion, id) (ejecutado por Batch Worker)';
+
+-- ============================================
+-- VERIFICACIÓN
+-- ============================================
+
+-- Primer bloque
+-- SELECT * FROM procesar_tickets_vencidos_lote(NULL, NULL, 1000);
+
+-- Bloque siguiente (usando la última fila del bloque anterior)
+-- SELECT * FROM procesar_tickets_vencidos_lote('2024-01-15 10:30:00+00', '770e8400-e29b-41d4-a716-446655440000', 1000);
+
+-- El plan debe usar idx_tickets_abiertos_fecha
+-- EXPLAIN SELECT id FROM tickets
+-- WHERE estado IN ('abierto', 'en_proceso')
+--   AND fecha_creacion < CURRENT_TIMESTAMP - INTERVAL '7 days'
+--   AND (fecha_creacion, id) > ('2024-01-15 10:30:00+00', '770e8400-e29b-41d4-a716-446655440000')
+-- ORDER BY fecha_creacion, id LIMIT 1000;
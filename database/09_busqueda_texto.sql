@@ -0,0 +1,69 @@
+-- ============================================
+-- FASE 3.4: BÚSQUEDA DE TEXTO COMPLETO
+-- tsvector generados + índices GIN para GET /tickets/search
+-- ============================================
+
+-- ============================================
+-- JUSTIFICACIÓN
+-- ============================================
+-- Sin endpoint de búsqueda, el frontend pagina GET /tickets y filtra en el
+-- cliente. Un ILIKE '%texto%' en el servidor tampoco escala: no puede usar
+-- índices B-tree y recorre la tabla completa.
+--
+-- Las columnas `busqueda` son GENERATED ... STORED: PostgreSQL las mantiene en
+-- cada INSERT/UPDATE sin triggers ni cambios en el API, y los índices GIN
+-- resuelven `busqueda @@ consulta` sin recorrer la tabla.
+--
+-- Configuración 'spanish' (stemming: "conectar" encuentra "conexión").
+-- El título pesa más (A) que la descripción (B) al ordenar por relevancia.
+--
+-- NOTA: agregar una columna STORED reescribe la tabla (ACCESS EXCLUSIVE).
+-- En producción, ejecutar en una ventana de mantenimiento.
+
+-- ============================================
+-- TICKETS: título + descripción
+-- ============================================
+
+ALTER TABLE tickets
+    ADD COLUMN IF NOT EXISTS busqueda TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(titulo, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(descripcion, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tickets_busqueda ON tickets USING GIN(busqueda);
+
+COMMENT ON COLUMN tickets.busqueda IS 'tsvector (spanish) de titulo (A) y descripcion (B) para búsqueda de texto completo';
+
+-- ============================================
+-- INTERACCIONES: contenido
+-- ============================================
+-- interacciones está particionada por mes (06_particionamiento_interacciones.sql):
+-- la columna y el índice se propagan a las particiones existentes y futuras.
+
+ALTER TABLE interacciones
+    ADD COLUMN IF NOT EXISTS busqueda TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('spanish', coalesce(contenido, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_interacciones_busqueda ON interacciones USING GIN(busqueda);
+
+COMMENT ON COLUMN interacciones.busqueda IS 'tsvector (spanish) de contenido para búsqueda de texto completo';
+
+ANALYZE tickets;
+ANALYZE interacciones;
+
+-- ============================================
+-- VERIFICACIÓN
+-- ============================================
+
+-- Consulta de GET /tickets/search (ambos recorridos deben ser Bitmap Index Scan)
+-- EXPLAIN ANALYZE
+-- SELECT id, ts_rank(busqueda, websearch_to_tsquery('spanish', 'error conexión')) AS rango
+-- FROM tickets
+-- WHERE busqueda @@ websearch_to_tsquery('spanish', 'error conexión')
+-- ORDER BY rango DESC, id DESC
+-- LIMIT 20;
+
+-- EXPLAIN ANALYZE
+-- SELECT ticket_id FROM interacciones
+-- WHERE busqueda @@ websearch_to_tsquery('spanish', 'error conexión');
@@ -0,0 +1,203 @@
+"""
+Benchmark de búsqueda de texto completo
+Compara ILIKE '%texto%' contra tsvector + GIN (09_busqueda_texto.sql)
+sobre un corpus sintético de tickets e interacciones.
+
+Uso:
+    python benchmark_busqueda.py --tickets 2000000 --interacciones 4000000
+"""
+
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+# Cargar variables de entorno del backend
+load_dotenv(dotenv_path='../backend/.env')
+
+TABLA_TICKETS = "bench_busqueda_tickets"
+TABLA_INTERACCIONES = "bench_busqueda_interacciones"
+
+# Vocabulario de soporte técnico: las frases se arman con palabras al azar
+VOCABULARIO = [
+    "error", "conexión", "servidor", "impresora", "contraseña", "correo", "acceso",
+    "lento", "pantalla", "teclado", "red", "vpn", "licencia", "factura", "usuario",
+    "actualización", "instalación", "backup", "disco", "memoria", "reinicio",
+    "bloqueado", "permiso", "archivo", "carpeta", "sistema", "aplicación", "móvil",
+    "navegador", "certificado", "firewall", "puerto", "base", "datos", "reporte",
+    "sincronización", "calendario", "reunión", "audio", "video", "cámara", "wifi",
+]
+
+# Términos a medir: frecuentes, poco frecuentes y combinaciones
+CONSULTAS = ["error", "vpn", "certificado firewall", "impresora lento", "sincronización calendario"]
+
+SQL_ILIKE = """
+    SELECT t.id
+    FROM {tickets} t
+    WHERE t.titulo ILIKE :patron OR t.descripcion ILIKE :patron
+       OR EXISTS (SELECT 1 FROM {interacciones} i WHERE i.ticket_id = t.id AND i.contenido ILIKE :patron)
+    LIMIT 20
+"""
+
+SQL_FTS = """
+    WITH consulta AS (
+        SELECT websearch_to_tsquery('spanish', :q) AS q
+    ), coincidencias AS (
+        SELECT t.id, ts_rank(t.busqueda, consulta.q) AS rango
+        FROM {tickets} t, consulta
+        WHERE t.busqueda @@ consulta.q
+        UNION ALL
+        SELECT i.ticket_id, ts_rank(i.busqueda, consulta.q) * 0.5
+        FROM {interacciones} i, consulta
+        WHERE i.busqueda @@ consulta.q
+    )
+    SELECT id, MAX(rango)::FLOAT8 AS rango
+    FROM coincidencias
+    GROUP BY id
+    ORDER BY rango DESC, id DESC
+    LIMIT 20
+"""
+
+
+def percentiles(muestras):
+    muestras = sorted(muestras)
+    p = lambda q: muestras[min(len(muestras) - 1, int(len(muestras) * q))] * 1000
+    return p(0.50), p(0.95), p(0.99)
+
+
+def frase(palabras):
+    """Expresión SQL que arma una frase de `palabras` palabras al azar del vocabulario"""
+    return " || ' ' || ".join(
+        "(:vocabulario)[1 + floor(random() * cardinality(:vocabulario))::INT]"
+        for _ in range(palabras)
+    )
+
+
+def crear_tablas(conn):
+    for tabla in (TABLA_INTERACCIONES, TABLA_TICKETS):
+        conn.execute(text(f"DROP TABLE IF EXISTS {tabla} CASCADE"))
+
+    conn.execute(text(f"""
+        CREATE TABLE {TABLA_TICKETS} (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            n INTEGER NOT NULL,
+            titulo VARCHAR(200) NOT NULL,
+            descripcion TEXT NOT NULL,
+            busqueda TSVECTOR GENERATED ALWAYS AS (
+                setweight(to_tsvector('spanish', coalesce(titulo, '')), 'A') ||
+                setweight(to_tsvector('spanish', coalesce(descripcion, '')), 'B')
+            ) STORED
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE {TABLA_INTERACCIONES} (
+            id BIGSERIAL PRIMARY KEY,
+            ticket_id UUID NOT NULL,
+            contenido TEXT NOT NULL,
+            busqueda TSVECTOR GENERATED ALWAYS AS (to_tsvector('spanish', coalesce(contenido, ''))) STORED
+        )
+    """))
+
+
+def cargar(engine, tickets, interacciones, bloque):
+    """Cargar el corpus con generate_series en bloques confirmados por separado"""
+    params = {"vocabulario": VOCABULARIO}
+    inicio = time.perf_counter()
+    for desde in range(1, tickets + 1, bloque):
+        hasta = min(tickets, desde + bloque - 1)
+        with engine.begin() as conn:
+            conn.execute(text(f"""
+                INSERT INTO {TABLA_TICKETS} (n, titulo, descripcion)
+                SELECT g, {frase(4)}, {frase(20)}
+                FROM generate_series(:desde, :hasta) AS g
+            """), {**params, "desde": desde, "hasta": hasta})
+        print(f"   {TABLA_TICKETS}: {hasta:,} / {tickets:,} filas", end="\r")
+    print(f"   {TABLA_TICKETS}: {tickets:,} filas cargadas en {time.perf_counter() - inicio:.1f} s")
+
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE UNIQUE INDEX ON {TABLA_TICKETS}(n)"))
+
+    inicio = time.perf_counter()
+    for desde in range(1, interacciones + 1, bloque):
+        hasta = min(interacciones, desde + bloque - 1)
+        with engine.begin() as conn:
+            conn.execute(text(f"""
+                INSERT INTO {TABLA_INTERACCIONES} (ticket_id, contenido)
+                SELECT t.id, {frase(12)}
+                FROM generate_series(:desde, :hasta) AS g
+                JOIN {TABLA_TICKETS} t ON t.n = 1 + (g % :tickets)
+            """), {**params, "desde": desde, "hasta": hasta, "tickets": tickets})
+        print(f"   {TABLA_INTERACCIONES}: {hasta:,} / {interacciones:,} filas", end="\r")
+    print(f"   {TABLA_INTERACCIONES}: {interacciones:,} filas cargadas en {time.perf_counter() - inicio:.1f} s")
+
+
+def crear_indices(conn):
+    """Mismos índices que 01_ddl_tablas.sql y 09_busqueda_texto.sql"""
+    conn.execute(text(f"CREATE INDEX ON {TABLA_INTERACCIONES}(ticket_id)"))
+    conn.execute(text(f"CREATE INDEX ON {TABLA_TICKETS} USING GIN(busqueda)"))
+    conn.execute(text(f"CREATE INDEX ON {TABLA_INTERACCIONES} USING GIN(busqueda)"))
+    conn.execute(text(f"ANALYZE {TABLA_TICKETS}"))
+    conn.execute(text(f"ANALYZE {TABLA_INTERACCIONES}"))
+
+
+def medir(engine, sql, params, n):
+    latencias = []
+    consulta = text(sql.format(tickets=TABLA_TICKETS, interacciones=TABLA_INTERACCIONES))
+    with engine.connect() as conn:
+        for _ in range(n):
+            inicio = time.perf_counter()
+            conn.execute(consulta, params).fetchall()
+            latencias.append(time.perf_counter() - inicio)
+    return percentiles(latencias)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda de texto completo")
+    parser.add_argument("--tickets", type=int, default=2_000_000, help="Tickets a generar")
+    parser.add_argument("--interacciones", type=int, default=4_000_000, help="Interacciones a generar")
+    parser.add_argument("--bloque", type=int, default=500_000, help="Filas por transacción de carga")
+    parser.add_argument("--muestras", type=int, default=50, help="Ejecuciones medidas por consulta")
+    parser.add_argument("--sin-ilike", action="store_true", help="Medir solo la búsqueda de texto completo")
+    parser.add_argument("--conservar", action="store_true", help="No eliminar las tablas al terminar")
+    args = parser.parse_args()
+
+    supabase_url = os.getenv('SUPABASE_DB_URL')
+    if not supabase_url:
+        print("❌ Error: No se encontró SUPABASE_DB_URL en las variables de entorno")
+        return
+
+    engine = create_engine(supabase_url, pool_pre_ping=True)
+
+    print("=" * 70)
+    print(f"BENCHMARK DE BÚSQUEDA - {args.tickets:,} tickets, {args.interacciones:,} interacciones")
+    print("=" * 70)
+
+    with engine.begin() as conn:
+        crear_tablas(conn)
+    cargar(engine, args.tickets, args.interacciones, args.bloque)
+    with engine.begin() as conn:
+        crear_indices(conn)
+
+    print()
+    print(f"{'Consulta':<28} {'Método':<8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for q in CONSULTAS:
+        metodos = [("FTS", SQL_FTS, {"q": q})]
+        if not args.sin_ilike:
+            # ILIKE solo puede buscar la frase literal (sin stemming ni AND de términos)
+            metodos.insert(0, ("ILIKE", SQL_ILIKE, {"patron": f"%{q.split()[0]}%"}))
+        for nombre, sql, params in metodos:
+            p50, p95, p99 = medir(engine, sql, params, args.muestras)
+            print(f"{q:<28} {nombre:<8} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f}")
+
+    if not args.conservar:
+        with engine.begin() as conn:
+            for tabla in (TABLA_INTERACCIONES, TABLA_TICKETS):
+                conn.execute(text(f"DROP TABLE IF EXISTS {tabla} CASCADE"))
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark de particionamiento de interacciones
+Compara latencia de INSERT y de la consulta de GET /tickets/{id}/interacciones
+entre una tabla sin particionar y una particionada por mes, con el mismo volumen.
+
+Requiere las funciones de 06_particionamiento_interacciones.sql.
+
+Uso:
+    python benchmark_particionamiento.py --filas 10000000 --meses 24
+"""
+
+import argparse
+import os
+import random
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+# Cargar variables de entorno del backend
+load_dotenv(dotenv_path='../backend/.env')
+
+TABLA_SIMPLE = "bench_interacciones_simple"
+TABLA_PARTICIONADA = "bench_interacciones_part"
+TABLA_TICKETS = "bench_tickets"
+
+COLUMNAS = """
+    id BIGSERIAL,
+    ticket_id UUID NOT NULL,
+    usuario_id UUID NULL,
+    tipo VARCHAR(20) NOT NULL,
+    contenido TEXT NOT NULL,
+    metadata JSONB NULL,
+    fecha_creacion TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+"""
+
+CONSULTA_API = """
+    SELECT id, ticket_id, usuario_id, tipo, contenido, fecha_creacion
+    FROM {tabla}
+    WHERE ticket_id = :ticket_id
+      AND fecha_creacion >= (SELECT fecha_creacion FROM bench_tickets WHERE id = :ticket_id)
+    ORDER BY fecha_creacion DESC
+    LIMIT 50
+"""
+
+
+def percentiles(muestras):
+    muestras = sorted(muestras)
+    p = lambda q: muestras[min(len(muestras) - 1, int(len(muestras) * q))] * 1000
+    return p(0.50), p(0.95), p(0.99)
+
+
+def crear_tablas(conn, meses, tickets):
+    """Crear tablas de benchmark y el conjunto de tickets con fechas repartidas en `meses`"""
+    for tabla in (TABLA_SIMPLE, TABLA_PARTICIONADA, TABLA_TICKETS):
+        conn.execute(text(f"DROP TABLE IF EXISTS {tabla} CASCADE"))
+
+    conn.execute(text(f"""
+        CREATE TABLE {TABLA_TICKETS} AS
+        SELECT n, gen_random_uuid() AS id,
+               CURRENT_TIMESTAMP - random() * make_interval(months => :meses) AS fecha_creacion
+        FROM generate_series(1, :tickets) AS n
+    """), {"meses": meses, "tickets": tickets})
+    conn.execute(text(f"ALTER TABLE {TABLA_TICKETS} ADD PRIMARY KEY (id)"))
+    conn.execute(text(f"CREATE UNIQUE INDEX ON {TABLA_TICKETS}(n)"))
+
+    conn.execute(text(f"CREATE TABLE {TABLA_SIMPLE} ({COLUMNAS}, PRIMARY KEY (id))"))
+    conn.execute(text(f"""
+        CREATE TABLE {TABLA_PARTICIONADA} ({COLUMNAS}, PRIMARY KEY (id, fecha_creacion))
+        PARTITION BY RANGE (fecha_creacion)
+    """))
+    conn.execute(text(f"""
+        SELECT crear_particion_interacciones(mes::DATE, '{TABLA_PARTICIONADA}')
+        FROM generate_series(
+            date_trunc('month', CURRENT_TIMESTAMP - make_interval(months => :meses)),
+            date_trunc('month', CURRENT_TIMESTAMP) + INTERVAL '1 month',
+            INTERVAL '1 month'
+        ) AS mes
+    """), {"meses": meses})
+
+
+def crear_indices(conn, tabla):
+    """Mismos índices que 01_ddl_tablas.sql"""
+    conn.execute(text(f"CREATE INDEX ON {tabla}(ticket_id, fecha_creacion DESC)"))
+    conn.execute(text(f"CREATE INDEX ON {tabla}(usuario_id) WHERE usuario_id IS NOT NULL"))
+    conn.execute(text(f"CREATE INDEX ON {tabla}(tipo)"))
+    conn.execute(text(f"CREATE INDEX ON {tabla} USING GIN(metadata)"))
+    conn.execute(text(f"ANALYZE {tabla}"))
+
+
+def cargar(engine, tabla, filas, tickets, bloque):
+    """Cargar `filas` interacciones con generate_series en bloques confirmados por separado"""
+    inicio = time.perf_counter()
+    for desde in range(1, filas + 1, bloque):
+        hasta = min(filas, desde + bloque - 1)
+        with engine.begin() as conn:
+            conn.execute(text(f"""
+                INSERT INTO {tabla} (ticket_id, tipo, contenido, metadata, fecha_creacion)
+                SELECT t.id,
+                       (ARRAY['comentario', 'cambio_estado', 'asignacion', 'archivo'])[1 + g % 4],
+                       'Contenido de interacción ' || g,
+                       CASE WHEN g % 10 = 0 THEN jsonb_build_object('origen', 'benchmark', 'n', g) END,
+                       LEAST(t.fecha_creacion + random() * INTERVAL '20 days', CURRENT_TIMESTAMP)
+                FROM generate_series(:desde, :hasta) AS g
+                JOIN {TABLA_TICKETS} t ON t.n = 1 + (g % :tickets)
+            """), {"desde": desde, "hasta": hasta, "tickets": tickets})
+        print(f"   {tabla}: {hasta:,} / {filas:,} filas", end="\r")
+    print(f"   {tabla}: {filas:,} filas cargadas en {time.perf_counter() - inicio:.1f} s")
+
+
+def medir_inserts(engine, tabla, ticket_ids, n):
+    """INSERT individual con commit, como POST /interacciones"""
+    latencias = []
+    for _ in range(n):
+        inicio = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(
+                text(f"INSERT INTO {tabla} (ticket_id, tipo, contenido) VALUES (:t, 'comentario', 'benchmark')"),
+                {"t": random.choice(ticket_ids)}
+            )
+        latencias.append(time.perf_counter() - inicio)
+    return percentiles(latencias)
+
+
+def medir_lecturas(engine, tabla, ticket_ids, n):
+    """Consulta de GET /tickets/{id}/interacciones"""
+    latencias = []
+    consulta = text(CONSULTA_API.format(tabla=tabla))
+    with engine.connect() as conn:
+        for _ in range(n):
+            inicio = time.perf_counter()
+            conn.execute(consulta, {"ticket_id": random.choice(ticket_ids)}).fetchall()
+            latencias.append(time.perf_counter() - inicio)
+    return percentiles(latencias)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de particionamiento de interacciones")
+    parser.add_argument("--filas", type=int, default=10_000_000, help="Interacciones a cargar por tabla")
+    parser.add_argument("--meses", type=int, default=24, help="Meses de historia a simular")
+    parser.add_argument("--tickets", type=int, default=500_000, help="Tickets distintos")
+    parser.add_argument("--bloque", type=int, default=1_000_000, help="Filas por transacción de carga")
+    parser.add_argument("--muestras", type=int, default=2000, help="Operaciones medidas por prueba")
+    parser.add_argument("--conservar", action="store_true", help="No eliminar las tablas al terminar")
+    args = parser.parse_args()
+
+    supabase_url = os.getenv('SUPABASE_DB_URL')
+    if not supabase_url:
+        print("❌ Error: No se encontró SUPABASE_DB_URL en las variables de entorno")
+        return
+
+    engine = create_engine(supabase_url, pool_pre_ping=True)
+
+    print("=" * 70)
+    print(f"BENCHMARK DE PARTICIONAMIENTO - {args.filas:,} filas, {args.meses} meses")
+    print("=" * 70)
+
+    with engine.begin() as conn:
+        crear_tablas(conn, args.meses, args.tickets)
+
+    for tabla in (TABLA_SIMPLE, TABLA_PARTICIONADA):
+        cargar(engine, tabla, args.filas, args.tickets, args.bloque)
+        with engine.begin() as conn:
+            crear_indices(conn, tabla)
+
+    with engine.connect() as conn:
+        ticket_ids = [str(r[0]) for r in conn.execute(
+            text(f"SELECT id FROM {TABLA_TICKETS} ORDER BY random() LIMIT 5000")
+        )]
+
+    print()
+    print(f"{'Tabla':<28} {'Operación':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for tabla in (TABLA_SIMPLE, TABLA_PARTICIONADA):
+        for nombre, medir in (("INSERT", medir_inserts), ("SELECT", medir_lecturas)):
+            p50, p95, p99 = medir(engine, tabla, ticket_ids, args.muestras)
+            print(f"{tabla:<28} {nombre:<10} {p50:>8.3f} {p95:>8.3f} {p99:>8.3f}")
+
+    if not args.conservar:
+        with engine.begin() as conn:
+            for tabla in (TABLA_SIMPLE, TABLA_PARTICIONADA, TABLA_TICKETS):
+                conn.execute(text(f"DROP TABLE IF EXISTS {tabla} CASCADE"))
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Generador de datos sintéticos a volumen de producción
+Carga usuarios, tickets e interacciones con COPY (psycopg2.copy_expert),
+por bloques confirmados por separado y con una distribución realista:
+
+- Pocos usuarios concentran la mayoría de los tickets (sesgo potencial)
+- Más tickets recientes que antiguos; el estado depende de la antigüedad
+- Interacciones por ticket con cola larga (Pareto): unos pocos tickets muy activos
+- Particiones mensuales de interacciones creadas antes de cargar (06_particionamiento_interacciones.sql)
+
+La misma semilla genera siempre los mismos datos (relativos a la fecha de ejecución).
+
+Uso:
+    python generar_datos.py --usuarios 100000 --tickets 5000000 --interacciones 50000000
+    python generar_datos.py --tickets 200000 --interacciones 2000000 --limpiar
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+# Cargar variables de entorno del backend
+load_dotenv(dotenv_path='../backend/.env')
+
+# Exponente del sesgo de tickets por usuario: con 2.5 el 10% de los usuarios crea ~40% de los tickets
+SESGO_USUARIOS = 2.5
+# Forma de la Pareto de interacciones por ticket (menor = cola más larga)
+FORMA_INTERACCIONES = 1.8
+MAX_INTERACCIONES_TICKET = 2000
+
+ROLES = (["usuario"] * 88) + (["operador"] * 10) + (["admin"] * 2)
+PRIORIDADES = (["baja"] * 30) + (["media"] * 45) + (["alta"] * 20) + (["critica"] * 5)
+TIPOS_INTERACCION = (["comentario"] * 70) + (["cambio_estado"] * 20) + (["asignacion"] * 7) + (["archivo"] * 3)
+
+# Estado según antigüedad del ticket en días: (hasta_dias, [estados ponderados])
+ESTADOS_POR_ANTIGUEDAD = [
+    (2, (["abierto"] * 70) + (["en_proceso"] * 25) + (["resuelto"] * 5)),
+    (14, (["abierto"] * 35) + (["en_proceso"] * 35) + (["resuelto"] * 20) + (["cerrado"] * 10)),
+    (None, (["abierto"] * 5) + (["en_proceso"] * 5) + (["resuelto"] * 30) + (["cerrado"] * 60)),
+]
+
+NOMBRES = ["Ana", "Luis", "María", "Carlos", "Sofía", "Jorge", "Lucía", "Pedro", "Elena", "Diego", "Paula", "Andrés"]
+APELLIDOS = ["García", "Pérez", "López", "Torres", "Ramírez", "Flores", "Vega", "Castro", "Morales", "Rojas"]
+
+# Vocabulario de soporte técnico (mismo registro que benchmark_busqueda.py)
+VOCABULARIO = [
+    "error", "conexión", "servidor", "impresora", "contraseña", "correo", "acceso",
+    "lento", "pantalla", "teclado", "red", "vpn", "licencia", "factura", "usuario",
+    "actualización", "instalación", "backup", "disco", "memoria", "reinicio",
+    "bloqueado", "permiso", "archivo", "carpeta", "sistema", "aplicación", "móvil",
+    "navegador", "certificado", "firewall", "puerto", "base", "datos", "reporte",
+    "sincronización", "calendario", "reunión", "audio", "video", "cámara", "wifi",
+]
+
+COLUMNAS_USUARIOS = "id, email, nombre, rol, activo, fecha_creacion, fecha_actualizacion"
+COLUMNAS_TICKETS = "id, usuario_id, titulo, descripcion, estado, prioridad, fecha_creacion, fecha_actualizacion, fecha_cierre"
+COLUMNAS_INTERACCIONES = "ticket_id, usuario_id, tipo, contenido, metadata, fecha_creacion"
+
+
+def nuevo_uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def frase(rng, palabras):
+    return " ".join(rng.choices(VOCABULARIO, k=palabras))
+
+
+def copiar(cursor, tabla, columnas, buffer):
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {tabla} ({columnas}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def crear_particiones(conn, desde, hasta):
+    """Crear las particiones mensuales del rango si interacciones está particionada"""
+    if not conn.execute(text("SELECT to_regproc('crear_particion_interacciones') IS NOT NULL")).scalar():
+        return 0
+    creadas = 0
+    mes = desde.replace(day=1)
+    while mes <= hasta:
+        conn.execute(text("SELECT crear_particion_interacciones(:mes)"), {"mes": mes.date()})
+        creadas += 1
+        mes = (mes + timedelta(days=32)).replace(day=1)
+    return creadas
+
+
+def limpiar(conn):
+    """Vaciar las tablas (TRUNCATE no dispara los triggers de estadisticas_diarias)"""
+    conn.execute(text("TRUNCATE interacciones, tickets, usuarios CASCADE"))
+    if conn.execute(text("SELECT to_regclass('estadisticas_diarias') IS NOT NULL")).scalar():
+        conn.execute(text("TRUNCATE estadisticas_diarias"))
+
+
+def generar_usuarios(rng, cantidad, semilla, ahora, dias):
+    """Filas de usuarios y la lista de ids de operadores/admins (autores de interacciones)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    ids, operadores = [], []
+    for n in range(cantidad):
+        id_usuario = nuevo_uuid(rng)
+        rol = rng.choice(ROLES)
+        creado = ahora - timedelta(days=dias * rng.random())
+        escritor.writerow((
+            id_usuario,
+            f"sintetico-{semilla}-{n}@ejemplo.test",
+            f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}",
+            rol,
+            "t" if rng.random() < 0.95 else "f",
+            creado.isoformat(),
+            creado.isoformat(),
+        ))
+        ids.append(id_usuario)
+        if rol != "usuario":
+            operadores.append(id_usuario)
+    return buffer, ids, operadores or ids
+
+
+def generar_bloque(rng, cantidad, restantes_interacciones, media_interacciones, usuarios, operadores, ahora, dias):
+    """Un bloque de tickets y sus interacciones como dos buffers CSV"""
+    tickets_csv, interacciones_csv = io.StringIO(), io.StringIO()
+    tickets = csv.writer(tickets_csv, lineterminator="\n")
+    interacciones = csv.writer(interacciones_csv, lineterminator="\n")
+    n_usuarios = len(usuarios)
+    escala = media_interacciones * (FORMA_INTERACCIONES - 1) / FORMA_INTERACCIONES
+    generadas = 0
+
+    for _ in range(cantidad):
+        id_ticket = nuevo_uuid(rng)
+        duenio = usuarios[int(n_usuarios * rng.random() ** SESGO_USUARIOS)]
+        # Antigüedad sesgada a lo reciente (el volumen crece con el tiempo)
+        antiguedad = dias * rng.random() ** 2
+        creado = ahora - timedelta(days=antiguedad)
+        estado = rng.choice(next(e for limite, e in ESTADOS_POR_ANTIGUEDAD if limite is None or antiguedad < limite))
+        actualizado = creado + timedelta(days=antiguedad * rng.random())
+        cierre = actualizado.isoformat() if estado in ("resuelto", "cerrado") else None
+        tickets.writerow((
+            id_ticket, duenio, frase(rng, 4), frase(rng, 20), estado, rng.choice(PRIORIDADES),
+            creado.isoformat(), actualizado.isoformat(), cierre,
+        ))
+
+        k = min(round(rng.paretovariate(FORMA_INTERACCIONES) * escala), MAX_INTERACCIONES_TICKET,
+                restantes_interacciones - generadas)
+        ventana = min(antiguedad, 30.0)
+        for _ in range(k):
+            tipo = rng.choice(TIPOS_INTERACCION)
+            autor = duenio if rng.random() < 0.5 else (operadores[int(len(operadores) * rng.random())] if rng.random() < 0.9 else None)
+            metadata = json.dumps({"archivo": f"adjunto_{rng.randrange(10**6)}.pdf", "bytes": rng.randrange(10**3, 10**7)}) \
+                if tipo == "archivo" else None
+            interacciones.writerow((
+                id_ticket, autor, tipo, frase(rng, 12), metadata,
+                (creado + timedelta(days=ventana * rng.random())).isoformat(),
+            ))
+        generadas += k
+
+    return tickets_csv, interacciones_csv, generadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de datos sintéticos con COPY")
+    parser.add_argument("--usuarios", type=int, default=100_000, help="Usuarios a generar")
+    parser.add_argument("--tickets", type=int, default=5_000_000, help="Tickets a generar")
+    parser.add_argument("--interacciones", type=int, default=50_000_000, help="Interacciones a generar (aprox., máx.)")
+    parser.add_argument("--meses", type=int, default=24, help="Meses de historia")
+    parser.add_argument("--bloque", type=int, default=100_000, help="Tickets por bloque (un COPY y un commit por bloque)")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla del generador")
+    parser.add_argument("--limpiar", action="store_true", help="TRUNCATE de usuarios, tickets e interacciones antes de cargar")
+    args = parser.parse_args()
+
+    supabase_url = os.getenv('SUPABASE_DB_URL')
+    if not supabase_url:
+        print("❌ Error: No se encontró SUPABASE_DB_URL en las variables de entorno")
+        return
+
+    engine = create_engine(supabase_url, pool_pre_ping=True)
+    rng = random.Random(args.semilla)
+    ahora = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    dias = args.meses * 30
+
+    print("=" * 70)
+    print(f"DATOS SINTÉTICOS - {args.usuarios:,} usuarios, {args.tickets:,} tickets, "
+          f"{args.interacciones:,} interacciones (semilla {args.semilla})")
+    print("=" * 70)
+
+    with engine.begin() as conn:
+        if args.limpiar:
+            limpiar(conn)
+            print("   Tablas vaciadas")
+        particiones = crear_particiones(conn, ahora - timedelta(days=dias), ahora)
+        if particiones:
+            print(f"   {particiones} particiones mensuales de interacciones verificadas")
+
+    inicio = time.perf_counter()
+    buffer, usuarios, operadores = generar_usuarios(rng, args.usuarios, args.semilla, ahora, dias)
+    conexion = engine.raw_connection()
+    try:
+        cursor = conexion.cursor()
+        copiar(cursor, "usuarios", COLUMNAS_USUARIOS, buffer)
+        conexion.commit()
+        print(f"   usuarios: {args.usuarios:,} filas en {time.perf_counter() - inicio:.1f} s")
+
+        media = args.interacciones / args.tickets if args.tickets else 0
+        total_tickets = total_interacciones = 0
+        inicio = time.perf_counter()
+        while total_tickets < args.tickets:
+            cantidad = min(args.bloque, args.tickets - total_tickets)
+            tickets_csv, interacciones_csv, generadas = generar_bloque(
+                rng, cantidad, args.interacciones - total_interacciones, media, usuarios, operadores, ahora, dias
+            )
+            copiar(cursor, "tickets", COLUMNAS_TICKETS, tickets_csv)
+            copiar(cursor, "interacciones", COLUMNAS_INTERACCIONES, interacciones_csv)
+            conexion.commit()
+            total_tickets += cantidad
+            total_interacciones += generadas
+            transcurrido = time.perf_counter() - inicio
+            print(f"   tickets: {total_tickets:,} / {args.tickets:,} | interacciones: {total_interacciones:,} "
+                  f"| {(total_tickets + total_interacciones) / transcurrido:,.0f} filas/s", end="\r")
+        print()
+        print(f"   tickets + interacciones: {total_tickets + total_interacciones:,} filas en "
+              f"{time.perf_counter() - inicio:.1f} s")
+    finally:
+        conexion.close()
+
+    with engine.begin() as conn:
+        for tabla in ("usuarios", "tickets", "interacciones"):
+            conn.execute(text(f"ANALYZE {tabla}"))
+
+    print()
+    print("Hecho. Los contadores y listados cacheados en Redis quedaron desactualizados:")
+    print("   encolar reconciliar_contadores y limpiar_cache en el Batch Worker.")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,32 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import axios from 'axios'
 import Head from 'next/head'
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
 
+// Leer lo que se acaba de escribir con réplicas de lectura: el backend devuelve
+// el LSN de la escritura en X-Consistencia y se reenvía en las lecturas de los
+// segundos siguientes (después las réplicas ya están al día)
+const VIGENCIA_CONSISTENCIA_MS = 10000
+
+// Ráfagas de eventos (cargas masivas, muchos cambios de estado): como máximo
+// una recarga de cada recurso por ventana
+const VENTANA_RECARGA_MS = 500
+let consistencia = null
+
+axios.interceptors.response.use((response) => {
+  const lsn = response.headers['x-consistencia']
+  if (lsn) consistencia = { lsn, hasta: Date.now() + VIGENCIA_CONSISTENCIA_MS }
+  return response
+})
+
+axios.interceptors.request.use((config) => {
+  if (consistencia && Date.now() < consistencia.hasta) {
+    config.headers['X-Consistencia'] = consistencia.lsn
+  }
+  return config
+})
+
 export default function Home() {
   const [tickets, setTickets] = useState([])
   const [usuarios, setUsuarios] = useState([])
@@ -12,6 +35,9 @@ export default function Home() {
   const [interacciones, setInteracciones] = useState([])
   const [mostrarFormulario, setMostrarFormulario] = useState(false)
   const [filtroEstado, setFiltroEstado] = useState('todos')
+  const [stats, setStats] = useState(null)
+  const [enVivo, setEnVivo] = useState(false)
+  const seleccionadoRef = useRef(null)
   const [nuevoTicket, setNuevoTicket] = useState({
     usuario_id: '',
     titulo: '',
@@ -24,6 +50,56 @@ export default function Home() {
     cargarUsuarios()
   }, [])
 
+  useEffect(() => {
+    seleccionadoRef.current = ticketSeleccionado?.id || null
+  }, [ticketSeleccionado])
+
+  useEffect(() => {
+    // Cambios en tiempo real (GET /events): reemplaza recargar después de cada acción
+    const fuente = new EventSource(`${API_URL}/events`)
+    let reconectando = false
+    const pendientes = {}
+    const recargar = (clave, cargar) => {
+      if (pendientes[clave]) return
+      pendientes[clave] = setTimeout(() => {
+        pendientes[clave] = null
+        cargar()
+      }, VENTANA_RECARGA_MS)
+    }
+    fuente.onopen = () => {
+      // Tras una reconexión pudieron perderse eventos: resincronizar
+      if (reconectando) cargarTickets()
+      setEnVivo(true)
+    }
+    fuente.onerror = () => {
+      reconectando = true
+      setEnVivo(false)
+    }
+    // cargarTickets también recarga los contadores
+    fuente.addEventListener('ticket_creado', () => recargar('tickets', cargarTickets))
+    fuente.addEventListener('tickets_creados', () => recargar('tickets', cargarTickets))
+    fuente.addEventListener('ticket_actualizado', (e) => {
+      const evento = JSON.parse(e.data)
+      // Los eventos diferidos mientras Redis no respondía llegan tarde: no aplicar
+      // uno cuya versión sea anterior a la que ya se tiene del ticket
+      const aplicar = (t) => t?.id === evento.ticket_id && !(Date.parse(evento.version) < Date.parse(t.fecha_actualizacion))
+      const actualizado = { estado: evento.estado, fecha_actualizacion: evento.version }
+      setTickets(prev => prev.map(t => aplicar(t) ? { ...t, ...actualizado } : t))
+      setTicketSeleccionado(prev => aplicar(prev) ? { ...prev, ...actualizado } : prev)
+      // El cambio de estado registra una interacción cambio_estado
+      if (seleccionadoRef.current === evento.ticket_id) cargarInteracciones(evento.ticket_id)
+      recargar('stats', cargarStats)
+    })
+    fuente.addEventListener('interaccion_creada', (e) => {
+      const evento = JSON.parse(e.data)
+      if (seleccionadoRef.current === evento.ticket_id) cargarInteracciones(evento.ticket_id)
+    })
+    return () => {
+      fuente.close()
+      Object.values(pendientes).forEach(clearTimeout)
+    }
+  }, [])
+
   const cargarTickets = async () => {
     setLoading(true)
     try {
@@ -34,6 +110,17 @@ export default function Home() {
     } finally {
       setLoading(false)
     }
+    cargarStats()
+  }
+
+  const cargarStats = async () => {
+    // Contadores globales desde Redis (GET /tickets solo trae la primera página)
+    try {
+      const response = await axios.get(`${API_URL}/stats/tickets`)
+      setStats(response.data)
+    } catch (error) {
+      console.error('Error cargando estadísticas:', error)
+    }
   }
 
   const cargarUsuarios = async () => {
@@ -47,8 +134,12 @@ export default function Home() {
 
   const cargarInteracciones = async (ticketId) => {
     try {
-      const response = await axios.get(`${API_URL}/tickets/${ticketId}/interacciones`)
-      setInteracciones(response.data)
+      // Ticket, dueño e interacciones en una sola llamada (GET /tickets/{id}/full)
+      const response = await axios.get(`${API_URL}/tickets/${ticketId}/full?interacciones=50`)
+      setInteracciones(response.data.interacciones)
+      setTicketSeleccionado(prev => prev?.id === ticketId
+        ? { ...prev, ...response.data.ticket, usuario: response.data.usuario }
+        : prev)
     } catch (error) {
       console.error('Error cargando interacciones:', error)
     }
@@ -60,7 +151,7 @@ export default function Home() {
       await axios.post(`${API_URL}/tickets`, nuevoTicket)
       setNuevoTicket({ usuario_id: '', titulo: '', descripcion: '', prioridad: 'media' })
       setMostrarFormulario(false)
-      cargarTickets()
+      if (!enVivo) cargarTickets()
     } catch (error) {
       console.error('Error creando ticket:', error)
       alert('Error al crear ticket: ' + (error.response?.data?.detail || error.message))
@@ -70,6 +161,8 @@ export default function Home() {
   const actualizarEstado = async (ticketId, nuevoEstado, usuarioId) => {
     try {
       await axios.patch(`${API_URL}/tickets/${ticketId}/estado?nuevo_estado=${nuevoEstado}&usuario_id=${usuarioId}`)
+      // Con /events conectado, el evento ticket_actualizado actualiza la vista
+      if (enVivo) return
       cargarTickets()
       if (ticketSeleccionado?.id === ticketId) {
         const updated = tickets.find(t => t.id === ticketId)
@@ -140,11 +233,11 @@ export default function Home() {
             </div>
             <div className="stats">
               <div className="stat-item">
-                <span className="stat-number">{tickets.length}</span>
+                <span className="stat-number">{stats ? stats.total : tickets.length}</span>
                 <span className="stat-label">Total</span>
               </div>
               <div className="stat-item">
-                <span className="stat-number">{tickets.filter(t => t.estado === 'abierto').length}</span>
+                <span className="stat-number">{stats ? (stats.por_estado.abierto || 0) : tickets.filter(t => t.estado === 'abierto').length}</span>
                 <span className="stat-label">Abiertos</span>
               </div>
             </div>